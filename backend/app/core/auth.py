@@ -1,9 +1,13 @@
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
+import asyncio
+import hashlib
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
 import jwt
+from core.cache import TTLCache
 from core.config import settings, supabase, supabase_admin
 
 # 비밀번호 해싱을 위한 설정
@@ -36,36 +40,157 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# 검증을 통과한 토큰의 사용자 정보 캐시 (토큰 SHA-256 해시 → 사용자 정보, 로컬/원격 검증 공통)
+_verified_claims_cache = TTLCache(
+    max_size=settings.AUTH_CLAIMS_CACHE_SIZE,
+    ttl_seconds=settings.AUTH_CLAIMS_CACHE_TTL_SECONDS
+)
+_jwks_client: Optional[jwt.PyJWKClient] = None
+
+def _token_cache_key(token: str) -> str:
+    """원본 토큰 대신 해시를 캐시 키로 사용"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def _get_jwks_client() -> jwt.PyJWKClient:
+    """Supabase JWKS 클라이언트 (서명 키는 PyJWKClient가 내부에서 캐싱)"""
+    global _jwks_client
+    if _jwks_client is None:
+        jwks_url = settings.SUPABASE_JWKS_URL or f"{settings.SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json"
+        _jwks_client = jwt.PyJWKClient(jwks_url, cache_keys=True)
+    return _jwks_client
+
+def _cache_verified_user(cache_key: str, user_info: Dict[str, Any], exp: Optional[float]) -> None:
+    """검증된 사용자 정보를 토큰 만료 시각을 넘지 않도록 캐싱 (만료 시각을 모르면 캐시하지 않음)"""
+    if exp is None:
+        return
+    ttl = min(settings.AUTH_CLAIMS_CACHE_TTL_SECONDS, exp - time.time())
+    if ttl > 0:
+        _verified_claims_cache.set(cache_key, user_info, ttl_seconds=ttl)
+
+async def check_local_verification() -> bool:
+    """서버 시작 시 로컬 JWT 검증 키(JWT 시크릿 또는 JWKS 서명 키)를 확보할 수 있는지 확인
+    
+    확보할 수 없으면 모든 요청이 Supabase auth 서버 확인(AUTH_REMOTE_FALLBACK)으로 처리되므로 경고를 남긴다.
+    """
+    if settings.SUPABASE_JWT_SECRET:
+        return True
+    try:
+        # JWKS 조회는 네트워크 I/O이므로 스레드에서 실행 (서명 키가 없으면 PyJWKClientError)
+        await asyncio.to_thread(_get_jwks_client().get_signing_keys)
+        return True
+    except Exception as e:
+        fallback = "모든 토큰을 Supabase auth 서버로 확인합니다 (토큰마다 첫 요청에서 원격 호출, 결과는 토큰 만료 전까지 캐시)" if settings.AUTH_REMOTE_FALLBACK else "AUTH_REMOTE_FALLBACK이 꺼져 있어 모든 인증이 거부됩니다"
+        print(f"⚠️ JWT 로컬 검증 불가 (SUPABASE_JWT_SECRET 미설정, JWKS 서명 키 조회 실패: {e}) → {fallback}")
+        return False
+
+def _decode_supabase_jwt(token: str) -> Optional[Dict[str, Any]]:
+    """Supabase JWT 서명 및 만료 로컬 검증
+    
+    검증에 필요한 키(JWT 시크릿 또는 JWKS)를 확보할 수 없으면 None을 반환하고,
+    토큰 자체가 위조/만료된 경우에는 jwt.InvalidTokenError를 발생시킨다.
+    """
+    algorithm = jwt.get_unverified_header(token).get("alg")
+    
+    if algorithm == "HS256":
+        if not settings.SUPABASE_JWT_SECRET:
+            return None
+        key = settings.SUPABASE_JWT_SECRET
+    elif algorithm in ("RS256", "ES256"):
+        try:
+            key = _get_jwks_client().get_signing_key_from_jwt(token).key
+        except jwt.PyJWKClientError as e:
+            print(f"⚠️ JWKS 서명 키 조회 실패: {e}")
+            return None
+    else:
+        raise jwt.InvalidAlgorithmError(f"지원하지 않는 서명 알고리즘: {algorithm}")
+    
+    return jwt.decode(
+        token,
+        key,
+        algorithms=[algorithm],
+        audience=settings.SUPABASE_JWT_AUDIENCE,
+        options={"require": ["exp", "sub"]}
+    )
+
+def _user_from_claims(claims: Dict[str, Any]) -> Dict[str, Any]:
+    """JWT 클레임을 get_user() 응답과 같은 형태의 사용자 정보로 변환"""
+    return {
+        "id": claims["sub"],
+        "email": claims.get("email"),
+        "created_at": None,  # 토큰 클레임에는 가입 시각이 없음
+        "user_metadata": claims.get("user_metadata") or {},
+        "app_metadata": claims.get("app_metadata") or {}
+    }
+
+async def _verify_supabase_jwt_remote(token: str) -> Optional[Dict[str, Any]]:
+    """Supabase auth 서버에 토큰 검증 요청 (로컬 검증 불가 시 대체 경로)"""
+    # get_user() 메서드를 사용하여 JWT 토큰 검증 (동기 호출이므로 스레드에서 실행)
+    user_response = await asyncio.to_thread(supabase_admin.auth.get_user, token)
+    
+    if not user_response or not user_response.user:
+        print(f"❌ 사용자 정보 없음: user_response={user_response}")
+        return None
+    
+    user = user_response.user
+    return {
+        "id": user.id,
+        "email": user.email,
+        "created_at": user.created_at,
+        "user_metadata": user.user_metadata or {},
+        "app_metadata": user.app_metadata or {}
+    }
+
 async def verify_supabase_jwt(token: str) -> Dict[str, Any]:
-    """Supabase JWT 토큰 검증 및 사용자 정보 반환"""
+    """Supabase JWT 토큰 검증 및 사용자 정보 반환
+    
+    서명과 만료를 로컬에서 검증하고 결과를 토큰 만료 시각까지 캐싱한다.
+    로컬 검증 키를 확보할 수 없을 때만 Supabase auth 서버로 확인하며 (AUTH_REMOTE_FALLBACK),
+    원격 검증 결과도 같은 방식으로 캐싱한다.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Supabase 인증 정보가 유효하지 않습니다",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    cache_key = _token_cache_key(token)
+    cached_user = _verified_claims_cache.get(cache_key)
+    if cached_user is not None:
+        return cached_user
+    
     try:
         print(f"🔐 JWT 토큰 검증 시작: {token[:50]}...")
         
-        # Supabase Admin 클라이언트로 토큰 검증
-        # get_user() 메서드를 사용하여 JWT 토큰 검증
-        user_response = supabase_admin.auth.get_user(token)
+        if jwt.get_unverified_header(token).get("alg") == "HS256":
+            claims = _decode_supabase_jwt(token)
+        else:
+            # JWKS 최초 조회는 네트워크 I/O이므로 스레드에서 실행
+            claims = await asyncio.to_thread(_decode_supabase_jwt, token)
+        
+        if claims is not None:
+            user_info = _user_from_claims(claims)
+            # 토큰 만료 이후로는 캐시하지 않음
+            _cache_verified_user(cache_key, user_info, claims["exp"])
+            print(f"✅ JWT 로컬 검증 성공: user_id={user_info['id']}, email={user_info['email']}")
+            return user_info
         
-        if not user_response or not user_response.user:
-            print(f"❌ 사용자 정보 없음: user_response={user_response}")
+        if not settings.AUTH_REMOTE_FALLBACK:
+            print("❌ JWT 로컬 검증 키 없음 (SUPABASE_JWT_SECRET/JWKS), 원격 검증 비활성화")
+            raise credentials_exception
+        
+        # Supabase Admin 클라이언트로 토큰 검증
+        user_info = await _verify_supabase_jwt_remote(token)
+        if user_info is None:
             raise credentials_exception
-            
-        user = user_response.user
-        print(f"✅ JWT 검증 성공: user_id={user.id}, email={user.email}")
         
-        return {
-            "id": user.id,
-            "email": user.email,
-            "created_at": user.created_at,
-            "user_metadata": user.user_metadata or {},
-            "app_metadata": user.app_metadata or {}
-        }
+        # 원격 검증을 통과한 토큰이므로 서명 검증 없이 읽은 만료 시각으로 캐시 기간 제한
+        exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+        _cache_verified_user(cache_key, user_info, exp)
+        print(f"✅ JWT 원격 검증 성공: user_id={user_info['id']}, email={user_info['email']}")
+        return user_info
         
+    except HTTPException:
+        raise
     except Exception as e:
         error_msg = f"Supabase JWT 검증 실패: {type(e).__name__}: {str(e)}"
         print(f"❌ {error_msg}")
@@ -1,7 +1,7 @@
 from pydantic_settings import BaseSettings
 import secrets
-from supabase import create_client, Client
-from typing import Optional
+from supabase import create_client, acreate_client, Client, AsyncClient
+from typing import Dict, Optional
 
 class Settings(BaseSettings):
     # PostgreSQL 설정 (기존)
@@ -36,6 +36,96 @@ class Settings(BaseSettings):
     # JWT 인증 설정
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Supabase JWT 로컬 검증 설정
+    SUPABASE_JWT_SECRET: Optional[str] = None  # HS256 서명 프로젝트 JWT 시크릿
+    SUPABASE_JWKS_URL: Optional[str] = None  # 비대칭 서명 키 (기본값: {SUPABASE_URL}/auth/v1/.well-known/jwks.json)
+    SUPABASE_JWT_AUDIENCE: str = "authenticated"
+    AUTH_CLAIMS_CACHE_SIZE: int = 10000
+    AUTH_CLAIMS_CACHE_TTL_SECONDS: int = 300
+    AUTH_REMOTE_FALLBACK: bool = True  # 로컬 검증이 불가능할 때 Supabase auth 서버로 확인
+
+    # 대화 세션 상태 캐시 설정 (워커 로컬, 캐시 미스일 때만 DB에서 복원)
+    SESSION_CACHE_MAX_SESSIONS: int = 1000
+    SESSION_CACHE_TTL_SECONDS: int = 1800
+
+    # 대화 레코드 write-behind 버퍼 설정 (크기 또는 시간 임계치에 도달하면 일괄 저장)
+    CONVERSATION_WRITE_MAX_RETRIES: int = 5
+    CONVERSATION_WRITE_RETRY_BASE_SECONDS: float = 0.5
+    CONVERSATION_FLUSH_MAX_ROWS: int = 50
+    CONVERSATION_FLUSH_INTERVAL_SECONDS: float = 0.5
+
+    # 최근 생성된 세션 (재연결 시 세션 upsert 생략, 워커 로컬)
+    KNOWN_SESSIONS_MAX: int = 10000
+    KNOWN_SESSIONS_TTL_SECONDS: int = 6 * 60 * 60
+
+    # 상태 초기화 단계 DB 조회별 시간 제한 (초과 시 기본값으로 진행)
+    INIT_STATE_READ_TIMEOUT_SECONDS: float = 2.0
+
+    # 프롬프트 대화 히스토리 창 (최근 턴 수 / 최근 턴 토큰 예산, 나머지는 누적 요약)
+    HISTORY_RECENT_TURNS: int = 6
+    HISTORY_MAX_TOKENS: int = 1200
+
+    # 라우터 빠른 경로 (평가 간 최소 턴 간격 / 기억등록 후 기억회상까지 턴 수 / 짧은 답변 기준 글자 수 / LLM 라우터 출력 토큰 상한)
+    ROUTER_MIN_TURNS_BETWEEN_ASSESSMENTS: int = 2
+    ROUTER_RECALL_DELAY_TURNS: int = 6
+    ROUTER_SHORT_ANSWER_CHARS: int = 4
+    ROUTER_LLM_MAX_TOKENS: int = 24
+    # LLM 라우터 호출 시 일반 응답을 동시에 미리 생성 (standard_chat이 아니면 폐기, 토큰 비용 증가)
+    SPECULATIVE_STANDARD_RESPONSE: bool = False
+
+    # CIST 질문 템플릿 벡터 검색 (임베딩 모델 / 캐시 채택 유사도 기준 / 후보 수 / 증분 갱신 주기)
+    TEMPLATE_EMBEDDING_MODEL: str = "text-embedding-3-small"
+    TEMPLATE_CACHE_THRESHOLD: float = 0.5
+    TEMPLATE_SEARCH_TOP_K: int = 3
+    TEMPLATE_INDEX_REFRESH_SECONDS: float = 60.0
+
+    # 반복 발화 응답 캐시 (유지 시간 / 같은 발화로 볼 유사도 / 캐시할 최소 글자 수)
+    RESPONSE_CACHE_TTL_SECONDS: int = 600
+    RESPONSE_CACHE_SIMILARITY: float = 0.9
+    RESPONSE_CACHE_MIN_CHARS: int = 4
+
+    # 사진 컨텍스트 캐시 (사진 행 + 프롬프트 조각, 분석 결과 저장 시 무효화)
+    # 무효화는 해당 워커에만 적용되므로 다른 워커는 최대 TTL 동안 이전 사진 정보를 사용
+    PHOTO_CACHE_MAX_PHOTOS: int = 5000
+    PHOTO_CACHE_TTL_SECONDS: int = 120
+
+    # LLM 게이트웨이 (모델별 동시 실행 수 / 재시도 횟수·백오프 / 요청당 적립되는 재시도 예산)
+    LLM_DEFAULT_CONCURRENCY: int = 16
+    LLM_MODEL_CONCURRENCY: Dict[str, int] = {}  # 예: {"gpt-4.1-nano": 32}
+    LLM_MAX_ATTEMPTS: int = 4
+    LLM_RETRY_BASE_SECONDS: float = 0.5
+    LLM_RETRY_BUDGET_RATIO: float = 0.2
+
+    # LLM 지연 시간 예산 (첫 토큰 기준, 백분위수를 넘기면 헤지 요청, 노드별 예산을 넘기면 대체 응답)
+    HEDGE_PERCENTILE: float = 95.0
+    HEDGE_MIN_SAMPLES: int = 20  # 표본이 부족할 때는 HEDGE_INITIAL_DELAY_SECONDS 사용
+    HEDGE_INITIAL_DELAY_SECONDS: float = 3.0
+    HEDGE_MIN_DELAY_SECONDS: float = 0.5
+    LATENCY_WINDOW: int = 500
+    LATENCY_BUDGET_SECONDS: Dict[str, float] = {"router": 4.0, "standard_response": 8.0, "fallback": 6.0}
+    LLM_STREAM_COMPLETION_SECONDS: float = 20.0  # 첫 토큰 이후 응답 완료까지 남은 예산에 더해 기다리는 상한
+
+    # 고품질 질문 생성 작업 병합 ((photo_id, category)별 디바운스 창 / 발행 후 재발행 금지 시간 / 작업을 생략할 템플릿 수 / 합칠 발화 수)
+    QUESTION_JOB_DEBOUNCE_SECONDS: float = 30.0
+    QUESTION_JOB_COOLDOWN_SECONDS: float = 600.0
+    QUESTION_BANK_SATURATION: int = 5
+    QUESTION_JOB_MAX_CONTEXTS: int = 5
+
+    # 사진별 평가 질문 뱅크 캐시 (사진 분석 시 미리 생성, 빈 뱅크는 생성 작업이 끝나면 보이도록 짧게 캐시)
+    PHOTO_BANK_MODEL: str = "gpt-4o"  # 생성 모델 (구조화 출력 response_format 지원 모델)
+    PHOTO_BANK_MAX_PHOTOS: int = 5000
+    PHOTO_BANK_TTL_SECONDS: int = 600
+    PHOTO_BANK_EMPTY_TTL_SECONDS: int = 60
+
+    # 고품질 질문 생성 방식 (online: 작업마다 바로 호출 / batch: 맥락을 Redis에 모아 Batch API로 일괄 처리)
+    QUESTION_GENERATION_MODE: str = "online"
+    QUESTION_BATCH_BACKEND: str = "openai"  # openai / local (로컬 대체 백엔드, 개발·테스트용)
+    QUESTION_BATCH_MODEL: str = "gpt-4"
+    QUESTION_BATCH_DIR: str = "/tmp/question_batches"  # 요청/결과 JSONL 파일 위치
+    QUESTION_BATCH_MAX_REQUESTS: int = 5000  # 배치 파일 하나에 담을 최대 요청 수
+    QUESTION_BATCH_SUBMIT_MINUTES: int = 30
+    QUESTION_BATCH_POLL_MINUTES: int = 10
+
     # # Azure Speech 서비스 설정
     # AZURE_SPEECH_KEY: str
     # AZURE_SPEECH_REGION: str
@@ -51,4 +141,14 @@ settings = Settings()
 supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_ANON_KEY)
 
 # Supabase 서비스 역할 클라이언트 초기화 (관리자 권한)
-supabase_admin: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
\ No newline at end of file
+supabase_admin: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
+
+# 비동기 Supabase 서비스 역할 클라이언트 (이벤트 루프 위에서 I/O를 블로킹하지 않도록 사용)
+_supabase_admin_async: Optional[AsyncClient] = None
+
+async def get_supabase_admin_async() -> AsyncClient:
+    """비동기 서비스 역할 클라이언트 반환 (최초 호출 시 생성)"""
+    global _supabase_admin_async
+    if _supabase_admin_async is None:
+        _supabase_admin_async = await acreate_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
+    return _supabase_admin_async
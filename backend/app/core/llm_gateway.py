@@ -0,0 +1,472 @@
+"""
+공용 LLM 게이트웨이
+모든 LLM 호출(LangChain ChatOpenAI/OpenAIEmbeddings, AzureOpenAI)이 이 모듈을 거치도록 해서
+- 모델별 동시 실행 수 제한 (세마포어)
+- 응답 헤더(x-ratelimit-*) 기반 토큰 버킷 요청 속도 제한
+- 전역 재시도 예산 안에서 지터가 섞인 지수 백오프 재시도
+- 대기열 대기 시간 등 모델별 지표
+를 프로세스 단위로 공유한다. 각 클라이언트의 자체 재시도(max_retries)는 끄고 이 모듈에서만 재시도한다.
+"""
+import asyncio
+import random
+import re
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from core.config import settings
+from core.metrics import LLM_QUEUE_SECONDS, LLM_REQUEST_SECONDS, LLM_TOKENS_TOTAL
+
+# 재시도할 HTTP 상태 코드 (요청 한도 초과 / 서버 오류)
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """x-ratelimit-reset-* 값("1s", "6m0s", "20ms")을 초로 변환"""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(str(value))
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+class TokenBucket:
+    """요청 수 토큰 버킷 (한도를 모르는 동안은 제한 없음, 응답 헤더로 한도/잔여량 보정)"""
+
+    def __init__(self):
+        self.capacity: Optional[float] = None
+        self.rate: Optional[float] = None  # 초당 충전량
+        self.tokens = 0.0
+        self.capacity_known = False
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """토큰 하나를 예약하고 기다려야 할 시간(초) 반환"""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self.paused_until - now)
+            if self.rate is None:
+                return wait
+
+            self._refill(now)
+            self.tokens -= 1
+            if self.tokens < 0:
+                wait = max(wait, -self.tokens / self.rate)
+            return wait
+
+    def update_from_headers(self, headers: Any) -> None:
+        """x-ratelimit-limit/remaining/reset-requests 및 remaining/reset-tokens 반영"""
+        if not headers:
+            return
+        limit = _header_number(headers, "x-ratelimit-limit-requests")
+        remaining = _header_number(headers, "x-ratelimit-remaining-requests")
+        reset = parse_reset_duration(_header(headers, "x-ratelimit-reset-requests"))
+        remaining_tokens = _header_number(headers, "x-ratelimit-remaining-tokens")
+        reset_tokens = parse_reset_duration(_header(headers, "x-ratelimit-reset-tokens"))
+
+        with self._lock:
+            now = time.monotonic()
+            if limit:
+                self._refill(now)
+                self.capacity = limit
+                # 서버 기준 잔여량이 다시 찰 때까지의 속도로 충전 (리셋 정보가 없으면 분당 한도 기준)
+                if remaining is not None and reset:
+                    self.rate = max((limit - remaining) / reset, limit / 60.0)
+                else:
+                    self.rate = limit / 60.0
+                if remaining is not None:
+                    # 서버 기준 잔여량이 더 적으면 (다른 워커가 같은 키를 사용) 그에 맞춤
+                    self.tokens = min(self.tokens, remaining) if self.capacity_known else remaining
+                    self.capacity_known = True
+            # 토큰(TPM) 한도를 거의 다 쓰면 리셋될 때까지 새 요청 보류
+            if remaining_tokens is not None and remaining_tokens <= 0 and reset_tokens:
+                self.paused_until = max(self.paused_until, now + reset_tokens)
+
+    def pause(self, seconds: float) -> None:
+        """429의 Retry-After 동안 모든 요청 보류"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def _refill(self, now: float) -> None:
+        if self.rate is not None and self.capacity is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class RetryBudget:
+    """전역 재시도 예산 (요청마다 ratio만큼 적립, 재시도마다 1 소모 → 장애 시 재시도 폭주 방지)"""
+
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 20.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class ModelStats:
+    """모델별 호출 지표"""
+
+    def __init__(self):
+        self.requests = 0
+        self.failures = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.retry_budget_exhausted = 0
+        self.queued = 0
+        self.in_flight = 0
+        self.queue_seconds_total = 0.0
+        self.queue_seconds_max = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "retry_budget_exhausted": self.retry_budget_exhausted,
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "avg_queue_seconds": round(self.queue_seconds_total / self.requests, 4) if self.requests else 0.0,
+            "max_queue_seconds": round(self.queue_seconds_max, 4),
+        }
+
+
+class LLMGateway:
+    """모델별 동시성 제한 + 속도 제한 + 재시도 예산을 적용해 LLM 호출 실행"""
+
+    def __init__(
+        self,
+        default_concurrency: int = 16,
+        model_concurrency: Optional[Dict[str, int]] = None,
+        max_attempts: int = 4,
+        retry_base_delay: float = 0.5,
+        retry_max_delay: float = 8.0,
+        retry_budget_ratio: float = 0.2,
+    ):
+        self.default_concurrency = default_concurrency
+        self.model_concurrency = model_concurrency or {}
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.retry_budget = RetryBudget(ratio=retry_budget_ratio)
+
+        self._async_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._sync_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._stats: Dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+
+    # LangChain 모델 호출
+
+    async def ainvoke(self, llm: Any, messages: Any, **kwargs) -> Any:
+        """LangChain 채팅 모델 비동기 호출"""
+        return await self.arun(_model_name(llm), lambda: llm.ainvoke(messages, **kwargs))
+
+    def invoke(self, llm: Any, messages: Any, **kwargs) -> Any:
+        """LangChain 채팅 모델 동기 호출 (Celery 작업 등)"""
+        return self.run(_model_name(llm), lambda: llm.invoke(messages, **kwargs))
+
+    # OpenAI SDK 호출
+
+    def chat_completion(self, client: Any, **kwargs) -> Any:
+        """OpenAI/AzureOpenAI 동기 chat.completions.create (원시 응답 헤더로 속도 제한 보정)"""
+        model = kwargs.get("model", "openai")
+        completion = self.run(model, lambda: client.chat.completions.with_raw_response.create(**kwargs)).parse()
+        usage = getattr(completion, "usage", None)
+        if usage is not None:
+            details = getattr(usage, "prompt_tokens_details", None)
+            _record_tokens(model, {
+                "input_tokens": usage.prompt_tokens,
+                "output_tokens": usage.completion_tokens,
+                "input_token_details": {"cache_read": getattr(details, "cached_tokens", 0) if details else 0},
+            })
+        return completion
+
+    # 공통 실행
+
+    async def arun(self, model: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """비동기 호출 실행 (call은 매 시도마다 새 코루틴을 만드는 함수)"""
+        stats = self._stats_for(model)
+        bucket = self._bucket(model)
+        self.retry_budget.deposit()
+
+        attempt = 1
+        while True:
+            try:
+                async with self._slot(model, stats, bucket):
+                    result = await call()
+            except Exception as e:
+                delay = self._handle_failure(model, stats, bucket, e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+
+            bucket.update_from_headers(_response_headers(result))
+            _record_tokens(model, getattr(result, "usage_metadata", None))
+            return result
+
+    async def astream(self, llm: Any, messages: Any, **kwargs) -> AsyncIterator[Any]:
+        """LangChain 채팅 모델 스트리밍 호출 (첫 청크를 받기 전까지만 재시도, 스트림이 끝날 때까지 슬롯 점유)"""
+        model = _model_name(llm)
+        stats = self._stats_for(model)
+        bucket = self._bucket(model)
+        self.retry_budget.deposit()
+
+        attempt = 1
+        while True:
+            streamed = False
+            try:
+                async with self._slot(model, stats, bucket):
+                    async for chunk in llm.astream(messages, **kwargs):
+                        if not streamed:
+                            streamed = True
+                            bucket.update_from_headers(_response_headers(chunk))
+                        # usage는 마지막 청크에만 담김 (stream_usage=True)
+                        _record_tokens(model, getattr(chunk, "usage_metadata", None))
+                        yield chunk
+                return
+            except Exception as e:
+                if streamed:
+                    # 이미 일부 토큰을 전달했으면 재시도하지 않음
+                    stats.failures += 1
+                    raise
+                delay = self._handle_failure(model, stats, bucket, e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    @asynccontextmanager
+    async def _slot(self, model: str, stats: "ModelStats", bucket: "TokenBucket"):
+        """동시 실행 슬롯 + 속도 제한 대기 (대기열 시간 집계)"""
+        enqueued = time.monotonic()
+        stats.queued += 1
+        dequeued = False
+        try:
+            async with self._async_semaphore(model):
+                wait = bucket.reserve()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                stats.queued -= 1
+                dequeued = True
+                self._record_dequeue(model, stats, enqueued)
+                stats.in_flight += 1
+                started = time.perf_counter()
+                outcome = "error"
+                try:
+                    yield
+                    outcome = "ok"
+                except asyncio.CancelledError:
+                    outcome = "cancelled"
+                    raise
+                finally:
+                    stats.in_flight -= 1
+                    LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, model=model, outcome=outcome)
+        finally:
+            # 대기 중 취소된 경우에도 대기열 수 복구
+            if not dequeued:
+                stats.queued -= 1
+
+    def run(self, model: str, call: Callable[[], Any]) -> Any:
+        """동기 호출 실행 (스레드/Celery 워커용)"""
+        stats = self._stats_for(model)
+        semaphore = self._sync_semaphore(model)
+        bucket = self._bucket(model)
+        self.retry_budget.deposit()
+
+        attempt = 1
+        while True:
+            enqueued = time.monotonic()
+            stats.queued += 1
+            try:
+                with semaphore:
+                    wait = bucket.reserve()
+                    if wait > 0:
+                        time.sleep(wait)
+                    stats.queued -= 1
+                    self._record_dequeue(model, stats, enqueued)
+                    stats.in_flight += 1
+                    started = time.perf_counter()
+                    outcome = "error"
+                    try:
+                        result = call()
+                        outcome = "ok"
+                    finally:
+                        stats.in_flight -= 1
+                        LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, model=model, outcome=outcome)
+            except Exception as e:
+                delay = self._handle_failure(model, stats, bucket, e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            bucket.update_from_headers(_response_headers(result))
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "retry_budget": round(self.retry_budget.tokens, 2),
+            "models": {model: stats.as_dict() for model, stats in self._stats.items()},
+        }
+
+    # 내부 구현
+
+    def _record_dequeue(self, model: str, stats: ModelStats, enqueued: float) -> None:
+        waited = time.monotonic() - enqueued
+        LLM_QUEUE_SECONDS.observe(waited, model=model)
+        stats.requests += 1
+        stats.queue_seconds_total += waited
+        stats.queue_seconds_max = max(stats.queue_seconds_max, waited)
+
+    def _handle_failure(self, model: str, stats: ModelStats, bucket: TokenBucket, error: Exception, attempt: int) -> Optional[float]:
+        """실패 처리 후 재시도 대기 시간 반환 (재시도하지 않으면 None)"""
+        status_code = _status_code(error)
+        headers = _error_headers(error)
+        if status_code == 429:
+            stats.rate_limited += 1
+            retry_after = _retry_after(headers)
+            if retry_after:
+                bucket.pause(retry_after)
+        bucket.update_from_headers(headers)
+
+        if not _is_retryable(error, status_code) or attempt >= self.max_attempts:
+            stats.failures += 1
+            return None
+        if not self.retry_budget.withdraw():
+            stats.failures += 1
+            stats.retry_budget_exhausted += 1
+            print(f"⚠️ LLM 재시도 예산 소진: model={model}, {type(error).__name__}")
+            return None
+
+        stats.retries += 1
+        # full jitter 지수 백오프 (Retry-After가 있으면 그 이상 대기)
+        delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * (2 ** (attempt - 1))))
+        delay = max(delay, _retry_after(headers) or 0.0)
+        print(f"🔁 LLM 재시도 {attempt}/{self.max_attempts - 1}: model={model}, status={status_code}, {delay:.2f}s 후")
+        return delay
+
+    def _stats_for(self, model: str) -> ModelStats:
+        with self._lock:
+            return self._stats.setdefault(model, ModelStats())
+
+    def _bucket(self, model: str) -> TokenBucket:
+        with self._lock:
+            return self._buckets.setdefault(model, TokenBucket())
+
+    def _async_semaphore(self, model: str) -> asyncio.Semaphore:
+        with self._lock:
+            if model not in self._async_semaphores:
+                self._async_semaphores[model] = asyncio.Semaphore(self._concurrency(model))
+            return self._async_semaphores[model]
+
+    def _sync_semaphore(self, model: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if model not in self._sync_semaphores:
+                self._sync_semaphores[model] = threading.BoundedSemaphore(self._concurrency(model))
+            return self._sync_semaphores[model]
+
+    def _concurrency(self, model: str) -> int:
+        return self.model_concurrency.get(model, self.default_concurrency)
+
+
+def _record_tokens(model: str, usage: Optional[Dict[str, Any]]) -> None:
+    """LangChain usage_metadata 형식의 토큰 사용량 기록"""
+    if not usage:
+        return
+    LLM_TOKENS_TOTAL.inc(usage.get("input_tokens") or 0, model=model, type="input")
+    LLM_TOKENS_TOTAL.inc(usage.get("output_tokens") or 0, model=model, type="output")
+    cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+    if cached:
+        LLM_TOKENS_TOTAL.inc(cached, model=model, type="cached")
+
+
+def _model_name(llm: Any) -> str:
+    return getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+
+
+def _header(headers: Any, name: str) -> Optional[str]:
+    if not headers:
+        return None
+    try:
+        return headers.get(name)
+    except AttributeError:
+        return None
+
+
+def _header_number(headers: Any, name: str) -> Optional[float]:
+    value = _header(headers, name)
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _retry_after(headers: Any) -> Optional[float]:
+    retry_after_ms = _header_number(headers, "retry-after-ms")
+    if retry_after_ms:
+        return retry_after_ms / 1000
+    return _header_number(headers, "retry-after")
+
+
+def _response_headers(result: Any) -> Any:
+    """호출 결과에서 응답 헤더 추출 (LangChain include_response_headers / OpenAI 원시 응답)"""
+    headers = getattr(result, "headers", None)
+    if headers is not None:
+        return headers
+    metadata = getattr(result, "response_metadata", None) or {}
+    return metadata.get("headers")
+
+
+def _error_headers(error: Exception) -> Any:
+    response = getattr(error, "response", None)
+    return getattr(response, "headers", None)
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return status_code
+
+
+def _is_retryable(error: Exception, status_code: Optional[int]) -> bool:
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS
+    # 상태 코드가 없는 연결 오류/시간 초과는 재시도
+    name = type(error).__name__
+    return isinstance(error, (TimeoutError, ConnectionError)) or name in ("APIConnectionError", "APITimeoutError")
+
+
+# 프로세스 전역 LLM 게이트웨이
+llm_gateway = LLMGateway(
+    default_concurrency=settings.LLM_DEFAULT_CONCURRENCY,
+    model_concurrency=settings.LLM_MODEL_CONCURRENCY,
+    max_attempts=settings.LLM_MAX_ATTEMPTS,
+    retry_base_delay=settings.LLM_RETRY_BASE_SECONDS,
+    retry_budget_ratio=settings.LLM_RETRY_BUDGET_RATIO,
+)
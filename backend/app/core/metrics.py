@@ -0,0 +1,215 @@
+"""
+프로세스 내 지표 수집 및 Prometheus 텍스트 형식 출력
+카운터/게이지/히스토그램을 라벨 조합별로 메모리에 누적하고 /metrics에서 text exposition format(0.0.4)으로 내보낸다
+기록은 잠금 하나와 덧셈 몇 번뿐이라 요청 경로에서 바로 호출해도 된다 (uvicorn 워커 프로세스 단위)
+"""
+import bisect
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# 기본 히스토그램 구간 (초)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# LLM 호출/턴 전체처럼 수 초 이상 걸리는 구간
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 12.0, 20.0, 30.0)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """단조 증가 카운터"""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """현재 값 게이지"""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """누적 구간 히스토그램 (_bucket/_sum/_count)"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 라벨 조합 → [구간별 개수..., +Inf 개수], 합계
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def time(self, **labels) -> "_Timer":
+        """with 블록 실행 시간을 기록하는 컨텍스트 매니저"""
+        return _Timer(self, labels)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Tuple[int, float]]:
+        """라벨 값 조합 → (관측 수, 합계)"""
+        with self._lock:
+            return {key: (sum(counts), self._sums[key]) for key, counts in self._counts.items()}
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), self._sums[key]) for key, counts in self._counts.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+def render() -> str:
+    """등록된 모든 지표를 Prometheus 텍스트 형식으로 출력"""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# 대화 워크플로우
+NODE_DURATION_SECONDS = Histogram(
+    "memento_node_duration_seconds", "LangGraph 노드 실행 시간", ["node"]
+)
+TURN_DURATION_SECONDS = Histogram(
+    "memento_turn_duration_seconds", "메시지 수신부터 최종 응답 전송까지 걸린 시간", ["mode"], buckets=SLOW_BUCKETS
+)
+ROUTING_DECISIONS_TOTAL = Counter(
+    "memento_routing_decisions_total", "라우팅 결정 (source: fixed/rule/llm)", ["decision", "source"]
+)
+RESPONSE_SOURCE_TOTAL = Counter(
+    "memento_response_source_total", "응답 출처 (llm/template_cache/photo_bank/response_cache/speculative/budget_fallback/error)", ["node", "source"]
+)
+CACHE_DECISIONS_TOTAL = Counter(
+    "memento_cache_decisions_total", "평가 질문 템플릿 캐시 사용 여부 (use_cache/use_fallback)", ["decision"]
+)
+QUESTION_JOB_REQUESTS_TOTAL = Counter(
+    "memento_question_job_requests_total",
+    "고품질 질문 생성 요청 처리 결과 (published/coalesced/saturated/cooldown/failed, published 외에는 생략된 GPT-4 작업)",
+    ["outcome"]
+)
+
+# LLM 호출
+LLM_REQUEST_SECONDS = Histogram(
+    "memento_llm_request_seconds", "LLM 호출 시도별 소요 시간 (대기열 제외)", ["model", "outcome"], buckets=SLOW_BUCKETS
+)
+LLM_QUEUE_SECONDS = Histogram(
+    "memento_llm_queue_seconds", "LLM 호출 동시 실행 슬롯/속도 제한 대기 시간", ["model"]
+)
+LLM_TOKENS_TOTAL = Counter(
+    "memento_llm_tokens_total", "LLM 토큰 사용량 (type: input/output/cached)", ["model", "type"]
+)
+
+# Supabase
+SUPABASE_QUERY_SECONDS = Histogram(
+    "memento_supabase_query_seconds", "Supabase 쿼리 소요 시간", ["table", "operation"]
+)
+
+# WebSocket
+WEBSOCKET_CONNECTIONS = Gauge(
+    "memento_websocket_connections", "현재 열린 WebSocket 연결 수"
+)
+WEBSOCKET_CONNECTIONS_TOTAL = Counter(
+    "memento_websocket_connections_total", "수락한 WebSocket 연결 수"
+)
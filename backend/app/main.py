@@ -3,13 +3,19 @@ load_dotenv()
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 import json
 import os
 import uuid
 from datetime import datetime
 from services.dialogue_workflow import DialogueWorkflow, WorkflowInput
-from core.auth import get_supabase_user
-from core.config import supabase_admin
+from core.auth import check_local_verification, get_supabase_user
+from core.cache import TTLCache
+from core.config import settings, get_supabase_admin_async
+from core.llm_gateway import llm_gateway
+from core import metrics
+from services.photo_cache import photo_cache
+from services.photo_question_bank import photo_question_bank
 from routers import chat, conversation, photos  # AI 전용 라우터들
 app = FastAPI(title="Memento Box AI API", description="AI 전용 API - 채팅, 이미지 분석, 음성 합성")
 
@@ -30,43 +36,68 @@ app.include_router(photos.router, prefix="/api", tags=["photos"])
 # LangGraph 대화 워크플로우 초기화
 workflow = DialogueWorkflow()
 
+# 이 워커에서 최근 생성(upsert 예약)한 세션 ID (재연결 시 DB 접근 없이 재사용)
+known_sessions = TTLCache(max_size=settings.KNOWN_SESSIONS_MAX, ttl_seconds=settings.KNOWN_SESSIONS_TTL_SECONDS)
+
+@app.on_event("startup")
+async def load_template_index():
+    """CIST 질문 템플릿 벡터 인덱스 미리 로드 (실패 시 첫 평가 턴에서 다시 로드)"""
+    await workflow.template_index.warm_tokenizer()
+    try:
+        await workflow.template_index.load(await get_supabase_admin_async())
+    except Exception as e:
+        print(f"❌ 질문 템플릿 인덱스 로드 실패: {e}")
+
+@app.on_event("startup")
+async def check_jwt_verification():
+    """로컬 JWT 검증 키를 확보할 수 없으면 시작 시 경고 (인증이 매번 원격 호출로 처리됨)"""
+    await check_local_verification()
+
+@app.on_event("shutdown")
+async def flush_pending_writes():
+    """종료 전 write-behind 버퍼에 남은 세션/대화 레코드 저장 및 대기 중인 질문 생성 작업 발행"""
+    await workflow.conversation_writer.close()
+    await workflow.question_scheduler.close()
+
 async def create_session(user_id: str, conversation_id: str, photo_id: str = None) -> str:
-    """새로운 대화 세션을 생성하고 세션 ID 반환"""
+    """새로운 대화 세션을 생성하고 세션 ID 반환
+    
+    세션은 write-behind 버퍼를 통해 한 번의 멱등 upsert로 저장되며, 같은 배치의 대화 레코드보다 먼저 저장된다.
+    이미 존재하는 세션은 그대로 유지되고, 이 워커에서 최근 생성한 세션이면 DB에 접근하지 않는다.
+    """
     try:
         # conversation_id를 session_id로 사용
         session_id = conversation_id
         
-        print(f"🔍 세션 생성 시도: session_id={session_id}, user_id={user_id}, photo_id={photo_id}")
-        
-        # 기존 세션 확인
-        existing_session = supabase_admin.table("sessions").select("*").eq("id", session_id).execute()
-        
-        if existing_session.data:
-            print(f"✅ 기존 세션 발견: {session_id}")
+        # 재연결 등으로 최근에 이미 생성한 세션이면 바로 반환
+        if session_id in known_sessions:
+            print(f"✅ 최근 생성된 세션 재사용: {session_id}")
             return session_id
         
-        # sessions 테이블에 새 세션 생성
+        print(f"🔍 세션 생성 시도: session_id={session_id}, user_id={user_id}, photo_id={photo_id}")
+        
+        # sessions 테이블에 새 세션 생성 (selected_photos는 NOT NULL이므로 사진이 없으면 빈 배열)
         session_data = {
             "id": session_id,
             "user_id": user_id,
             "session_type": "reminiscence",  # 추억 회상 대화
-            "status": "active"
+            "status": "active",
+            "selected_photos": [photo_id] if photo_id else []
         }
         
-        # photo_id가 있다면 selected_photos 배열에 추가 (스키마에 맞춤)
-        if photo_id:
-            session_data["selected_photos"] = [photo_id]
-        
         print(f"📝 세션 데이터 생성: {session_data}")
         
-        # Supabase 서비스 역할로 세션 생성
-        result = supabase_admin.table("sessions").insert(session_data).execute()
-        
-        if not result.data:
-            print(f"❌ 세션 생성 실패: 응답 데이터가 없음")
-            raise Exception("세션 생성 실패 - 응답 데이터 없음")
+        # Supabase 서비스 역할로 세션 upsert 예약
+        supabase_admin = await get_supabase_admin_async()
+        workflow.conversation_writer.submit_session(
+            supabase_admin,
+            session_data,
+            # 저장이 최종 실패하면 다음 연결에서 다시 생성하도록 제거
+            on_failure=lambda row: known_sessions.pop(row["id"])
+        )
+        known_sessions.set(session_id, True)
         
-        print(f"✅ 새 세션 생성 성공: {session_id} (사용자: {user_id}, 사진: {photo_id})")
+        print(f"✅ 세션 저장 예약: {session_id} (사용자: {user_id}, 사진: {photo_id})")
         return session_id
         
     except Exception as e:
@@ -84,6 +115,8 @@ async def websocket_chat_endpoint(websocket: WebSocket, conversation_id: str):
     print(f"🌐 WebSocket 연결 요청: conversation_id={conversation_id}, client={client_host}:{client_port}")
     
     await websocket.accept()
+    metrics.WEBSOCKET_CONNECTIONS.inc()
+    metrics.WEBSOCKET_CONNECTIONS_TOTAL.inc()
     print(f"✅ WebSocket 연결 수락 완료: conversation_id={conversation_id}")
     
     user_authenticated = False
@@ -143,6 +176,9 @@ async def websocket_chat_endpoint(websocket: WebSocket, conversation_id: str):
                         "user_id": user_id
                     }))
                     
+                    # 첫 메시지 전에 세션 상태 복원 및 첫 두 턴 응답 미리 준비
+                    workflow.schedule_prime_session(conversation_id, photo_id, await get_supabase_admin_async())
+                    
                 except Exception as e:
                     print(f"인증 실패: {type(e).__name__}: {str(e)}")
                     import traceback
@@ -182,16 +218,37 @@ async def websocket_chat_endpoint(websocket: WebSocket, conversation_id: str):
                 "conversation_id": conversation_id
             }))
             
-            # LangGraph 워크플로우 실행 (인증된 클라이언트 전달)
-            response = await workflow.process_message(workflow_input, authenticated_client=supabase_admin)
-            
-            # 응답 전송
-            await websocket.send_text(json.dumps({
-                "type": "response",
-                "data": response,
-                "conversation_id": conversation_id,
-                "timestamp": datetime.now().isoformat()
-            }, ensure_ascii=False))
+            # 스트리밍 모드: 응답 토큰을 "response_delta"로 먼저 보내고 마지막에 전체 "response" 전송
+            if message_data.get("stream"):
+                with metrics.TURN_DURATION_SECONDS.time(mode="stream"):
+                    async for event in workflow.stream_message(workflow_input, authenticated_client=await get_supabase_admin_async()):
+                        if event["type"] == "response_delta":
+                            await websocket.send_text(json.dumps({
+                                "type": "response_delta",
+                                "delta": event["delta"],
+                                "conversation_id": conversation_id
+                            }, ensure_ascii=False))
+                        else:
+                            await websocket.send_text(json.dumps({
+                                "type": "response",
+                                "data": event["data"],
+                                "metadata": event["metadata"],
+                                "conversation_id": conversation_id,
+                                "timestamp": datetime.now().isoformat()
+                            }, ensure_ascii=False))
+                continue
+
+            with metrics.TURN_DURATION_SECONDS.time(mode="batch"):
+                # LangGraph 워크플로우 실행 (인증된 클라이언트 전달)
+                response = await workflow.process_message(workflow_input, authenticated_client=await get_supabase_admin_async())
+
+                # 응답 전송
+                await websocket.send_text(json.dumps({
+                    "type": "response",
+                    "data": response,
+                    "conversation_id": conversation_id,
+                    "timestamp": datetime.now().isoformat()
+                }, ensure_ascii=False))
             
     except WebSocketDisconnect:
         print(f"WebSocket disconnected for conversation: {conversation_id}")
@@ -216,6 +273,8 @@ async def websocket_chat_endpoint(websocket: WebSocket, conversation_id: str):
             }))
         except:
             pass
+    finally:
+        metrics.WEBSOCKET_CONNECTIONS.dec()
 
 @app.get("/")
 def read_root():
@@ -227,5 +286,21 @@ def health_check():
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "openai_configured": bool(os.getenv("OPENAI_API_KEY")),
-        "supabase_configured": bool(os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_ANON_KEY"))
-    }
\ No newline at end of file
+        "supabase_configured": bool(os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_ANON_KEY")),
+        "write_buffer": workflow.conversation_writer.stats(),
+        "routing_paths": workflow.route_classifier.stats(),
+        "speculation": workflow.speculation_stats,
+        "llm_latency": workflow.latency_tracker.stats(),
+        "template_index": workflow.template_index.stats(),
+        "question_jobs": workflow.question_scheduler.stats(),
+        "response_cache": workflow.response_cache.stats(),
+        "photo_cache": photo_cache.stats(),
+        "photo_question_bank": photo_question_bank.stats(),
+        "prompt_cache": workflow.prompt_cache_stats,
+        "llm_gateway": llm_gateway.stats()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """Prometheus 텍스트 형식 지표 (노드/LLM/Supabase/WebSocket/턴 지연 시간, 라우팅·응답 출처 분포)"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
\ No newline at end of file
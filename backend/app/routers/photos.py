@@ -4,10 +4,13 @@ import uuid
 from datetime import datetime
 import tempfile
 import os
+import asyncio
 
 from core.auth import get_supabase_user
-from core.config import supabase_admin, settings
+from core.config import supabase_admin
 from services.image_analyzer import ImageAnalyzer
+from services.photo_cache import photo_cache
+from services.photo_question_bank import photo_question_bank
 
 router = APIRouter()
 
@@ -87,6 +90,17 @@ async def analyze_photo(
                 detail="분석 결과 저장에 실패했습니다."
             )
         
+        # 대화 워크플로우가 새 분석 결과를 다시 읽도록 사진 컨텍스트 캐시 무효화
+        photo_cache.invalidate(photo_id)
+        
+        # 분석 결과로 사진별 평가 질문 뱅크를 백그라운드에서 미리 생성 (대화 중에는 조회만)
+        photo_question_bank.invalidate(photo_id)
+        try:
+            from tasks import generate_photo_question_bank
+            await asyncio.to_thread(generate_photo_question_bank.delay, photo_id)
+        except Exception as e:
+            print(f"❌ 사진 질문 뱅크 생성 작업 발행 실패: photo_id={photo_id}: {e}")
+        
         return PhotoAnalysisResponse(
             photo_id=photo_id,
             analysis_result=analysis_result,
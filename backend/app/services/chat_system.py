@@ -8,6 +8,7 @@ import numpy as np
 from datetime import datetime
 import soundfile as sf
 from core.config import settings
+from core.llm_gateway import llm_gateway
 
 @dataclass
 class StrangeResponse:
@@ -48,6 +49,7 @@ class ChatSystem:
             api_version=self.api_version,
             azure_endpoint=self.endpoint,
             api_key=self.api_key,
+            max_retries=0,  # 재시도/속도 제한은 llm_gateway에서 처리
         )
         
         self.conversation_history = []
@@ -172,7 +174,8 @@ class ChatSystem:
     
     def generate_initial_question(self):
         """첫 질문 생성"""
-        response = self.client.chat.completions.create(
+        response = llm_gateway.chat_completion(
+            self.client,
             model=self.deployment,
             messages=self.conversation_history + [
                 {"role": "user", "content": "어르신께 따듯하고 친근하게 사진에 대하여 질문을 해주세요. 50자 이내로 간결하게 질문해주세요."}
@@ -222,7 +225,8 @@ class ChatSystem:
             return answer, True
         
         # AI 응답 생성
-        response = self.client.chat.completions.create(
+        response = llm_gateway.chat_completion(
+            self.client,
             model=self.deployment,
             messages=self.conversation_history,
             max_tokens=1024,
@@ -273,7 +277,8 @@ class ChatSystem:
             return answer, True
         
         # AI 응답 생성
-        response = self.client.chat.completions.create(
+        response = llm_gateway.chat_completion(
+            self.client,
             model=self.deployment,
             messages=self.conversation_history,
             max_tokens=1024,
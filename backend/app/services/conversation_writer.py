@@ -0,0 +1,397 @@
+"""
+대화 레코드 write-behind 버퍼
+응답 전송 경로에서 DB 쓰기를 분리하고, 워커의 모든 연결에서 들어온 세션 upsert와 대화 레코드를 모아
+크기/시간 임계치마다 일괄(bulk) 저장한다. 배치는 제출된 순서(FIFO)대로 저장된다.
+일시적 오류(연결 실패 등)로 실패한 레코드는 백오프 시각까지 버퍼로 되돌려 작업 태스크가 다른 레코드를 계속 저장하고,
+그 밖의 오류는 한 건씩 다시 저장해 문제가 있는 레코드만 실패 처리한다.
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from supabase import AsyncClient
+
+from core.cache import TTLCache
+from core.metrics import SUPABASE_QUERY_SECONDS
+
+# conversations (session_id, conversation_order) 유니크 제약 위반 (PostgreSQL unique_violation)
+UNIQUE_VIOLATION = "23505"
+
+# 다시 시도하면 성공할 수 있는 PostgreSQL 오류 클래스 (연결 예외 / 트랜잭션 롤백 / 자원 부족 / 운영자 개입)
+TRANSIENT_SQLSTATE_CLASSES = ("08", "40", "53", "57")
+
+
+@dataclass
+class PendingWrite:
+    """저장 대기 중인 레코드 (대화 또는 세션)"""
+    client: AsyncClient
+    row: Dict[str, Any]
+    on_failure: Optional[Callable[[Dict[str, Any]], None]] = None
+    on_renumber: Optional[Callable[[Dict[str, Any]], None]] = None
+    attempts: int = 0  # 일시적 오류로 실패한 횟수
+    retry_at: float = 0.0  # 다음 저장 시도 시각 (time.monotonic 기준)
+
+
+class ConversationWriter:
+    """워커 단위 write-behind 버퍼 (단일 작업 태스크가 버퍼를 순서대로 비움)"""
+
+    def __init__(
+        self,
+        max_retries: int = 5,
+        retry_base_delay: float = 0.5,
+        flush_max_rows: int = 50,
+        flush_interval: float = 0.5,
+        failed_session_ttl: float = 600,
+    ):
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.flush_max_rows = flush_max_rows
+        self.flush_interval = flush_interval
+
+        self._rows: List[PendingWrite] = []
+        self._sessions: Dict[str, PendingWrite] = {}  # session_id → 대기 중인 upsert, 같은 세션은 한 번만 저장
+        self._in_flight = 0
+        self._pending_by_session: Dict[str, int] = {}
+        self._requeued: List[PendingWrite] = []  # 이번 플러시에서 일시적 오류로 버퍼에 되돌릴 대화 레코드
+        # 저장이 최종 실패한 세션 (이후 배치의 대화 레코드도 외래 키 위반이므로 쓰지 않음, 세션을 다시 제출하면 해제)
+        self._failed_sessions = TTLCache(max_size=10000, ttl_seconds=failed_session_ttl)
+        self._worker: Optional[asyncio.Task] = None
+        self._has_items: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Condition] = None
+
+        # 플러시 통계
+        self.flush_count = 0
+        self.rows_flushed = 0
+        self.sessions_flushed = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self._total_flush_seconds = 0.0
+
+    def submit(
+        self,
+        client: AsyncClient,
+        row: Dict[str, Any],
+        on_failure: Optional[Callable[[Dict[str, Any]], None]] = None,
+        on_renumber: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> None:
+        """대화 레코드를 버퍼에 넣고 즉시 반환 (실제 쓰기는 백그라운드에서 일괄 수행)"""
+        self._ensure_worker()
+        session_id = row["session_id"]
+        self._pending_by_session[session_id] = self._pending_by_session.get(session_id, 0) + 1
+        self._rows.append(PendingWrite(client, row, on_failure, on_renumber))
+        self._signal()
+
+    def submit_session(
+        self,
+        client: AsyncClient,
+        session_row: Dict[str, Any],
+        on_failure: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> None:
+        """세션 upsert를 버퍼에 넣고 즉시 반환 (같은 배치의 대화 레코드보다 먼저 저장됨)"""
+        self._ensure_worker()
+        self._failed_sessions.pop(session_row["id"])
+        self._sessions.setdefault(session_row["id"], PendingWrite(client, session_row, on_failure))
+        self._signal()
+
+    async def wait_for_session(self, session_id: str, timeout: float = 5.0) -> bool:
+        """해당 세션의 대기 중인 쓰기가 모두 끝날 때까지 대기 (DB에서 히스토리를 다시 읽기 전에 사용)"""
+        if not self._pending_by_session.get(session_id) or self._idle is None:
+            return True
+        # 시간 임계치를 기다리지 않고 바로 플러시
+        self._full.set()
+        try:
+            async with self._idle:
+                await asyncio.wait_for(
+                    self._idle.wait_for(lambda: not self._pending_by_session.get(session_id)),
+                    timeout
+                )
+            return True
+        except asyncio.TimeoutError:
+            print(f"⚠️ 대화 저장 대기 시간 초과: session_id={session_id}")
+            return False
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """버퍼에 남은 쓰기를 모두 저장한 뒤 작업 태스크 종료 (서버 종료 시 호출)"""
+        if self._worker is None:
+            return
+        self._full.set()
+        try:
+            async with self._idle:
+                await asyncio.wait_for(self._idle.wait_for(lambda: self.queue_depth == 0), timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ 종료 시 저장되지 못한 레코드: {self.queue_depth}개")
+        self._worker.cancel()
+        self._worker = None
+
+    @property
+    def queue_depth(self) -> int:
+        """저장되지 않은 레코드 수 (버퍼 + 저장 중)"""
+        return len(self._rows) + len(self._sessions) + self._in_flight
+
+    def stats(self) -> Dict[str, Any]:
+        """버퍼 깊이 및 플러시 지연 통계"""
+        return {
+            "queue_depth": self.queue_depth,
+            "flush_count": self.flush_count,
+            "rows_flushed": self.rows_flushed,
+            "sessions_flushed": self.sessions_flushed,
+            "last_flush_seconds": round(self.last_flush_seconds, 4),
+            "avg_flush_seconds": round(self._total_flush_seconds / self.flush_count, 4) if self.flush_count else 0.0,
+            "max_flush_seconds": round(self.max_flush_seconds, 4),
+        }
+
+    def _ensure_worker(self) -> None:
+        if self._idle is None:
+            self._has_items = asyncio.Event()
+            self._full = asyncio.Event()
+            self._idle = asyncio.Condition()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    def _signal(self) -> None:
+        self._has_items.set()
+        if len(self._rows) + len(self._sessions) >= self.flush_max_rows:
+            self._full.set()
+
+    async def _run(self) -> None:
+        while True:
+            await self._has_items.wait()
+            # 크기 임계치에 도달하지 않았으면 시간 임계치까지 더 모음
+            if not self._full.is_set():
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            try:
+                flushed = await self._flush()
+            except Exception as e:
+                # 한 배치의 예기치 못한 오류로 작업 태스크가 종료되지 않도록 함
+                print(f"❌ 대화 배치 저장 중 오류: {type(e).__name__}: {str(e)}")
+                continue
+            if not flushed:
+                # 남은 레코드가 모두 재시도 대기 중이면 가장 이른 재시도 시각까지 (길어도 시간 임계치만큼) 대기
+                await asyncio.sleep(min(self._next_retry_delay(), self.flush_interval))
+
+    def _next_retry_delay(self) -> float:
+        now = time.monotonic()
+        pending = [*self._rows, *self._sessions.values()]
+        return max(min((p.retry_at for p in pending), default=now) - now, 0.0)
+
+    async def _flush(self) -> bool:
+        """재시도 시각이 된 레코드로 한 배치를 꺼내 세션 → 대화 레코드 순으로 일괄 저장 (꺼낼 레코드가 없으면 False)"""
+        now = time.monotonic()
+        sessions = [p for p in self._sessions.values() if p.retry_at <= now]
+        for pending in sessions:
+            del self._sessions[pending.row["id"]]
+        batch = [p for p in self._rows if p.retry_at <= now][:self.flush_max_rows]
+        if batch:
+            taken = set(map(id, batch))
+            self._rows = [p for p in self._rows if id(p) not in taken]
+        if not self._rows and not self._sessions:
+            self._has_items.clear()
+        if len(self._rows) < self.flush_max_rows:
+            self._full.clear()
+        if not sessions and not batch:
+            return False
+        self._in_flight = len(sessions) + len(batch)
+        self._requeued = []
+
+        started = time.perf_counter()
+        try:
+            deferred_sessions = await self._write_sessions(sessions) if sessions else {}
+            if batch:
+                await self._write_rows(batch, deferred_sessions)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.flush_count += 1
+            self.rows_flushed += len(batch)
+            self.sessions_flushed += len(sessions)
+            self.last_flush_seconds = elapsed
+            self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+            self._total_flush_seconds += elapsed
+
+            for pending in batch:
+                session_id = pending.row["session_id"]
+                remaining = self._pending_by_session.get(session_id, 1) - 1
+                if remaining > 0:
+                    self._pending_by_session[session_id] = remaining
+                else:
+                    self._pending_by_session.pop(session_id, None)
+            # 재시도 대기 레코드는 새로 들어온 레코드보다 앞에 (제출 순서 유지)
+            if self._requeued:
+                self._rows[:0] = self._requeued
+                self._has_items.set()
+            self._in_flight = 0
+            async with self._idle:
+                self._idle.notify_all()
+        return True
+
+    async def _write_sessions(self, sessions: List[PendingWrite]) -> Dict[str, float]:
+        """세션 일괄 upsert (이미 있는 세션은 그대로 둠)
+
+        일시적 오류로 재시도 대기열에 되돌린 session_id → 재시도 시각을 반환한다.
+        최종 실패한 세션은 _failed_sessions에 남겨 이후 배치의 대화 레코드를 쓰지 않는다.
+        """
+        deferred: Dict[str, float] = {}
+        for client, pendings in self._group_by_client([(p.client, p) for p in sessions]):
+            rows = [p.row for p in pendings]
+            error = await self._upsert_sessions(client, rows)
+            if error is None:
+                print(f"✅ 세션 일괄 저장 성공: {len(rows)}개")
+                continue
+            print(f"❌ 세션 일괄 저장 실패 ({pendings[0].attempts + 1}/{self.max_retries}): {type(error).__name__}: {str(error)}")
+
+            # 일시적 오류가 아니면 문제가 있는 세션만 실패하도록 한 건씩 저장
+            errors = [error] * len(pendings)
+            if not self._is_transient(error) and len(pendings) > 1:
+                errors = [await self._upsert_sessions(client, [pending.row]) for pending in pendings]
+
+            for pending, pending_error in zip(pendings, errors):
+                if pending_error is None:
+                    continue
+                if self._is_transient(pending_error) and self._defer(pending):
+                    self._sessions.setdefault(pending.row["id"], pending)
+                    deferred[pending.row["id"]] = pending.retry_at
+                    continue
+                print(f"❌ 세션 저장 최종 실패: session_id={pending.row['id']}")
+                self._failed_sessions.set(pending.row["id"], True)
+                if pending.on_failure:
+                    pending.on_failure(pending.row)
+        return deferred
+
+    @staticmethod
+    async def _upsert_sessions(client: AsyncClient, rows: List[Dict[str, Any]]) -> Optional[Exception]:
+        """세션 upsert 한 번 실행 (실패하면 예외 반환)"""
+        try:
+            with SUPABASE_QUERY_SECONDS.time(table="sessions", operation="upsert"):
+                await client.table("sessions").upsert(
+                    rows, on_conflict="id", ignore_duplicates=True
+                ).execute()
+            return None
+        except Exception as e:
+            return e
+
+    async def _write_rows(self, batch: List[PendingWrite], deferred_sessions: Dict[str, float] = None) -> None:
+        """대화 레코드 일괄 저장 (일시적 오류가 아니면 해당 배치만 한 건씩 저장)
+
+        세션 저장이 최종 실패한 대화 레코드는 외래 키 위반으로 어차피 실패하므로 쓰지 않고 바로 실패 처리하고,
+        세션이 재시도 대기 중인 레코드는 세션과 같은 시각까지 버퍼로 되돌린다.
+        """
+        deferred_sessions = deferred_sessions or {}
+        writable = []
+        for pending in batch:
+            session_id = pending.row["session_id"]
+            if session_id in deferred_sessions:
+                pending.retry_at = deferred_sessions[session_id]
+                self._requeue(pending)
+            elif session_id in self._failed_sessions:
+                print(f"❌ 세션 저장 실패로 대화 저장 건너뜀: session_id={session_id}, 순서={pending.row['conversation_order']}")
+                if pending.on_failure:
+                    pending.on_failure(pending.row)
+            else:
+                writable.append(pending)
+
+        for client, pendings in self._group_by_client([(p.client, p) for p in writable]):
+            rows = [p.row for p in pendings]
+            try:
+                # 재시도 시 이미 저장된 레코드(같은 id)는 무시되어 중복 저장되지 않음
+                with SUPABASE_QUERY_SECONDS.time(table="conversations", operation="upsert"):
+                    await client.table("conversations").upsert(
+                        rows, on_conflict="id", ignore_duplicates=True
+                    ).execute()
+                print(f"✅ 대화 일괄 저장 성공: {len(rows)}개")
+                continue
+            except Exception as e:
+                print(f"❌ 대화 일괄 저장 실패 ({pendings[0].attempts + 1}/{self.max_retries}): {type(e).__name__}: {str(e)}")
+                if self._is_transient(e):
+                    for pending in pendings:
+                        self._retry_or_fail(pending)
+                    continue
+
+            # 순서 충돌/외래 키 위반 등 일부 레코드의 문제일 수 있으므로 한 건씩 저장
+            for pending in pendings:
+                await self._write_row(pending)
+
+    async def _write_row(self, pending: PendingWrite) -> None:
+        """레코드 한 건 저장 (다른 연결/워커와 순서가 충돌하면 서버의 마지막 순서 다음으로 재배정)
+
+        일시적 오류면 버퍼로 되돌리고, 그 밖의 오류는 재시도해도 같으므로 바로 실패 처리한다.
+        """
+        row = pending.row
+        for _ in range(self.max_retries):
+            try:
+                with SUPABASE_QUERY_SECONDS.time(table="conversations", operation="upsert"):
+                    await pending.client.table("conversations").upsert(
+                        row, on_conflict="id", ignore_duplicates=True
+                    ).execute()
+                return
+            except Exception as e:
+                error = e
+                if getattr(e, "code", None) == UNIQUE_VIOLATION:
+                    try:
+                        row["conversation_order"] = await self._next_order(pending.client, row["session_id"])
+                    except Exception as order_error:
+                        error = order_error
+                    else:
+                        print(f"⚠️ 대화 순서 충돌, {row['conversation_order']}번으로 재배정: session_id={row['session_id']}")
+                        if pending.on_renumber:
+                            pending.on_renumber(row)
+                        continue
+
+                print(f"❌ 대화 저장 실패: session_id={row['session_id']}, {type(error).__name__}: {str(error)}")
+                if self._is_transient(error):
+                    self._retry_or_fail(pending)
+                    return
+                break
+
+        print(f"❌ 대화 저장 최종 실패: session_id={row['session_id']}, 순서={row['conversation_order']}")
+        if pending.on_failure:
+            pending.on_failure(row)
+
+    def _retry_or_fail(self, pending: PendingWrite) -> None:
+        """일시적 오류로 실패한 대화 레코드를 버퍼로 되돌림 (재시도 횟수를 다 썼으면 실패 처리)"""
+        if self._defer(pending):
+            self._requeue(pending)
+            return
+        print(f"❌ 대화 저장 최종 실패: session_id={pending.row['session_id']}, 순서={pending.row['conversation_order']}")
+        if pending.on_failure:
+            pending.on_failure(pending.row)
+
+    def _defer(self, pending: PendingWrite) -> bool:
+        """실패 횟수를 늘리고 지수 백오프로 다음 시도 시각 설정 (재시도 횟수를 다 썼으면 False)"""
+        pending.attempts += 1
+        if pending.attempts >= self.max_retries:
+            return False
+        pending.retry_at = time.monotonic() + self.retry_base_delay * (2 ** (pending.attempts - 1))
+        return True
+
+    def _requeue(self, pending: PendingWrite) -> None:
+        """꺼낸 대화 레코드를 플러시가 끝나면 버퍼 앞쪽에 되돌리도록 표시 (플러시가 끝날 때 빠지는 세션별 대기 수를 다시 채움)"""
+        session_id = pending.row["session_id"]
+        self._pending_by_session[session_id] = self._pending_by_session.get(session_id, 0) + 1
+        self._requeued.append(pending)
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        """다시 시도할 만한 오류인지 (오류 코드가 없는 네트워크/시간 초과 오류 포함, PGRST 코드는 요청 자체의 문제)"""
+        code = getattr(error, "code", None)
+        if not code:
+            return True
+        return len(code) == 5 and code[:2] in TRANSIENT_SQLSTATE_CLASSES
+
+    async def _next_order(self, client: AsyncClient, session_id: str) -> int:
+        with SUPABASE_QUERY_SECONDS.time(table="conversations", operation="select"):
+            response = await client.table("conversations").select(
+                "conversation_order"
+            ).eq("session_id", session_id).order("conversation_order", desc=True).limit(1).execute()
+        return response.data[0]["conversation_order"] + 1 if response.data else 1
+
+    @staticmethod
+    def _group_by_client(items: List[tuple]) -> List[tuple]:
+        """(client, item) 목록을 클라이언트별로 묶음 (제출 순서 유지)"""
+        groups: Dict[int, tuple] = {}
+        for client, item in items:
+            groups.setdefault(id(client), (client, []))[1].append(item)
+        return list(groups.values())
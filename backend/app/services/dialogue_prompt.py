@@ -16,9 +16,9 @@ ROUTER_PROMPT = """
 1. 트리거 확인: 각 평가항목의 트리거 충족 여부를 검사한다.
 2. 항목 선택: 아래 평가항목 중 "트리거 조건"을 만족하고 현재 대화 맥락에 가장 적합한 평가항목을 하나 선택합니다.
 3. 맥락 적합성 평가: 선택된 평가항목이 현재 대화 맥락에 맞지 않는다면 실행하지 않는다.
-4. 출력 규칙
-  - 적합하지 않음 → ["standard_chat"]
-  - 적합함 → ["assessment_chat", "<항목명>"]
+4. 출력 규칙 (JSON 객체)
+  - 적합하지 않음 → {"route": "standard_chat", "assessment_item": null}
+  - 적합함 → {"route": "assessment_chat", "assessment_item": "<항목명>"}
     - <항목명>은 "registration" 또는 "recall" 중 하나
 5. 중복 제한: 같은 평가항목은 한 세션에서 1회만 사용 가능하다.
 6. 턴 제어
@@ -125,12 +125,6 @@ STANDARD_RESPONSE_PROMPT = """
 - 사용자가 최대한 쉽게 대화를 이어가도록 대화를 구성해.
 
 
-# Context 
-- 사진 메타데이터: {photo_description}
-- 사용자 메시지: {user_message}
-- 대화 히스토리: {message_history}
-
-
 # Constraints 
 ## 1. 대화 구조
 - 사용자 발화에 대한 공감/호응
@@ -165,6 +159,19 @@ STANDARD_RESPONSE_PROMPT = """
 챗봇: "와 재밌겠다. 근데 저는 화투를 치면 항상 지더라구요. 혹시 화투 잘치시나요? 가족 중에 화투를 제일 잘치는 분이 누구셨어요?"
 """
 
+# standard_response_node 사진 컨텍스트 (사진이 바뀌지 않는 한 매 턴 동일 → 고정 지시문과 함께 프롬프트 캐시 접두부를 이룸)
+STANDARD_RESPONSE_PHOTO_CONTEXT = """
+
+# Context
+- 사진 메타데이터: {photo_description}
+"""
+
+# standard_response_node 턴별 입력 (매 턴 바뀌는 내용은 항상 프롬프트 끝에 둠)
+STANDARD_RESPONSE_TURN_PROMPT = """- 대화 히스토리:
+{message_history}
+
+- 사용자 메시지: {user_message}"""
+
 
 
 # cache_retrieve_and_evaluate_node 프롬프트
@@ -262,6 +269,76 @@ BRIDGE_PROMPT = """
 
 
 
+# 사진별 평가 질문 뱅크 생성 프롬프트 (사진 분석 직후 Celery 작업에서 사용, 응답 형식은 photo_question_bank.PHOTO_QUESTION_BANK_RESPONSE_FORMAT)
+PHOTO_QUESTION_BANK_SYSTEM_PROMPT = """
+너는 어르신과 사진으로 회상 대화를 나누며 인지기능(CIST 기억등록/기억회상)을 평가하는 대화 설계 전문가야.
+사진 정보만 보고 대화 중에 바로 쓸 수 있는 평가질문 세트를 만들고, 지정된 JSON 형식으로만 응답해.
+"""
+
+PHOTO_QUESTION_BANK_PROMPT = """
+# Instruction
+- 아래 사진 정보를 보고 어르신과 이 사진으로 회상 대화를 할 때 쓸 기억등록/기억회상 평가질문 세트를 {pair_count}개 만들어.
+- 각 세트는 사진 속 사물·장소·활동과 관련된 같은 종류의 단어 3개를 사용해.
+
+
+# Context
+- 사진 정보: {photo_description}
+
+
+# Constraints
+1. 기억등록 질문은 단어 3개를 직접 말하고 순서대로 말씀해 달라고 요청
+2. 기억회상 질문은 단어를 다시 말하지 않고 "아까 말씀드린 ~ 3개"처럼 같은 세트의 단어를 떠올리게 요청
+3. 브릿지 문장은 사진 이야기에서 평가질문으로 자연스럽게 넘어가는 한 문장 (평가질문은 포함하지 말 것)
+4. 친근한 존댓말, 질문은 50자 내외
+5. 세트마다 단어 종류(과일, 교통수단, 동물, 음식 재료 등)를 다르게
+6. 난이도(difficulty)는 1~5 사이 정수
+7. 다른 설명 없이 JSON으로만 응답:
+{{
+    "question_sets": [
+        {{
+            "words": ["사과", "바나나", "복숭아"],
+            "difficulty": 1,
+            "registration": {{"bridge": "...", "question": "..."}},
+            "recall": {{"bridge": "...", "question": "..."}}
+        }}
+    ]
+}}
+"""
+
+
+
+# 고품질 평가 질문 생성 프롬프트 (Celery 작업의 즉시 생성과 Batch API 요청 파일에서 함께 사용)
+HIGH_QUALITY_QUESTION_SYSTEM_PROMPT = "당신은 치매 진단 전문가입니다."
+
+HIGH_QUALITY_QUESTION_PROMPT = """
+다음 대화 맥락을 바탕으로 치매 진단에 유용한 고품질 인지기능 평가 질문을 5개 생성하세요.
+
+사용자 메시지: {user_messages}
+사진 정보: {photo_context}
+{focus}
+
+각 질문은 다음 카테고리 중 하나에 해당해야 합니다:
+- orientation_time: 시간 지남력
+- orientation_place: 장소 지남력
+- memory_registration: 기억 등록
+- memory_recall: 기억 회상
+- attention: 주의력
+- executive_function: 실행기능
+- language_naming: 언어 명명
+
+JSON 형식으로 응답:
+[
+    {{
+        "category": "orientation_time",
+        "question": "지금이 몇 시인지 알 수 있나요?",
+        "difficulty": 2
+    }},
+    ...
+]
+"""
+
+
+
 # fallback_node 프롬프트
 FALLBACK_PROMPT = """
 # Instruction
@@ -284,3 +361,22 @@ FALLBACK_PROMPT = """
 사용자: "사진 속 강아지 이름은 아롱이야"  
 챗봇: "아, 아롱이라고 하는구나. 생긴 것만큼 이름도 정말 귀여워요! 누가 지은 이름인가요?"
 """
+
+
+
+# 대화 히스토리 요약 프롬프트 (최근 턴 창 밖으로 밀려난 대화를 누적 요약에 합침)
+HISTORY_SUMMARY_PROMPT = """
+# Instruction
+- 노인 사용자와 사진을 보며 나눈 회상 대화의 누적 요약을 갱신하는 역할
+
+
+# Context
+- 기존 요약과 새로 요약에 합칠 대화가 주어짐
+
+
+# Constraints
+- 사진 속 인물/장소/사건, 사용자가 말한 이름과 기억, 감정 등 이후 대화에 필요한 사실 위주로 정리
+- 평가 질문(날짜, 사물 이름 등)에 대한 사용자 답변이 있으면 간단히 남길 것
+- 기존 요약의 내용은 유지하면서 새 대화 내용을 합칠 것
+- 전체 300자 이내, 불릿 없이 문장으로 출력
+"""
@@ -1,19 +1,48 @@
-from typing import TypedDict, List, Dict, Any, Optional
+from typing import TypedDict, List, Dict, Any, Optional, AsyncIterator
 from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_openai import ChatOpenAI
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langgraph.graph import StateGraph, END
 import os
-from supabase import create_client, Client
+import asyncio
+import time
+from supabase import acreate_client, AsyncClient
 import uuid
 from datetime import datetime
 from app.core.config import settings
+from core.llm_gateway import llm_gateway
+from core.metrics import (
+    CACHE_DECISIONS_TOTAL,
+    NODE_DURATION_SECONDS,
+    RESPONSE_SOURCE_TOTAL,
+    ROUTING_DECISIONS_TOTAL,
+    SUPABASE_QUERY_SECONDS,
+)
+from .session_cache import SessionState, SessionStateCache
+from .conversation_writer import ConversationWriter
+from .history_window import HistoryWindow
+from .route_classifier import ROUTER_RESPONSE_FORMAT, RouteClassifier, UNCERTAIN
+from .template_index import TemplateIndex
+from .response_cache import ResponseCache
+from .photo_cache import photo_cache
+from .photo_question_bank import photo_question_bank, render_photo_question, select_photo_question
+from .latency_tracker import LatencyTracker
+from .question_scheduler import QuestionJobScheduler
 from .dialogue_prompt import (
     ROUTER_PROMPT,
     STANDARD_RESPONSE_PROMPT,
+    STANDARD_RESPONSE_PHOTO_CONTEXT,
+    STANDARD_RESPONSE_TURN_PROMPT,
     FALLBACK_PROMPT,
-    CACHE_RETRIEVE_AND_EVALUATE_PROMPT
+    CACHE_RETRIEVE_AND_EVALUATE_PROMPT,
+    HISTORY_SUMMARY_PROMPT
 )
 
+# 스트리밍 모드에서 토큰 단위로 클라이언트에 전달할 응답 생성 노드
+STREAMING_NODES = ("standard_response", "fallback")
+
+# conversations.cist_category → 기억 평가 항목
+MEMORY_CATEGORIES = {"memory_registration": "registration", "memory_recall": "recall"}
+
 class WorkflowInput(TypedDict):
     """그래프 실행을 위해 외부에서 주입되는 초기 데이터"""
     conversation_id: str
@@ -25,6 +54,9 @@ class IntermediateState(TypedDict):
     """노드 간 결정에 사용되는 임시 데이터"""
     cache_score: Optional[float]
     routing_decision: str
+    assessment_item: Optional[str]  # assessment_chat일 때 평가 항목 ("registration" / "recall")
+    speculative_response: Optional[str]  # 라우터와 동시에 미리 생성한 일반 응답
+    template_source: Optional[str]  # 평가 질문 출처 ("photo_bank", 없으면 공용 템플릿 캐시)
 
 class FinalOutput(TypedDict):
     """최종적으로 사용자에게 전달될 결과물"""
@@ -39,9 +71,14 @@ class GraphState(TypedDict):
     output: FinalOutput
     photo_info: Optional[Dict[str, Any]]  # 사진 정보 저장
     session_id: Optional[str]  # 세션 ID 저장
-    _authenticated_client: Optional[Client]  # 인증된 Supabase 클라이언트
+    _authenticated_client: Optional[AsyncClient]  # 인증된 Supabase 클라이언트 (비동기)
     turn_count: int  # 현재 턴 수 (conversation_order 기반)
     assessment_completed: Dict[str, bool]  # 평가 완료 상태 {"time_orientation": bool, "language_naming": bool}
+    history_summary: str  # 최근 턴 창 밖 대화의 누적 요약
+    summarized_count: int  # 요약에 반영된 대화 메시지 수
+    assessment_turns: Dict[str, int]  # 기억등록/회상 평가 항목 → 실행된 턴
+    precomputed_responses: Dict[str, str]  # 평가 노드 → 세션 시작 시 미리 만든 응답
+    assessment_attempt_turn: int  # 마지막으로 기억 평가로 라우팅된 턴
 
 class DialogueWorkflow:
     """LangGraph 기반 대화 워크플로우 시스템"""
@@ -81,14 +118,39 @@ class DialogueWorkflow:
                 "environment": os.getenv("ENVIRONMENT", "development")
             }
             
+            # stream_usage: 스트리밍 응답에서도 usage(캐시 적중 토큰 포함)를 받음
+            # 재시도/속도 제한은 llm_gateway에서 처리 (클라이언트 자체 재시도 끔, 응답 헤더 수집)
             self.llm_mini = ChatOpenAI(
                 model="gpt-4o-mini",
+                stream_usage=True,
+                max_retries=0,
+                include_response_headers=True,
                 api_key=openai_key,
                 metadata=langsmith_metadata if langsmith_tracing else None
             )
             self.llm_nano = ChatOpenAI(
                 model="gpt-4o-mini",
                 max_tokens=256,
+                stream_usage=True,
+                max_retries=0,
+                include_response_headers=True,
+                api_key=openai_key,
+                metadata=langsmith_metadata if langsmith_tracing else None
+            )
+            # 질문 템플릿 검색용 임베딩
+            self.embeddings = OpenAIEmbeddings(
+                model=settings.TEMPLATE_EMBEDDING_MODEL,
+                max_retries=0,
+                api_key=openai_key
+            )
+            # LLM 라우터: 스키마로 고정된 짧은 JSON 객체만 출력하므로 토큰 상한을 작게
+            # (response_format을 쓰면 응답 헤더를 받을 수 없어 include_response_headers는 끔)
+            self.llm_router = ChatOpenAI(
+                model="gpt-4o-mini",
+                max_tokens=settings.ROUTER_LLM_MAX_TOKENS,
+                temperature=0,
+                max_retries=0,
+                model_kwargs={"response_format": ROUTER_RESPONSE_FORMAT},
                 api_key=openai_key,
                 metadata=langsmith_metadata if langsmith_tracing else None
             )
@@ -97,16 +159,83 @@ class DialogueWorkflow:
             print(f"Failed to initialize OpenAI clients: {e}")
             raise
         
-        try:
-            # Supabase 클라이언트
-            self.supabase: Client = create_client(
-                supabase_url=supabase_url,
-                supabase_key=supabase_key
-            )
-            print("Supabase client initialized successfully")
-        except Exception as e:
-            print(f"Failed to initialize Supabase client: {e}")
-            raise
+        # 워커 로컬 세션 상태 캐시 (conversation_id별 히스토리/사진 정보/턴 수)
+        self.session_cache = SessionStateCache(
+            max_sessions=settings.SESSION_CACHE_MAX_SESSIONS,
+            ttl_seconds=settings.SESSION_CACHE_TTL_SECONDS
+        )
+        
+        # 프롬프트용 대화 히스토리 창 (최근 K턴 + 누적 요약)
+        self.history_window = HistoryWindow(
+            recent_turns=settings.HISTORY_RECENT_TURNS,
+            max_tokens=settings.HISTORY_MAX_TOKENS
+        )
+        self._summary_tasks: Dict[str, asyncio.Task] = {}
+        self._prime_tasks: Dict[str, asyncio.Task] = {}
+        
+        # 반복 발화 응답 캐시 (세션·사진별)
+        self.response_cache = ResponseCache(
+            ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+            similarity_threshold=settings.RESPONSE_CACHE_SIMILARITY,
+            min_chars=settings.RESPONSE_CACHE_MIN_CHARS
+        )
+        
+        # CIST 질문 템플릿 벡터 인덱스 (서버 시작 시 로드, 주기적으로 증분 갱신)
+        self.template_index = TemplateIndex(
+            self.embeddings,
+            refresh_interval=settings.TEMPLATE_INDEX_REFRESH_SECONDS
+        )
+        
+        # 고품질 질문 생성 작업 병합 ((photo_id, category)별 디바운스, 템플릿 뱅크가 충분하면 생략)
+        self.question_scheduler = QuestionJobScheduler(
+            self._publish_question_job,
+            self._question_bank_size,
+            debounce_seconds=settings.QUESTION_JOB_DEBOUNCE_SECONDS,
+            cooldown_seconds=settings.QUESTION_JOB_COOLDOWN_SECONDS,
+            saturation=settings.QUESTION_BANK_SATURATION,
+            max_contexts=settings.QUESTION_JOB_MAX_CONTEXTS
+        )
+        
+        # 노드별 프롬프트 캐시 적중 토큰 통계 (node → calls/input_tokens/cached_tokens)
+        self.prompt_cache_stats: Dict[str, Dict[str, int]] = {}
+        
+        # 라우터와 동시에 실행한 일반 응답 생성(추측 실행) 통계
+        self.speculation_stats: Dict[str, float] = {
+            "launched": 0,
+            "committed": 0,
+            "cancelled": 0,
+            "wasted_tokens": 0,
+            "latency_saved_seconds": 0.0
+        }
+        
+        # 노드별 첫 토큰 지연 시간 (p95를 넘기면 헤지 요청)
+        self.latency_tracker = LatencyTracker(
+            window=settings.LATENCY_WINDOW,
+            hedge_percentile=settings.HEDGE_PERCENTILE,
+            min_samples=settings.HEDGE_MIN_SAMPLES,
+            initial_hedge_delay=settings.HEDGE_INITIAL_DELAY_SECONDS,
+            min_hedge_delay=settings.HEDGE_MIN_DELAY_SECONDS
+        )
+        
+        # 라우터 빠른 경로 분류기 (명확한 경우 LLM 라우터 호출 생략)
+        self.route_classifier = RouteClassifier(
+            min_turns_between=settings.ROUTER_MIN_TURNS_BETWEEN_ASSESSMENTS,
+            recall_delay=settings.ROUTER_RECALL_DELAY_TURNS,
+            short_answer_chars=settings.ROUTER_SHORT_ANSWER_CHARS
+        )
+        
+        # 대화 레코드 write-behind 버퍼 (응답 전송 후 크기/시간 임계치마다 일괄 저장)
+        self.conversation_writer = ConversationWriter(
+            max_retries=settings.CONVERSATION_WRITE_MAX_RETRIES,
+            retry_base_delay=settings.CONVERSATION_WRITE_RETRY_BASE_SECONDS,
+            flush_max_rows=settings.CONVERSATION_FLUSH_MAX_ROWS,
+            flush_interval=settings.CONVERSATION_FLUSH_INTERVAL_SECONDS
+        )
+        
+        # 비동기 Supabase 클라이언트 (이벤트 루프에서 최초 사용 시 생성)
+        self._supabase_url = supabase_url
+        self._supabase_key = supabase_key
+        self.supabase: Optional[AsyncClient] = None
         
         try:
             # 워크플로우 구성
@@ -116,18 +245,39 @@ class DialogueWorkflow:
             print(f"Failed to build LangGraph workflow: {e}")
             raise
     
+    async def _get_supabase(self, state: Optional[GraphState] = None) -> AsyncClient:
+        """상태의 인증된 클라이언트 또는 기본 비동기 Supabase 클라이언트 반환"""
+        if state and state.get("_authenticated_client"):
+            return state["_authenticated_client"]
+        if self.supabase is None:
+            try:
+                self.supabase = await acreate_client(self._supabase_url, self._supabase_key)
+                print("Supabase async client initialized successfully")
+            except Exception as e:
+                print(f"Failed to initialize Supabase client: {e}")
+                raise
+        return self.supabase
+    
+    @staticmethod
+    def _timed_node(name: str, node):
+        """노드 실행 시간을 memento_node_duration_seconds에 기록하는 래퍼"""
+        async def run(state: GraphState) -> GraphState:
+            with NODE_DURATION_SECONDS.time(node=name):
+                return await node(state)
+        return run
+    
     def _build_workflow(self):
         """LangGraph 워크플로우 구성"""
         workflow = StateGraph(GraphState)
         
-        # 노드 추가
-        workflow.add_node("init_state", self.init_state_node)
-        workflow.add_node("router", self.router_node)
-        workflow.add_node("time_orientation", self.time_orientation_node)
-        workflow.add_node("language_naming", self.language_naming_node)
-        workflow.add_node("standard_response", self.standard_response_node)
-        workflow.add_node("cache_retrieve", self.cache_retrieve_and_evaluate_node)
-        workflow.add_node("fallback", self.fallback_node)
+        # 노드 추가 (노드별 실행 시간 지표 기록)
+        workflow.add_node("init_state", self._timed_node("init_state", self.init_state_node))
+        workflow.add_node("router", self._timed_node("router", self.router_node))
+        workflow.add_node("time_orientation", self._timed_node("time_orientation", self.time_orientation_node))
+        workflow.add_node("language_naming", self._timed_node("language_naming", self.language_naming_node))
+        workflow.add_node("standard_response", self._timed_node("standard_response", self.standard_response_node))
+        workflow.add_node("cache_retrieve", self._timed_node("cache_retrieve", self.cache_retrieve_and_evaluate_node))
+        workflow.add_node("fallback", self._timed_node("fallback", self.fallback_node))
         
         # 진입점 설정
         workflow.set_entry_point("init_state")
@@ -159,93 +309,232 @@ class DialogueWorkflow:
         
         return workflow.compile()
     
-    def init_state_node(self, state: GraphState) -> GraphState:
-        """상태 초기화 노드: DB에서 대화 기록 및 사진 정보 조회"""
+    async def init_state_node(self, state: GraphState) -> GraphState:
+        """상태 초기화 노드: 세션 캐시 또는 DB에서 대화 기록 및 사진 정보 조회"""
         conversation_id = state["input_data"]["conversation_id"]
         user_id = state["input_data"]["user_id"]
         photo_context = state["input_data"]["photo_context"]
         
-        # 상태에서 인증된 클라이언트 가져오기
-        client = state.get("_authenticated_client", self.supabase)
-        
         print(f"🔍 상태 초기화: conversation_id={conversation_id}, user_id={user_id}")
         
+        # 연결 직후 시작한 세션 준비(prime_session)가 진행 중이면 끝날 때까지 대기
+        prime_task = self._prime_tasks.get(conversation_id)
+        if prime_task:
+            try:
+                await asyncio.shield(prime_task)
+            except Exception:
+                pass
+        
+        # 세션 캐시 적중 시 DB 조회 없이 상태 복원 (같은 사진으로 진행 중인 세션만)
+        session = self._get_cached_session(conversation_id, photo_context.get("photo_id"))
+        if session:
+            print(f"⚡ 세션 캐시 적중: conversation_id={conversation_id}, 현재 턴 수: {session.turn_count}")
+        
         try:
-            # 사진 정보 조회 (photo_context에 photo_id가 있는 경우)
-            photo_info = None
-            if photo_context.get("photo_id"):
-                try:
-                    photo_response = client.table("photos").select(
-                        "id, filename, file_path, description, tags, location_name, photo_analyze_result"
-                    ).eq("id", photo_context["photo_id"]).single().execute()
-                    
-                    if photo_response.data:
-                        photo_info = photo_response.data
-                        print(f"📷 사진 정보 로드됨: {photo_info}")
-                except Exception as photo_error:
-                    print(f"❌ 사진 정보 로드 실패: {photo_error}")
-            
-            # conversation_id를 session_id로 사용 (main.py에서 이미 세션 생성됨)
-            session_id = conversation_id
-            print(f"✅ 세션 ID 설정: {session_id}")
-            
-            # 해당 세션의 기존 대화 내역 조회
-            conversations_response = client.table("conversations").select(
-                "id, ai_output, user_input, conversation_order"
-            ).eq("session_id", session_id).order("conversation_order").execute()
-            
-            print(f"💬 기존 대화 내역: {len(conversations_response.data) if conversations_response.data else 0}개")
-            
-            # 현재 턴 수 계산 (다음 conversation_order)
-            current_turn = len(conversations_response.data) + 1 if conversations_response.data else 1
-            print(f"📊 현재 턴 수: {current_turn}")
-            
-            # 메시지 히스토리 구성
-            system_content = "당신은 치매 진단을 위한 따뜻한 대화 시스템입니다."
-            if photo_info:
-                system_content += f" 현재 사진 정보: 파일명({photo_info.get('filename', 'N/A')}), 설명({photo_info.get('description', 'N/A')}), 위치({photo_info.get('location_name', 'N/A')}), 태그({', '.join(photo_info.get('tags', []))})"
-            
-            message_history = [{"role": "system", "content": system_content}]
-            
-            # 기존 대화 내용 추가
-            if conversations_response.data:
-                for conv in conversations_response.data:
-                    if conv.get("ai_output"):
-                        message_history.append({
-                            "role": "assistant", 
-                            "content": conv["ai_output"]
-                        })
-                    if conv.get("user_input"):
-                        message_history.append({
-                            "role": "user", 
-                            "content": conv["user_input"]
-                        })
+            if session is None:
+                # 상태에서 인증된 클라이언트 가져오기
+                client = await self._get_supabase(state)
+                session = await self._restore_session(client, conversation_id, photo_context.get("photo_id"))
+            elif session.photo_info:
+                # 사진 행은 사진 캐시 기준으로 갱신 (분석 결과가 다시 저장되어 무효화되었으면 다시 읽음)
+                context = photo_cache.get(session.photo_info.get("id"))
+                if context is None:
+                    client = await self._get_supabase(state)
+                    context = photo_cache.context_for(await self._load_photo_info(client, session.photo_info.get("id")))
+                if context is not None:
+                    session.photo_info = context.row
             
-            state["message_history"] = message_history
-            state["intermediate"] = {"cache_score": None, "routing_decision": ""}
+            state["message_history"] = list(session.message_history)
+            state["intermediate"] = {"cache_score": None, "routing_decision": "", "assessment_item": None, "speculative_response": None}
             state["output"] = {"response_text": "", "response_audio_url": None}
-            state["turn_count"] = current_turn
-            state["assessment_completed"] = {"time_orientation": False, "language_naming": False}
+            state["turn_count"] = session.turn_count
+            state["assessment_completed"] = dict(session.assessment_completed)
+            state["history_summary"] = session.history_summary
+            state["summarized_count"] = session.summarized_count
+            state["assessment_turns"] = dict(session.assessment_turns)
+            state["precomputed_responses"] = dict(session.precomputed_responses)
+            state["assessment_attempt_turn"] = session.assessment_attempt_turn
             
-            # photo_info와 session_id를 상태에 저장
-            if photo_info:
-                state["photo_info"] = photo_info
-            state["session_id"] = session_id
+            # photo_info와 session_id를 상태에 저장 (conversation_id를 session_id로 사용, main.py에서 이미 세션 생성됨)
+            if session.photo_info:
+                state["photo_info"] = session.photo_info
+            state["session_id"] = conversation_id
             
         except Exception as e:
             print(f"Database operation failed: {e}")
             # 에러시 기본 상태 설정
             system_content = "당신은 치매 진단을 위한 따뜻한 대화 시스템입니다."
             state["message_history"] = [{"role": "system", "content": system_content}]
-            state["intermediate"] = {"cache_score": None, "routing_decision": ""}
+            state["intermediate"] = {"cache_score": None, "routing_decision": "", "assessment_item": None, "speculative_response": None}
             state["output"] = {"response_text": "", "response_audio_url": None}
             state["session_id"] = conversation_id
             state["turn_count"] = 1  # 에러시 첫 번째 턴으로 가정
             state["assessment_completed"] = {"time_orientation": False, "language_naming": False}
+            state["assessment_turns"] = {}
+            state["precomputed_responses"] = {}
+            state["assessment_attempt_turn"] = 0
         
         return state
     
-    def router_node(self, state: GraphState) -> GraphState:
+    def _get_cached_session(self, conversation_id: str, photo_id: Optional[str]) -> Optional[SessionState]:
+        """같은 사진으로 진행 중인 세션의 캐시된 상태 (다른 사진이 요청되면 None)"""
+        cached = self.session_cache.get(conversation_id)
+        if cached and (not photo_id or (cached.photo_info or {}).get("id") == photo_id):
+            return cached
+        return None
+    
+    async def _restore_session(self, client: AsyncClient, conversation_id: str, photo_id: Optional[str]) -> SessionState:
+        """DB에서 사진 정보와 대화 내역을 읽어 세션 상태 복원 (대화 내역을 읽었으면 세션 캐시에 저장)"""
+        # 사진 정보와 기존 대화 내역은 서로 독립적이므로 동시에 조회 (각각 시간 초과 시 기본값 사용)
+        photo_info, conversations, (history_summary, summarized_count) = await asyncio.gather(
+            self._load_photo_info(client, photo_id),
+            self._load_conversations(client, conversation_id),
+            self._load_history_summary(client, conversation_id)
+        )
+        
+        print(f"💬 기존 대화 내역: {len(conversations) if conversations else 0}개")
+        
+        # 현재 턴 수 계산 (다음 conversation_order)
+        current_turn = len(conversations) + 1 if conversations else 1
+        print(f"📊 현재 턴 수: {current_turn}")
+        
+        # 메시지 히스토리 구성
+        system_content = "당신은 치매 진단을 위한 따뜻한 대화 시스템입니다."
+        if photo_info:
+            system_content += photo_cache.context_for(photo_info).system_content
+        
+        message_history = [{"role": "system", "content": system_content}]
+        
+        # 기존 대화 내용 추가
+        if conversations:
+            for conv in conversations:
+                if conv.get("ai_output"):
+                    message_history.append({
+                        "role": "assistant", 
+                        "content": conv["ai_output"]
+                    })
+                if conv.get("user_input"):
+                    message_history.append({
+                        "role": "user", 
+                        "content": conv["user_input"]
+                    })
+        
+        session = SessionState(
+            message_history=message_history,
+            photo_info=photo_info,
+            turn_count=current_turn,
+            assessment_completed={"time_orientation": False, "language_naming": False},
+            # 세션 행에 저장된 누적 요약 복원 (저장된 요약이 없으면 다음 턴 종료 후 창 밖 대화를 다시 요약)
+            history_summary=history_summary,
+            summarized_count=min(summarized_count, len(message_history) - 1),
+            # 이미 실행된 기억등록/회상 평가 복원
+            assessment_turns={
+                MEMORY_CATEGORIES[conv["cist_category"]]: conv["conversation_order"]
+                for conv in (conversations or [])
+                if conv.get("cist_category") in MEMORY_CATEGORIES
+            }
+        )
+        
+        # 다음 턴부터는 캐시에서 복원하도록 세션 상태 저장 (대화 내역 조회에 실패했으면 다음 턴에 다시 조회)
+        if conversations is not None:
+            self.session_cache.put(conversation_id, session)
+        return session
+    
+    def schedule_prime_session(self, conversation_id: str, photo_id: Optional[str], authenticated_client: AsyncClient = None) -> None:
+        """인증 직후 백그라운드에서 세션 상태를 복원하고 첫 두 턴의 평가 질문을 미리 생성
+        
+        첫 메시지가 준비보다 먼저 도착하면 init_state_node가 준비가 끝날 때까지 기다린다.
+        """
+        if conversation_id in self._prime_tasks:
+            return
+        task = asyncio.get_running_loop().create_task(self._prime_session(conversation_id, photo_id, authenticated_client))
+        self._prime_tasks[conversation_id] = task
+        task.add_done_callback(lambda _: self._prime_tasks.pop(conversation_id, None))
+    
+    async def _prime_session(self, conversation_id: str, photo_id: Optional[str], authenticated_client: AsyncClient = None) -> None:
+        try:
+            session = self._get_cached_session(conversation_id, photo_id)
+            if session is None:
+                client = authenticated_client if authenticated_client else await self._get_supabase()
+                session = await self._restore_session(client, conversation_id, photo_id)
+            
+            # 평가 턴에서 바로 쓸 수 있도록 사진별 질문 뱅크를 미리 올려 둠
+            if photo_id:
+                await photo_question_bank.load(authenticated_client if authenticated_client else await self._get_supabase(), photo_id)
+            
+            # 첫 두 턴은 결정적이므로 응답을 미리 만들어 둠
+            if session.turn_count <= 2:
+                session.precomputed_responses = {
+                    "time_orientation": self._time_orientation_text(),
+                    "language_naming": self._language_naming_text(session.photo_info or {})
+                }
+            print(f"✅ 세션 준비 완료: conversation_id={conversation_id}, 현재 턴 수: {session.turn_count}")
+        except Exception as e:
+            print(f"❌ 세션 준비 실패: {e}")
+    
+    async def _load_photo_info(self, client: AsyncClient, photo_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """사진 정보 조회 (사진 캐시 우선, photo_id가 없거나 실패/시간 초과 시 None)"""
+        if not photo_id:
+            return None
+        cached = photo_cache.get(photo_id)
+        if cached is not None:
+            return cached.row
+        try:
+            with SUPABASE_QUERY_SECONDS.time(table="photos", operation="select"):
+                photo_response = await asyncio.wait_for(
+                    client.table("photos").select(
+                        "id, filename, file_path, description, tags, location_name, photo_analyze_result, taken_at, created_at"
+                    ).eq("id", photo_id).single().execute(),
+                    settings.INIT_STATE_READ_TIMEOUT_SECONDS
+                )
+            if photo_response.data:
+                print(f"📷 사진 정보 로드됨: photo_id={photo_id}")
+                return photo_cache.put(photo_response.data).row
+        except asyncio.TimeoutError:
+            print(f"⚠️ 사진 정보 조회 시간 초과: photo_id={photo_id}")
+        except Exception as photo_error:
+            print(f"❌ 사진 정보 로드 실패: {photo_error}")
+        return None
+    
+    async def _load_conversations(self, client: AsyncClient, session_id: str) -> Optional[List[Dict[str, Any]]]:
+        """세션의 기존 대화 내역 조회 (실패/시간 초과 시 None)"""
+        try:
+            # 아직 저장 중인 이전 턴이 있으면 끝난 뒤에 히스토리를 읽음
+            await self.conversation_writer.wait_for_session(session_id)
+            with SUPABASE_QUERY_SECONDS.time(table="conversations", operation="select"):
+                conversations_response = await asyncio.wait_for(
+                    client.table("conversations").select(
+                        "id, ai_output, user_input, conversation_order, cist_category"
+                    ).eq("session_id", session_id).order("conversation_order").execute(),
+                    settings.INIT_STATE_READ_TIMEOUT_SECONDS
+                )
+            return conversations_response.data or []
+        except asyncio.TimeoutError:
+            print(f"⚠️ 대화 내역 조회 시간 초과: session_id={session_id}")
+        except Exception as history_error:
+            print(f"❌ 대화 내역 로드 실패: {history_error}")
+        return None
+    
+    async def _load_history_summary(self, client: AsyncClient, session_id: str) -> tuple:
+        """세션 행에 저장된 누적 요약과 요약된 메시지 수 조회 (없거나 실패/시간 초과 시 ("", 0))"""
+        try:
+            with SUPABASE_QUERY_SECONDS.time(table="sessions", operation="select"):
+                response = await asyncio.wait_for(
+                    client.table("sessions").select(
+                        "history_summary, summarized_count"
+                    ).eq("id", session_id).limit(1).execute(),
+                    settings.INIT_STATE_READ_TIMEOUT_SECONDS
+                )
+            if response.data and response.data[0].get("history_summary"):
+                row = response.data[0]
+                return row["history_summary"], row.get("summarized_count") or 0
+        except asyncio.TimeoutError:
+            print(f"⚠️ 대화 요약 조회 시간 초과: session_id={session_id}")
+        except Exception as summary_error:
+            print(f"❌ 대화 요약 로드 실패: {summary_error}")
+        return "", 0
+    
+    async def router_node(self, state: GraphState) -> GraphState:
         """라우터 노드: 턴 수에 따른 평가 라우팅"""
         turn_count = state.get("turn_count", 1)
         user_message = state["input_data"]["user_message"]
@@ -253,6 +542,7 @@ class DialogueWorkflow:
         print(f"🔀 라우터 노드: turn_count={turn_count}")
         
         # 첫 번째와 두 번째 턴은 rule-based로 평가 노드로 라우팅
+        routing_source = "fixed"
         if turn_count == 1:
             routing_decision = "time_orientation"
             print("🕐 첫 번째 턴 → 시간 지남력 평가")
@@ -260,39 +550,128 @@ class DialogueWorkflow:
             routing_decision = "language_naming"
             print("🗣️ 두 번째 턴 → 언어기능 평가")
         else:
-            # 세 번째 턴부터는 기존 LangGraph 워크플로우 사용
-            print("💬 세 번째 턴 이후 → 기존 워크플로우 사용")
-            
-            # 기존 라우터 로직 사용
-            message_history = state["message_history"]
-            
-            # dialogue_prompt.py의 ROUTER_PROMPT 사용
-            from .dialogue_prompt import ROUTER_PROMPT
-            routing_prompt = ROUTER_PROMPT
+            # 세 번째 턴부터는 규칙 분류기로 먼저 판단하고, 애매한 경우에만 LLM 라우터 호출
+            decision = self.route_classifier.classify(
+                turn_count,
+                user_message,
+                self.history_window.dialogue(state.get("message_history", []))[-10:],
+                state.get("assessment_turns", {}),
+                state.get("assessment_attempt_turn", 0)
+            )
             
-            try:
-                response = self.llm_mini.invoke([
-                    SystemMessage(content=routing_prompt),
-                    HumanMessage(content=f"사용자 메시지: {user_message}\n대화 히스토리: {message_history}")
-                ])
-                
-                routing_decision = response.content.strip().lower()
-                if routing_decision not in ["standard_chat", "assessment_chat"]:
-                    routing_decision = "standard_chat"  # 기본값
-                    
-            except Exception as e:
-                print(f"Router decision failed: {e}")
-                routing_decision = "standard_chat"
+            if decision.route == UNCERTAIN and settings.SPECULATIVE_STANDARD_RESPONSE:
+                routing_decision, assessment_item = await self._speculative_route(state)
+                routing_source = "llm"
+                self.route_classifier.record(f"llm:{routing_decision}")
+            elif decision.route == UNCERTAIN:
+                routing_decision, assessment_item = await self._llm_route(state)
+                routing_source = "llm"
+                self.route_classifier.record(f"llm:{routing_decision}")
+            else:
+                routing_decision, assessment_item = decision.route, decision.assessment_item
+                routing_source = "rule"
+                self.route_classifier.record(f"rule:{decision.reason}")
+            print(f"💬 세 번째 턴 이후 라우팅: {decision.reason} → {routing_decision} {assessment_item or ''}")
+            state["intermediate"]["assessment_item"] = assessment_item
         
         state["intermediate"]["routing_decision"] = routing_decision
+        ROUTING_DECISIONS_TOTAL.inc(decision=routing_decision, source=routing_source)
         print(f"✅ 라우팅 결정: {routing_decision}")
         
         return state
     
-    def time_orientation_node(self, state: GraphState) -> GraphState:
+    async def _llm_route(self, state: GraphState) -> tuple:
+        """LLM 라우터 호출 (구조화 출력 파싱, 호출 실패나 스키마 위반 시 standard_chat)"""
+        user_message = state["input_data"]["user_message"]
+        # 최근 턴 + 누적 요약만 전달
+        message_history = self._render_history(state)
+        completed = ", ".join(state.get("assessment_turns", {})) or "없음"
+        
+        messages = [
+            SystemMessage(content=ROUTER_PROMPT),
+            HumanMessage(content=f"사용자 메시지: {user_message}\n이미 실행한 평가항목: {completed}\n대화 히스토리: {message_history}")
+        ]
+        
+        try:
+            response = await self._hedged_llm_call("router", (self.llm_router, messages), (self.llm_router, messages))
+            if response is None:
+                return "standard_chat", None
+            self._record_usage("router", response)
+            return self.route_classifier.parse_llm_output(response.content)
+        except Exception as e:
+            print(f"Router decision failed: {e}")
+            return "standard_chat", None
+    
+    async def _speculative_route(self, state: GraphState) -> tuple:
+        """LLM 라우터와 일반 응답 생성을 동시에 실행 (standard_chat이면 응답 채택, 아니면 취소)"""
+        messages = self._standard_response_messages(state)
+        started = time.perf_counter()
+        speculation = asyncio.ensure_future(llm_gateway.ainvoke(self.llm_mini, messages))
+        self.speculation_stats["launched"] += 1
+        
+        routing_decision, assessment_item = await self._llm_route(state)
+        router_seconds = time.perf_counter() - started
+        
+        if routing_decision == "standard_chat":
+            try:
+                response = await speculation
+                self._record_usage("standard_response", response)
+                # 순차 실행 대비 절약된 시간 = 라우터와 응답 생성이 겹친 구간
+                response_seconds = time.perf_counter() - started
+                self.speculation_stats["committed"] += 1
+                self.speculation_stats["latency_saved_seconds"] += min(router_seconds, response_seconds)
+                state["intermediate"]["speculative_response"] = response.content.strip()
+            except Exception as e:
+                # 실패하면 standard_response_node에서 다시 생성
+                print(f"Speculative response failed: {e}")
+            return routing_decision, assessment_item
+        
+        # 다른 경로로 가면 미리 생성한 응답은 폐기 (이미 끝났으면 사용량, 아니면 프롬프트 토큰 추정치를 낭비로 집계)
+        self.speculation_stats["cancelled"] += 1
+        if speculation.done() and not speculation.cancelled() and speculation.exception() is None:
+            wasted = self._total_tokens(speculation.result())
+        else:
+            speculation.cancel()
+            wasted = sum(self.history_window.count_tokens(m.content) for m in messages)
+        self.speculation_stats["wasted_tokens"] += wasted
+        return routing_decision, assessment_item
+    
+    def _record_usage(self, node: str, response) -> None:
+        """노드별 입력/캐시 적중 토큰 수 집계 (OpenAI 응답 usage 기준)"""
+        usage = getattr(response, "usage_metadata", None) or {}
+        token_usage = response.response_metadata.get("token_usage") or {}
+        input_tokens = usage.get("input_tokens") or token_usage.get("prompt_tokens") or 0
+        cached_tokens = (
+            (usage.get("input_token_details") or {}).get("cache_read")
+            or (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+            or 0
+        )
+        
+        stats = self.prompt_cache_stats.setdefault(node, {"calls": 0, "input_tokens": 0, "cached_tokens": 0})
+        stats["calls"] += 1
+        stats["input_tokens"] += input_tokens
+        stats["cached_tokens"] += cached_tokens
+    
+    @staticmethod
+    def _total_tokens(response) -> int:
+        """LLM 응답의 총 토큰 사용량 (알 수 없으면 0)"""
+        usage = getattr(response, "usage_metadata", None) or response.response_metadata.get("token_usage") or {}
+        return usage.get("total_tokens", 0)
+    
+    async def time_orientation_node(self, state: GraphState) -> GraphState:
         """시간 지남력 평가 노드 (첫 번째 턴)"""
         print("🕐 시간 지남력 평가 노드 실행")
         
+        # 세션 시작 시 미리 만든 질문이 있으면 그대로 사용
+        state["output"]["response_text"] = (
+            state.get("precomputed_responses", {}).get("time_orientation") or self._time_orientation_text()
+        )
+        state["assessment_completed"]["time_orientation"] = True
+        
+        return state
+    
+    def _time_orientation_text(self) -> str:
+        """현재 연/월 기준 시간 지남력 질문"""
         # 현재 날짜 정보 가져오기
         now = datetime.now()
         current_year = now.year
@@ -307,226 +686,432 @@ class DialogueWorkflow:
                 current_year=current_year,
                 current_month=current_month
             )
-            
-            state["output"]["response_text"] = time_question.strip()
-            state["assessment_completed"]["time_orientation"] = True
             print(f"✅ 시간 지남력 질문 생성 완료: {current_year}년 {current_month}월")
+            return time_question.strip()
             
         except Exception as e:
             print(f"❌ 시간 지남력 질문 생성 실패: {e}")
-            state["output"]["response_text"] = f"기억 여행을 시작합니다. 여행을 떠나는 오늘은 {current_year}년 {current_month}월 며칠인가요?"
-        
-        return state
+            return f"기억 여행을 시작합니다. 여행을 떠나는 오늘은 {current_year}년 {current_month}월 며칠인가요?"
     
-    def language_naming_node(self, state: GraphState) -> GraphState:
+    async def language_naming_node(self, state: GraphState) -> GraphState:
         """언어기능(이름대기) 평가 노드 (두 번째 턴)"""
         print("🗣️ 언어기능 평가 노드 실행")
         
-        photo_info = state.get("photo_info", {})
+        # 세션 시작 시 미리 만든 질문이 있으면 그대로 사용
+        state["output"]["response_text"] = (
+            state.get("precomputed_responses", {}).get("language_naming")
+            or self._language_naming_text(state.get("photo_info") or {})
+        )
+        state["assessment_completed"]["language_naming"] = True
         
+        return state
+    
+    def _language_naming_text(self, photo_info: Dict[str, Any]) -> str:
+        """사진 분석 결과(key_objects)와 촬영 시점 기반 이름대기 질문"""
         try:
             # 사진 분석 결과에서 key_objects 추출
-            photo_analyze_result = photo_info.get('photo_analyze_result', {})
+            photo_analyze_result = photo_info.get('photo_analyze_result') or {}
             key_objects = photo_analyze_result.get('key_objects', [])
             
             if not key_objects:
                 # key_objects가 없으면 기본 응답
-                state["output"]["response_text"] = "답변 감사해요. 그럼 지금부터 과거로 거슬러 올라가 보겠습니다... 3.. 2.. 1. 이 사진에서 보이는 것들을 하나씩 말씀해 주시겠어요?"
                 print("⚠️ 사진에 key_objects가 없어 기본 질문 사용")
-            else:
-                # 첫 번째 객체를 선택하여 질문 생성
-                selected_object = key_objects[0] if key_objects else "물건"
-                
-                # 사진이 찍힌 연도 계산 (taken_at 기준, 없으면 created_at 사용)
-                taken_at = photo_info.get('taken_at') or photo_info.get('created_at')
-                years_diff = 0
-                if taken_at:
-                    try:
-                        # ISO 형식의 날짜 파싱
-                        if isinstance(taken_at, str):
-                            taken_date = datetime.fromisoformat(taken_at.replace('Z', '+00:00'))
-                        else:
-                            taken_date = taken_at
-                        
-                        years_diff = datetime.now().year - taken_date.year
-                        if years_diff < 0:
-                            years_diff = 0
-                    except Exception as date_error:
-                        print(f"⚠️ 날짜 파싱 오류: {date_error}")
+                return "답변 감사해요. 그럼 지금부터 과거로 거슬러 올라가 보겠습니다... 3.. 2.. 1. 이 사진에서 보이는 것들을 하나씩 말씀해 주시겠어요?"
+            
+            # 첫 번째 객체를 선택하여 질문 생성
+            selected_object = key_objects[0] if key_objects else "물건"
+            
+            # 사진이 찍힌 연도 계산 (taken_at 기준, 없으면 created_at 사용)
+            taken_at = photo_info.get('taken_at') or photo_info.get('created_at')
+            years_diff = 0
+            if taken_at:
+                try:
+                    # ISO 형식의 날짜 파싱
+                    if isinstance(taken_at, str):
+                        taken_date = datetime.fromisoformat(taken_at.replace('Z', '+00:00'))
+                    else:
+                        taken_date = taken_at
+                    
+                    years_diff = datetime.now().year - taken_date.year
+                    if years_diff < 0:
                         years_diff = 0
-                
-                # NAMING_PROMPT 사용
-                from .dialogue_prompt import NAMING_PROMPT
-                
-                photo_description = photo_info.get('description', '사진')
-                
-                # 객체 위치 기반 질문 생성 (간단한 버전)
-                if years_diff > 0:
-                    response_text = f"답변 감사해요. 그럼 지금부터 {years_diff}년 전으로 거슬러 올라가 보겠습니다... 3.. 2.. 1. 사진에서 보이는 {selected_object} 같은 것이 무엇인지 말씀해 주시겠어요?"
-                else:
-                    response_text = "답변 감사해요. 그럼 지금부터 과거로 거슬러 올라가 보겠습니다... 3.. 2.. 1. 사진에서 보이는 것들 중 하나를 가리켜서 이름을 말씀해 주시겠어요?"
-                
-                state["output"]["response_text"] = response_text
-                print(f"✅ 언어기능 질문 생성 완료: {selected_object} 기반")
+                except Exception as date_error:
+                    print(f"⚠️ 날짜 파싱 오류: {date_error}")
+                    years_diff = 0
+            
+            # 객체 위치 기반 질문 생성 (간단한 버전)
+            if years_diff > 0:
+                response_text = f"답변 감사해요. 그럼 지금부터 {years_diff}년 전으로 거슬러 올라가 보겠습니다... 3.. 2.. 1. 사진에서 보이는 {selected_object} 같은 것이 무엇인지 말씀해 주시겠어요?"
+            else:
+                response_text = "답변 감사해요. 그럼 지금부터 과거로 거슬러 올라가 보겠습니다... 3.. 2.. 1. 사진에서 보이는 것들 중 하나를 가리켜서 이름을 말씀해 주시겠어요?"
             
-            state["assessment_completed"]["language_naming"] = True
+            print(f"✅ 언어기능 질문 생성 완료: {selected_object} 기반")
+            return response_text
             
         except Exception as e:
             print(f"❌ 언어기능 질문 생성 실패: {e}")
-            state["output"]["response_text"] = "답변 감사해요. 그럼 지금부터 과거로 거슬러 올라가 보겠습니다... 3.. 2.. 1. 이 사진에서 보이는 것 중 하나를 말씀해 주시겠어요?"
-            state["assessment_completed"]["language_naming"] = True
-        
-        return state
+            return "답변 감사해요. 그럼 지금부터 과거로 거슬러 올라가 보겠습니다... 3.. 2.. 1. 이 사진에서 보이는 것 중 하나를 말씀해 주시겠어요?"
     
-    def standard_response_node(self, state: GraphState) -> GraphState:
+    async def standard_response_node(self, state: GraphState) -> GraphState:
         """일반 응답 생성 노드: 자연스러운 일상 대화"""
-        user_message = state["input_data"]["user_message"]
-        photo_context = state["input_data"]["photo_context"]
-        photo_info = state.get("photo_info", {})
-        message_history = state.get("message_history", [])
-        
-        # 사진 정보 포함한 컨텍스트 구성
-        photo_description = ""
-        if photo_info:
-            # 기본 사진 정보
-            basic_info = f"사진 정보: {photo_info.get('description', '')}, 위치: {photo_info.get('location_name', '')}, 태그: {', '.join(photo_info.get('tags', []))}"
-            
-            # 분석 결과 추가
-            analyze_result = photo_info.get('photo_analyze_result')
-            if analyze_result:
-                analysis_info = []
-                if analyze_result.get('caption'):
-                    analysis_info.append(f"분석 설명: {analyze_result['caption']}")
-                if analyze_result.get('mood'):
-                    analysis_info.append(f"분위기: {analyze_result['mood']}")
-                if analyze_result.get('key_objects'):
-                    analysis_info.append(f"주요 객체: {', '.join(analyze_result['key_objects'])}")
-                if analyze_result.get('people_description'):
-                    analysis_info.append(f"인물: {analyze_result['people_description']}")
-                if analyze_result.get('time_of_day'):
-                    analysis_info.append(f"시간대: {analyze_result['time_of_day']}")
-                
-                if analysis_info:
-                    photo_description = f"{basic_info}\n분석 결과: {', '.join(analysis_info)}"
-                else:
-                    photo_description = basic_info
-            else:
-                photo_description = basic_info
+        # 라우터와 동시에 미리 생성한 응답이 있으면 그대로 사용
+        speculative_response = state["intermediate"].get("speculative_response")
+        if speculative_response:
+            state["output"]["response_text"] = speculative_response
+            self._cache_response(state)
+            RESPONSE_SOURCE_TOTAL.inc(node="standard_response", source="speculative")
+            return state
         
-        # dialogue_prompt.py의 STANDARD_RESPONSE_PROMPT 사용 (템플릿 변수 적용)
-        conversation_prompt = STANDARD_RESPONSE_PROMPT.format(
-            photo_description=photo_description,
-            user_message=user_message,
-            message_history=message_history
-        )
+        # 같은 말을 반복하면 이전 응답 재사용
+        if self._use_cached_response(state, "standard_response"):
+            return state
         
         try:
-            response = self.llm_mini.invoke([
-                SystemMessage(content=conversation_prompt),
-                HumanMessage(content=user_message)
-            ])
+            # 첫 토큰이 p95보다 늦으면 짧은 fallback 프롬프트로 헤지 요청 (먼저 응답하는 쪽 채택)
+            response = await self._hedged_llm_call(
+                "standard_response",
+                (self.llm_mini, self._standard_response_messages(state)),
+                (self.llm_nano, self._fallback_messages(state))
+            )
+            if response is None:
+                state["output"]["response_text"] = "잠시 생각이 길어졌네요. 조금 더 이야기해 주시겠어요?"
+                RESPONSE_SOURCE_TOTAL.inc(node="standard_response", source="budget_fallback")
+                return state
+            self._record_usage("standard_response", response)
             
             state["output"]["response_text"] = response.content.strip()
+            self._cache_response(state)
+            RESPONSE_SOURCE_TOTAL.inc(node="standard_response", source="llm")
             
         except Exception as e:
             print(f"Standard response generation failed: {e}")
             state["output"]["response_text"] = "죄송합니다. 다시 말씀해 주시겠어요?"
+            RESPONSE_SOURCE_TOTAL.inc(node="standard_response", source="error")
         
         return state
     
-    def cache_retrieve_and_evaluate_node(self, state: GraphState) -> GraphState:
+    def _standard_response_messages(self, state: GraphState) -> list:
+        """일반 응답 생성용 프롬프트 메시지 구성"""
+        user_message = state["input_data"]["user_message"]
+        photo_info = state.get("photo_info", {})
+        message_history = self._render_history(state)
+        
+        # 사진 정보 포함한 컨텍스트 구성 (사진 캐시에 미리 렌더링된 조각 사용)
+        photo = photo_cache.context_for(photo_info)
+        photo_description = photo.photo_description if photo else ""
+        
+        # 고정 지시문 + 사진 컨텍스트는 매 턴 바이트 단위로 동일한 접두부로 유지 (OpenAI 프롬프트 캐시 적중)
+        # 매 턴 바뀌는 대화 히스토리와 사용자 발화는 마지막 메시지에만 넣음
+        conversation_prompt = STANDARD_RESPONSE_PROMPT + STANDARD_RESPONSE_PHOTO_CONTEXT.format(
+            photo_description=photo_description
+        )
+        
+        return [
+            SystemMessage(content=conversation_prompt),
+            HumanMessage(content=STANDARD_RESPONSE_TURN_PROMPT.format(
+                message_history=message_history,
+                user_message=user_message
+            ))
+        ]
+    
+    async def cache_retrieve_and_evaluate_node(self, state: GraphState) -> GraphState:
         """캐시 검색 및 평가 노드: 인지기능 평가 질문 검색"""
         user_message = state["input_data"]["user_message"]
         message_history = state.get("message_history", [])
+        assessment_item = state["intermediate"].get("assessment_item")
+        # 템플릿을 찾지 못해 fallback으로 가더라도 평가 간격 계산에 포함
+        state["assessment_attempt_turn"] = state.get("turn_count", 1)
         
         try:
-            # Supabase에서 CIST 질문 템플릿 검색
-            response = self.supabase.table("cist_question_templates").select(
-                "*"
-            ).limit(5).execute()
+            client = await self._get_supabase(state)
+            category = f"memory_{assessment_item}" if assessment_item else None
             
-            if response.data:
-                # dialogue_prompt.py의 CACHE_RETRIEVE_AND_EVALUATE_PROMPT 사용
-                # 실제 구현시에는 이 프롬프트를 사용하여 가장 적합한 질문 선택
-                evaluate_prompt = CACHE_RETRIEVE_AND_EVALUATE_PROMPT
-                
-                # 간단한 유사도 평가 (실제로는 벡터 DB 사용 권장)
-                best_question = response.data[0]
-                cache_score = 0.9  # 임시 점수
-                
+            # 사진 분석 때 미리 만든 사진별 질문이 있으면 검색 없이 사용
+            photo_question = await self._photo_bank_question(client, state, category)
+            if photo_question:
+                print(f"📷 사진 질문 뱅크 사용: category={category}, template_id={photo_question['id']}")
+                state["intermediate"]["cache_score"] = 1.0
+                state["intermediate"]["template_source"] = "photo_bank"
+                state["output"]["response_text"] = render_photo_question(photo_question)
+                state["assessment_turns"][assessment_item] = state.get("turn_count", 1)
+                self._record_cache_decision(state)
+                return state
+            
+            # 템플릿 인덱스가 없으면 로드, 있으면 새 템플릿을 백그라운드에서 증분 반영
+            if not self.template_index.loaded:
+                await self.template_index.load(client)
+            else:
+                self.template_index.schedule_refresh(client)
+            
+            # 최근 대화와 의미가 가장 가까운 템플릿 검색 (공용 + 이 사진에서 생성된 템플릿, 라우터가 고른 평가 항목이 있으면 해당 카테고리만)
+            recent = self.history_window.dialogue(message_history)[-4:] + [{"role": "user", "content": user_message}]
+            matches = await self.template_index.search(
+                self.history_window.render("", recent),
+                category=category,
+                k=settings.TEMPLATE_SEARCH_TOP_K,
+                photo_id=state["input_data"]["photo_context"].get("photo_id")
+            )
+            
+            if matches:
+                cache_score, best_question = matches[0]
+                print(f"🔎 템플릿 검색: category={category}, 최고 유사도={cache_score:.3f}, 후보 {len(matches)}개")
                 state["intermediate"]["cache_score"] = cache_score
-                state["output"]["response_text"] = best_question["template_text"]
+                if cache_score >= settings.TEMPLATE_CACHE_THRESHOLD:
+                    state["output"]["response_text"] = best_question["template_text"]
+                    if assessment_item:
+                        state["assessment_turns"][assessment_item] = state.get("turn_count", 1)
             else:
-                state["intermediate"]["cache_score"] = 0.3  # 낮은 점수
+                state["intermediate"]["cache_score"] = 0.0
                 
         except Exception as e:
             print(f"Cache retrieval failed: {e}")
-            state["intermediate"]["cache_score"] = 0.3
+            state["intermediate"]["cache_score"] = 0.0
         
+        self._record_cache_decision(state)
         return state
     
-    def fallback_node(self, state: GraphState) -> GraphState:
+    def _record_cache_decision(self, state: GraphState) -> None:
+        """캐시 사용 여부 / 응답 출처 메트릭 기록 (평가 턴마다 한 번, 노드 안에서만 호출)"""
+        decision = self._cache_decision(state)
+        CACHE_DECISIONS_TOTAL.inc(decision=decision)
+        if decision == "use_cache":
+            RESPONSE_SOURCE_TOTAL.inc(node="cache_retrieve", source=state["intermediate"].get("template_source") or "template_cache")
+    
+    async def _photo_bank_question(self, client: AsyncClient, state: GraphState, category: Optional[str]) -> Optional[Dict[str, Any]]:
+        """사진별 질문 뱅크에서 평가 질문 선택 (뱅크가 없거나 조회 실패 시 None → 공용 템플릿 검색)"""
+        photo_id = state["input_data"]["photo_context"].get("photo_id")
+        if not category or not photo_id:
+            return None
+        try:
+            rows = await photo_question_bank.load(client, photo_id)
+        except Exception as e:
+            print(f"❌ 사진 질문 뱅크 조회 실패: photo_id={photo_id}: {e}")
+            return None
+        return select_photo_question(rows, category, state.get("message_history", []))
+    
+    def _question_bank_size(self, photo_id: Optional[str], category: Optional[str]) -> int:
+        """질문 생성 작업 생략 판단용 템플릿 수 (사진이 있으면 사진별 뱅크 + 그 사진에서 생성된 템플릿, 없으면 공용 템플릿)"""
+        if photo_id:
+            return photo_question_bank.size(photo_id, category) + self.template_index.bank_size(category, photo_id)
+        return self.template_index.bank_size(category)
+    
+    async def fallback_node(self, state: GraphState) -> GraphState:
         """대체 응답 처리 노드: 경량 LLM으로 응답 생성"""
         user_message = state["input_data"]["user_message"]
         conversation_id = state["input_data"]["conversation_id"]
         photo_context = state["input_data"]["photo_context"]
-        photo_info = state.get("photo_info", {})
-        message_history = state.get("message_history", [])
-        
-        # 사진 분석 결과 요약 (fallback용 간단 버전)
-        photo_metadata = ""
-        if photo_info:
-            analyze_result = photo_info.get('photo_analyze_result')
-            if analyze_result:
-                context_parts = []
-                if analyze_result.get('caption'):
-                    context_parts.append(f"사진: {analyze_result['caption'][:50]}...")
-                if analyze_result.get('mood'):
-                    context_parts.append(f"분위기: {analyze_result['mood']}")
-                
-                if context_parts:
-                    photo_metadata = f"참고: {', '.join(context_parts)}"
         
-        # dialogue_prompt.py의 FALLBACK_PROMPT 사용
-        fallback_prompt = FALLBACK_PROMPT
+        # 같은 말을 반복하면 이전 응답 재사용
+        if self._use_cached_response(state, "fallback"):
+            return state
         
         try:
-            # 프롬프트에 컨텍스트 정보 포함
-            context_info = f"사용자 메시지: {user_message}\n사진 메타데이터: {photo_metadata}\n최근 대화: {message_history[-2:] if message_history else []}"
-            
-            response = self.llm_nano.invoke([
-                SystemMessage(content=fallback_prompt),
-                HumanMessage(content=context_info)
-            ])
+            messages = self._fallback_messages(state)
+            response = await self._hedged_llm_call("fallback", (self.llm_nano, messages), (self.llm_nano, messages))
+            if response is None:
+                state["output"]["response_text"] = "네, 알겠습니다."
+                RESPONSE_SOURCE_TOTAL.inc(node="fallback", source="budget_fallback")
+                return state
+            self._record_usage("fallback", response)
             
             state["output"]["response_text"] = response.content.strip()
+            self._cache_response(state)
+            RESPONSE_SOURCE_TOTAL.inc(node="fallback", source="llm")
             
-            # 백그라운드에서 고품질 질문 생성 요청
-            self._schedule_background_task(user_message, conversation_id, photo_context)
+            # 백그라운드 고품질 질문 생성 요청 (같은 사진·카테고리 요청은 병합, 템플릿이 충분하면 생략)
+            assessment_item = state["intermediate"].get("assessment_item")
+            self.question_scheduler.submit(
+                photo_context.get("photo_id"),
+                f"memory_{assessment_item}" if assessment_item else None,
+                user_message,
+                conversation_id,
+                photo_context
+            )
             
         except Exception as e:
             print(f"Fallback response failed: {e}")
             state["output"]["response_text"] = "네, 알겠습니다."
+            RESPONSE_SOURCE_TOTAL.inc(node="fallback", source="error")
         
         return state
     
-    def _schedule_background_task(self, user_message: str, conversation_id: str, photo_context: dict):
-        """Celery를 통한 백그라운드 작업 스케줄링"""
+    def _fallback_messages(self, state: GraphState) -> list:
+        """fallback용 짧은 프롬프트 메시지 구성 (standard_response 헤지 요청에도 사용)"""
+        user_message = state["input_data"]["user_message"]
+        
+        # 사진 분석 결과 요약 (fallback용 간단 버전, 사진 캐시에 미리 렌더링된 조각 사용)
+        photo = photo_cache.context_for(state.get("photo_info", {}))
+        photo_metadata = photo.fallback_metadata if photo else ""
+        
+        # 사진 메타데이터는 고정 지시문 뒤(세션 내 동일), 최근 대화와 사용자 메시지는 마지막에 배치
+        recent = self.history_window.dialogue(state.get("message_history", []))[-2:]
+        context_info = f"최근 대화: {self.history_window.render('', recent)}\n사용자 메시지: {user_message}"
+        
+        # dialogue_prompt.py의 FALLBACK_PROMPT 사용
+        return [
+            SystemMessage(content=f"{FALLBACK_PROMPT}\n사진 메타데이터: {photo_metadata}"),
+            HumanMessage(content=context_info)
+        ]
+    
+    async def _hedged_llm_call(self, node: str, primary: tuple, hedge: Optional[tuple] = None):
+        """노드 지연 시간 예산 안에서 LLM 호출 ((llm, messages) 튜플)
+        
+        첫 토큰이 노드의 p95(LatencyTracker)보다 늦으면 hedge 요청을 추가로 보내고,
+        먼저 첫 토큰을 받은 요청만 남기고 나머지는 취소한다.
+        예산(LATENCY_BUDGET_SECONDS) 안에 어느 쪽도 시작하지 못하면 모두 취소하고 None 반환.
+        첫 토큰 이후에도 남은 예산 + LLM_STREAM_COMPLETION_SECONDS 안에 끝나지 않으면 취소하고 None 반환.
+        """
+        started = time.perf_counter()
+        budget = settings.LATENCY_BUDGET_SECONDS.get(node, 10.0)
+        hedge_delay = self.latency_tracker.hedge_delay(node)
+        
+        attempts = [self._start_llm_stream(*primary)]
+        winner = None
         try:
-            from tasks import generate_high_quality_questions
-            
-            context = {
-                "user_message": user_message,
-                "conversation_id": conversation_id, 
-                "photo_context": photo_context
-            }
-            
-            # 비동기 작업 발행
-            generate_high_quality_questions.delay(context)
-            print(f"Background task scheduled for conversation: {conversation_id}")
+            winner = await self._first_streaming(attempts, min(hedge_delay, budget))
+            if winner is None and hedge is not None and hedge_delay < budget:
+                print(f"⏱️ {node} 첫 토큰 지연 {hedge_delay:.2f}s 초과 → 헤지 요청")
+                self.latency_tracker.count(node, "hedged")
+                attempts.append(self._start_llm_stream(*hedge))
+                winner = await self._first_streaming(attempts, budget - (time.perf_counter() - started))
+        finally:
+            # 채택되지 않은 요청 취소 (노드 자체가 취소된 경우 포함)
+            for task, _ in attempts:
+                if winner is None or task is not winner[0]:
+                    task.cancel()
+        
+        if winner is None:
+            print(f"⏱️ {node} 지연 시간 예산 {budget:.1f}s 초과 → 대체 응답")
+            self.latency_tracker.count(node, "budget_exceeded")
+            return None
+        
+        self.latency_tracker.record(node, time.perf_counter() - started)
+        if winner is not attempts[0]:
+            self.latency_tracker.count(node, "hedge_won")
+        
+        # 첫 토큰 이후 스트림이 멈춰도 턴이 끝나도록 남은 예산 + 완료 상한까지만 대기
+        remaining = max(budget - (time.perf_counter() - started), 0.0) + settings.LLM_STREAM_COMPLETION_SECONDS
+        try:
+            return await asyncio.wait_for(winner[0], timeout=remaining)
+        except asyncio.TimeoutError:
+            print(f"⏱️ {node} 응답 완료 대기 {remaining:.1f}s 초과 → 대체 응답")
+            self.latency_tracker.count(node, "budget_exceeded")
+            return None
+    
+    def _start_llm_stream(self, llm, messages) -> tuple:
+        """스트리밍 호출을 백그라운드로 시작 (첫 청크를 받거나 끝나면 이벤트 설정)"""
+        first_chunk = asyncio.Event()
+        
+        async def collect():
+            response = None
+            try:
+                async for chunk in llm_gateway.astream(llm, messages):
+                    response = chunk if response is None else response + chunk
+                    first_chunk.set()
+                return response
+            finally:
+                first_chunk.set()
+        
+        return asyncio.ensure_future(collect()), first_chunk
+    
+    @staticmethod
+    async def _first_streaming(attempts: list, timeout: float) -> Optional[tuple]:
+        """가장 먼저 첫 청크를 받은 (task, event) 반환 (시간 초과면 None, 모두 실패하면 첫 요청의 예외 발생)"""
+        deadline = time.perf_counter() + timeout
+        while True:
+            failed = [a for a in attempts if a[0].done() and (a[0].cancelled() or a[0].exception() is not None)]
+            streaming = [a for a in attempts if a[1].is_set() and a not in failed]
+            if streaming:
+                return streaming[0]
+            if len(failed) == len(attempts):
+                return await attempts[0][0]
             
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            waiters = [asyncio.ensure_future(event.wait()) for _, event in attempts if not event.is_set()]
+            await asyncio.wait(waiters, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for waiter in waiters:
+                waiter.cancel()
+    
+    def _use_cached_response(self, state: GraphState, node: str) -> bool:
+        """반복 발화 캐시에 거의 같은 발화의 응답이 있으면 출력에 넣고 True 반환 (턴은 그대로 저장됨)"""
+        cached = self.response_cache.get(
+            state["input_data"]["conversation_id"],
+            state["input_data"]["photo_context"].get("photo_id"),
+            state["input_data"]["user_message"]
+        )
+        if cached is None:
+            return False
+        print("⚡ 반복 발화 응답 캐시 적중")
+        state["output"]["response_text"] = cached
+        RESPONSE_SOURCE_TOTAL.inc(node=node, source="response_cache")
+        return True
+    
+    def _cache_response(self, state: GraphState) -> None:
+        self.response_cache.put(
+            state["input_data"]["conversation_id"],
+            state["input_data"]["photo_context"].get("photo_id"),
+            state["input_data"]["user_message"],
+            state["output"]["response_text"]
+        )
+    
+    async def _publish_question_job(self, context: Dict[str, Any]) -> None:
+        """Celery로 고품질 질문 생성 작업 발행 (question_scheduler가 병합한 맥락)"""
+        from tasks import generate_high_quality_questions
+        
+        # 브로커 I/O가 이벤트 루프를 막지 않도록 스레드에서 실행
+        await asyncio.to_thread(generate_high_quality_questions.delay, context)
+        print(f"Background task scheduled for conversations: {context['conversation_ids']}")
+    
+    def _render_history(self, state: GraphState) -> str:
+        """프롬프트용 대화 히스토리 (누적 요약 + 토큰 예산 안의 최근 턴)
+        
+        요약이 아직 따라잡지 못한 중간 턴은 백그라운드 요약이 끝날 때까지 프롬프트에서 생략된다.
+        """
+        _, recent = self.history_window.split(state.get("message_history", []), state.get("summarized_count", 0))
+        return self.history_window.render(state.get("history_summary", ""), recent)
+    
+    def _schedule_history_summary(self, conversation_id: str, client: AsyncClient) -> None:
+        """최근 턴 창 밖으로 밀려난 대화가 있으면 백그라운드에서 누적 요약에 합침 (세션당 하나씩)"""
+        if conversation_id in self._summary_tasks:
+            return
+        session = self.session_cache.get(conversation_id)
+        if session is None:
+            return
+        pending, _ = self.history_window.split(session.message_history, session.summarized_count)
+        if not pending:
+            return
+        
+        task = asyncio.get_running_loop().create_task(self._fold_history_summary(client, conversation_id, session, pending))
+        self._summary_tasks[conversation_id] = task
+        task.add_done_callback(lambda _: self._summary_tasks.pop(conversation_id, None))
+    
+    async def _fold_history_summary(self, client: AsyncClient, conversation_id: str, session: SessionState, pending: List[Dict[str, str]]) -> None:
+        """기존 요약과 새로 밀려난 대화를 합쳐 요약 갱신 (세션 행에도 저장해 복원 시 이어서 사용)"""
+        try:
+            response = await llm_gateway.ainvoke(self.llm_nano, [
+                SystemMessage(content=HISTORY_SUMMARY_PROMPT),
+                HumanMessage(content=f"기존 요약: {session.history_summary or '(없음)'}\n새 대화:\n{self.history_window.render('', pending)}")
+            ])
+            self._record_usage("history_summary", response)
+            session.history_summary = response.content.strip()
+            session.summarized_count += len(pending)
+            print(f"📝 대화 요약 갱신: 요약된 메시지 {session.summarized_count}개")
+        except Exception as e:
+            # 실패하면 다음 턴에 다시 시도 (그동안 밀려난 턴은 프롬프트에서 생략)
+            print(f"History summary failed: {e}")
+            return
+        
+        try:
+            with SUPABASE_QUERY_SECONDS.time(table="sessions", operation="update"):
+                await client.table("sessions").update({
+                    "history_summary": session.history_summary,
+                    "summarized_count": session.summarized_count
+                }).eq("id", conversation_id).execute()
         except Exception as e:
-            print(f"Failed to schedule background task: {e}")
+            # 저장에 실패해도 이 워커의 세션 캐시에는 남음 (복원 시에는 창 밖 대화를 다시 요약)
+            print(f"⚠️ 대화 요약 저장 실패: session_id={conversation_id}, {e}")
     
     def _route_decision(self, state: GraphState) -> str:
         """라우터 결정에 따른 경로 선택"""
@@ -534,94 +1119,128 @@ class DialogueWorkflow:
     
     def _cache_decision(self, state: GraphState) -> str:
         """캐시 점수에 따른 경로 선택"""
-        cache_score = state["intermediate"]["cache_score"]
-        if cache_score and cache_score >= 0.85:
-            return "use_cache"
-        return "use_fallback"
+        return "use_cache" if self._template_accepted(state) else "use_fallback"
     
-    async def _save_conversation_to_db(self, state: GraphState, authenticated_client: Client = None) -> None:
-        """대화 내용을 DB에 저장"""
-        try:
-            # 인증된 클라이언트가 있으면 사용, 없으면 기본 클라이언트 사용
-            client = authenticated_client if authenticated_client else self.supabase
-            
-            session_id = state.get("session_id")
-            user_message = state["input_data"]["user_message"]
-            ai_response = state["output"]["response_text"]
-            photo_context = state["input_data"]["photo_context"]
-            user_id = state["input_data"]["user_id"]
-            
-            print(f"💾 대화 저장 시도: session_id={session_id}, user_id={user_id}")
-            
-            if not session_id:
-                print("❌ session_id 없음, 대화 저장 건너뜀")
-                return
-            
-            # 다음 conversation_order 계산
-            count_response = client.table("conversations").select(
-                "conversation_order"
-            ).eq("session_id", session_id).execute()
-            
-            next_order = len(count_response.data) + 1 if count_response.data else 1
-            print(f"📊 대화 순서: {next_order}")
-            
-            # 평가 유형 결정
-            routing_decision = state["intermediate"].get("routing_decision", "")
-            question_type = "open_ended"  # 기본값
-            cist_category = None
-            is_cist_item = False
-            
-            if routing_decision == "time_orientation":
-                question_type = "cist_orientation"
-                cist_category = "orientation_time"
-                is_cist_item = True
-                print("📊 시간 지남력 평가로 분류")
-            elif routing_decision == "language_naming":
-                question_type = "cist_language"
-                cist_category = "language_naming"
+    @staticmethod
+    def _template_accepted(state: GraphState) -> bool:
+        """템플릿 점수가 채택 기준 이상인지 (조건부 엣지와 대화 레코드 구성에서 공유, 부수 효과 없음)"""
+        cache_score = state["intermediate"].get("cache_score")
+        return bool(cache_score) and cache_score >= settings.TEMPLATE_CACHE_THRESHOLD
+    
+    def _build_conversation_row(self, state: GraphState, conversation_order: int) -> Optional[Dict[str, Any]]:
+        """저장할 대화 레코드 구성 (id는 재시도 시 중복 저장을 막기 위해 미리 발급)"""
+        session_id = state.get("session_id")
+        user_message = state["input_data"]["user_message"]
+        ai_response = state["output"]["response_text"]
+        photo_context = state["input_data"]["photo_context"]
+        user_id = state["input_data"]["user_id"]
+        
+        if not session_id:
+            print("❌ session_id 없음, 대화 저장 건너뜀")
+            return None
+        
+        # 평가 유형 결정
+        routing_decision = state["intermediate"].get("routing_decision", "")
+        question_type = "open_ended"  # 기본값
+        cist_category = None
+        is_cist_item = False
+        
+        if routing_decision == "time_orientation":
+            question_type = "cist_orientation"
+            cist_category = "orientation_time"
+            is_cist_item = True
+        elif routing_decision == "language_naming":
+            question_type = "cist_language"
+            cist_category = "language_naming"
+            is_cist_item = True
+        elif routing_decision == "assessment_chat" and self._template_accepted(state):
+            assessment_item = state["intermediate"].get("assessment_item")
+            if assessment_item:
+                question_type = "cist_memory"
+                cist_category = f"memory_{assessment_item}"
                 is_cist_item = True
-                print("📊 언어기능 평가로 분류")
-            
-            # 대화 레코드 생성
-            conversation_data = {
-                "session_id": session_id,
-                "user_id": user_id,
-                "photo_id": photo_context.get("photo_id"),
-                "conversation_order": next_order,
-                "ai_output": ai_response,
-                "question_type": question_type,
-                "cist_category": cist_category,
-                "user_input": user_message,
-                "is_cist_item": is_cist_item
-            }
-            
-            print(f"📝 대화 데이터: {conversation_data}")
-            
-            insert_response = client.table("conversations").insert(conversation_data).execute()
-            if insert_response.data:
-                print(f"✅ 대화 저장 성공: {insert_response.data[0]['id']}")
-            else:
-                print("❌ 대화 저장 실패: 응답 데이터 없음")
-                
-        except Exception as e:
-            print(f"❌ 대화 저장 DB 오류: {type(e).__name__}: {str(e)}")
-            # 디버깅을 위해 상세 오류 정보 출력
-            import traceback
-            print(f"📋 상세 오류: {traceback.format_exc()}")
+        
+        return {
+            "id": str(uuid.uuid4()),
+            "session_id": session_id,
+            "user_id": user_id,
+            "photo_id": photo_context.get("photo_id"),
+            "conversation_order": conversation_order,
+            "ai_output": ai_response,
+            "question_type": question_type,
+            "cist_category": cist_category,
+            "user_input": user_message,
+            "is_cist_item": is_cist_item
+        }
 
-    async def process_message(self, input_data: WorkflowInput, authenticated_client: Client = None) -> FinalOutput:
-        """메시지 처리 진입점"""
-        initial_state = {
+    def _build_initial_state(self, input_data: WorkflowInput, authenticated_client: AsyncClient = None) -> GraphState:
+        """그래프 실행을 위한 초기 상태 구성"""
+        return {
             "input_data": input_data,
             "message_history": [],
-            "intermediate": {"cache_score": None, "routing_decision": ""},
+            "intermediate": {"cache_score": None, "routing_decision": "", "assessment_item": None, "speculative_response": None, "template_source": None},
             "output": {"response_text": "", "response_audio_url": None},
             "photo_info": None,
             "session_id": None,
             "turn_count": 1,  # 기본값, init_state_node에서 실제 값으로 업데이트
             "assessment_completed": {"time_orientation": False, "language_naming": False},
+            "history_summary": "",
+            "summarized_count": 0,
+            "assessment_turns": {},
+            "precomputed_responses": {},
+            "assessment_attempt_turn": 0,
             "_authenticated_client": authenticated_client
         }
+    
+    async def _finalize_turn(self, final_state: GraphState, authenticated_client: AsyncClient = None) -> Dict[str, Any]:
+        """완료된 턴을 세션 캐시에 반영하고 DB 저장을 백그라운드 저장기에 넘긴 뒤 저장 메타데이터 반환"""
+        conversation_id = final_state["input_data"]["conversation_id"]
+        metadata = {
+            "persistence": "skipped",
+            "conversation_row_id": None,
+            "conversation_order": None,
+            "turn_count": final_state.get("turn_count"),
+            "routing_decision": final_state["intermediate"].get("routing_decision", "")
+        }
+        
+        if not final_state["output"]["response_text"]:
+            return metadata
+        
+        # 세션 캐시에 이번 턴을 제자리 추가하면서 conversation_order 배정
+        # (캐시에 없으면 init_state_node에서 계산한 turn_count 사용, 행 수를 다시 세지 않음)
+        recorded_turn = self.session_cache.append_turn(
+            conversation_id,
+            final_state["input_data"]["user_message"],
+            final_state["output"]["response_text"],
+            final_state.get("assessment_completed"),
+            final_state.get("assessment_turns"),
+            final_state.get("assessment_attempt_turn", 0)
+        )
+        conversation_order = recorded_turn or final_state.get("turn_count", 1)
+        client = authenticated_client if authenticated_client else await self._get_supabase()
+        self._schedule_history_summary(conversation_id, client)
+        
+        row = self._build_conversation_row(final_state, conversation_order)
+        if row is None:
+            return metadata
+        
+        # 저장이 최종 실패하거나 순서가 재배정되면 캐시가 DB와 어긋나지 않도록 다음 턴에 DB에서 복원
+        def invalidate_session(_row: Dict[str, Any]) -> None:
+            self.session_cache.invalidate(conversation_id)
+        
+        self.conversation_writer.submit(client, row, on_failure=invalidate_session, on_renumber=invalidate_session)
+        print(f"💾 대화 저장 예약: session_id={row['session_id']}, 순서={conversation_order}")
+        
+        metadata.update({
+            "persistence": "queued",
+            "conversation_row_id": row["id"],
+            "conversation_order": conversation_order
+        })
+        return metadata
+
+    async def process_message(self, input_data: WorkflowInput, authenticated_client: AsyncClient = None) -> FinalOutput:
+        """메시지 처리 진입점"""
+        initial_state = self._build_initial_state(input_data, authenticated_client)
         
         try:
             print(f"🚀 워크플로우 시작: conversation_id={input_data['conversation_id']}")
@@ -629,14 +1248,7 @@ class DialogueWorkflow:
             final_state = await self.app.ainvoke(initial_state)
             print(f"✅ 워크플로우 완료: conversation_id={input_data['conversation_id']}")
             
-            # 대화 내용을 DB에 저장
-            if final_state["output"]["response_text"]:
-                try:
-                    await self._save_conversation_to_db(final_state, authenticated_client)
-                    print("✅ 대화 DB 저장 완료")
-                except Exception as db_error:
-                    print(f"❌ 대화 DB 저장 실패: {db_error}")
-                    # 대화 저장 실패해도 응답은 전송
+            await self._finalize_turn(final_state, authenticated_client)
             
             return final_state["output"]
         except Exception as e:
@@ -646,4 +1258,53 @@ class DialogueWorkflow:
             return {
                 "response_text": "죄송합니다. 처리 중 오류가 발생했습니다. 잠시 후 다시 시도해주세요.",
                 "response_audio_url": None
-            }
\ No newline at end of file
+            }
+
+    async def stream_message(self, input_data: WorkflowInput, authenticated_client: AsyncClient = None) -> AsyncIterator[Dict[str, Any]]:
+        """메시지 스트리밍 처리 진입점
+        
+        응답 생성 노드(STREAMING_NODES)의 LLM 토큰을 "response_delta" 이벤트로 즉시 전달하고,
+        워크플로우 완료 후 전체 응답과 저장 메타데이터를 담은 "response" 이벤트를 마지막으로 전달한다.
+        """
+        initial_state = self._build_initial_state(input_data, authenticated_client)
+        
+        try:
+            print(f"🚀 스트리밍 워크플로우 시작: conversation_id={input_data['conversation_id']}")
+            
+            root_run_id = None
+            final_state = None
+            # 노드별로 처음 토큰을 보낸 LLM 실행만 전달 (헤지 요청이 겹쳐도 응답이 섞이지 않도록)
+            stream_owners: Dict[str, str] = {}
+            async for event in self.app.astream_events(initial_state, version="v2"):
+                # 첫 이벤트는 그래프 전체 실행(root run)의 시작 이벤트
+                if root_run_id is None:
+                    root_run_id = event["run_id"]
+                
+                kind = event["event"]
+                if kind == "on_chat_model_stream":
+                    node = event.get("metadata", {}).get("langgraph_node")
+                    delta = event["data"]["chunk"].content
+                    if node in STREAMING_NODES and delta and stream_owners.setdefault(node, event["run_id"]) == event["run_id"]:
+                        yield {"type": "response_delta", "delta": delta}
+                elif kind == "on_chain_end" and event["run_id"] == root_run_id:
+                    final_state = event["data"]["output"]
+            
+            if final_state is None:
+                raise RuntimeError("워크플로우 최종 상태를 받지 못했습니다")
+            print(f"✅ 스트리밍 워크플로우 완료: conversation_id={input_data['conversation_id']}")
+            
+            metadata = await self._finalize_turn(final_state, authenticated_client)
+            
+            yield {"type": "response", "data": final_state["output"], "metadata": metadata}
+        except Exception as e:
+            import traceback
+            print(f"❌ 스트리밍 워크플로우 실행 실패: conversation_id={input_data['conversation_id']}, error={e}")
+            print(f"📋 상세 오류: {traceback.format_exc()}")
+            yield {
+                "type": "response",
+                "data": {
+                    "response_text": "죄송합니다. 처리 중 오류가 발생했습니다. 잠시 후 다시 시도해주세요.",
+                    "response_audio_url": None
+                },
+                "metadata": {"persistence": "skipped"}
+            }
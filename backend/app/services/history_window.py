@@ -0,0 +1,77 @@
+"""
+대화 히스토리 창
+프롬프트에 넣을 대화 히스토리를 토큰 예산 안의 최근 턴과, 그보다 오래된 턴의 누적 요약으로 나눈다
+세션이 길어져도 프롬프트 크기가 일정하게 유지되도록 dict repr 대신 간결한 텍스트로 렌더링한다
+"""
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import tiktoken
+
+ROLE_LABELS = {"user": "사용자", "assistant": "AI"}
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str) -> Optional["tiktoken.Encoding"]:
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            # 모델명을 모르는 tiktoken 버전이면 기본 인코딩 사용
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # 인코딩 파일을 내려받지 못하면 글자 수로 근사
+        print(f"⚠️ tiktoken 인코딩 로드 실패, 글자 수로 토큰 수 근사: {e}")
+        return None
+
+
+class HistoryWindow:
+    """최근 K턴을 토큰 예산 안에서 그대로 유지하고 나머지는 요약 대상으로 분리"""
+
+    def __init__(self, recent_turns: int = 6, max_tokens: int = 1200, model: str = "gpt-4o-mini"):
+        self.recent_turns = recent_turns
+        self.max_tokens = max_tokens
+        self._encoding = _get_encoding(model)
+        # 같은 발화가 매 턴 다시 계산되지 않도록 메시지별 토큰 수 캐시
+        self.count_tokens = lru_cache(maxsize=4096)(self._count_tokens)
+
+    def _count_tokens(self, text: str) -> int:
+        if self._encoding is None:
+            return len(text)
+        return len(self._encoding.encode(text))
+
+    @staticmethod
+    def dialogue(message_history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """system 메시지를 제외한 실제 대화 메시지 목록"""
+        return [m for m in message_history if m.get("role") in ROLE_LABELS]
+
+    def split(self, message_history: List[Dict[str, str]], summarized_count: int = 0) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+        """(요약에 새로 합칠 메시지, 그대로 유지할 최근 메시지)로 분리
+
+        summarized_count는 이미 요약에 반영된 앞쪽 대화 메시지 수.
+        """
+        dialogue = self.dialogue(message_history)
+
+        # 뒤에서부터 최근 K턴(메시지 2K개)을 토큰 예산 안에서 채움
+        budget = self.max_tokens
+        start = len(dialogue)
+        while start > summarized_count and len(dialogue) - start < self.recent_turns * 2:
+            cost = self.count_tokens(self.render_message(dialogue[start - 1]))
+            if cost > budget and start < len(dialogue):
+                break
+            budget -= cost
+            start -= 1
+
+        return dialogue[summarized_count:start], dialogue[start:]
+
+    @staticmethod
+    def render_message(message: Dict[str, str]) -> str:
+        return f"{ROLE_LABELS.get(message.get('role'), message.get('role'))}: {message.get('content', '')}"
+
+    def render(self, summary: str, recent: List[Dict[str, str]]) -> str:
+        """요약 + 최근 대화를 프롬프트용 텍스트로 렌더링"""
+        lines = []
+        if summary:
+            lines.append(f"[이전 대화 요약] {summary}")
+        lines.extend(self.render_message(m) for m in recent)
+        return "\n".join(lines) if lines else "(없음)"
@@ -5,6 +5,7 @@ import base64
 import json
 
 from core.config import settings
+from core.llm_gateway import llm_gateway
 
 class ImageAnalyzer:
     """GPT-4o를 사용한 이미지 분석"""
@@ -22,6 +23,7 @@ class ImageAnalyzer:
             api_version=self.api_version,
             azure_endpoint=self.azure_endpoint,
             api_key=self.api_key,
+            max_retries=0,  # 재시도/속도 제한은 llm_gateway에서 처리
         )
     
     def _setup_langsmith(self):
@@ -44,7 +46,8 @@ class ImageAnalyzer:
             return None
         
         try:
-            response = self.client.chat.completions.create(
+            response = llm_gateway.chat_completion(
+                self.client,
                 model=self.deployment,
                 messages=[{
                     "role": "user",
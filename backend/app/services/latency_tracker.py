@@ -0,0 +1,64 @@
+"""
+노드별 LLM 지연 시간 추적
+응답 생성 노드의 첫 토큰까지 걸린 시간을 최근 구간(window)으로 보관해 p50/p95/p99를 계산하고,
+헤지 요청을 보낼 기준 시간(설정한 백분위수)을 노드별로 자동 결정한다
+"""
+import math
+from collections import deque
+from typing import Any, Deque, Dict
+
+
+class LatencyTracker:
+    """노드별 최근 지연 시간 표본과 헤지/예산 초과 횟수"""
+
+    def __init__(
+        self,
+        window: int = 500,
+        hedge_percentile: float = 95.0,
+        min_samples: int = 20,
+        initial_hedge_delay: float = 3.0,
+        min_hedge_delay: float = 0.5,
+    ):
+        self.window = window
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.initial_hedge_delay = initial_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self._samples: Dict[str, Deque[float]] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def record(self, node: str, seconds: float) -> None:
+        self._samples.setdefault(node, deque(maxlen=self.window)).append(seconds)
+
+    def count(self, node: str, event: str) -> None:
+        """헤지 발사(hedged) / 헤지 채택(hedge_won) / 예산 초과(budget_exceeded) 횟수"""
+        counters = self._counters.setdefault(node, {})
+        counters[event] = counters.get(event, 0) + 1
+
+    def percentile(self, node: str, percentile: float) -> float:
+        samples = sorted(self._samples.get(node) or ())
+        if not samples:
+            return 0.0
+        # nearest-rank 방식
+        rank = max(1, math.ceil(percentile / 100 * len(samples)))
+        return samples[rank - 1]
+
+    def hedge_delay(self, node: str) -> float:
+        """헤지 요청을 보낼 대기 시간 (표본이 부족하면 초기값)"""
+        if len(self._samples.get(node) or ()) < self.min_samples:
+            return self.initial_hedge_delay
+        return max(self.min_hedge_delay, self.percentile(node, self.hedge_percentile))
+
+    def stats(self) -> Dict[str, Any]:
+        nodes = set(self._samples) | set(self._counters)
+        return {
+            node: {
+                "samples": len(self._samples.get(node) or ()),
+                "p50": round(self.percentile(node, 50), 3),
+                "p95": round(self.percentile(node, 95), 3),
+                "p99": round(self.percentile(node, 99), 3),
+                "hedge_delay": round(self.hedge_delay(node), 3),
+                **self._counters.get(node, {}),
+            }
+            for node in sorted(nodes)
+        }
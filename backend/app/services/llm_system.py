@@ -13,6 +13,7 @@ import os
 import uuid
 
 from core.config import settings
+from core.llm_gateway import llm_gateway
 from db.database import get_db
 
 @dataclass
@@ -188,7 +189,8 @@ class OptimizedDementiaSystem:
 
 어르신의 답변에 맞춰 자연스럽게 대화를 이어가는 질문을 해주세요."""
 
-            response = self.chat_system.client.chat.completions.create(
+            response = llm_gateway.chat_completion(
+                self.chat_system.client,
                 model=self.chat_system.deployment,
                 messages=self.chat_system.conversation_history + [
                     {"role": "user", "content": next_question_prompt}
@@ -0,0 +1,99 @@
+"""
+사진 컨텍스트 캐시
+photo_id별 photos 행과 미리 렌더링한 프롬프트 조각(기본 정보, 분석 결과, fallback 메타데이터)을 워커 메모리에 보관
+같은 사진이 가족 구성원·세션 간에 공유되므로 매 턴/세션마다 사진 행을 다시 읽고 문자열을 다시 만들지 않는다
+사진 분석 결과가 새로 저장되면 routers/photos.py에서 무효화한다
+무효화는 요청을 처리한 워커의 캐시만 지우므로, 다른 워커는 TTL(PHOTO_CACHE_TTL_SECONDS)이 지날 때까지 이전 사진 정보를 쓸 수 있다
+(워커 간 무효화 채널이 없어 TTL을 짧게 두고, 매 턴 사진 행을 읽어야 하는 updated_at 버전 키는 쓰지 않음)
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from core.cache import TTLCache
+from core.config import settings
+
+
+@dataclass
+class PhotoContext:
+    """photos 행과 프롬프트 조각"""
+    row: Dict[str, Any]
+    basic_info: str  # 설명/위치/태그
+    analysis_info: str  # 분석 결과 요약 (없으면 빈 문자열)
+    photo_description: str  # STANDARD_RESPONSE_PROMPT의 사진 메타데이터
+    fallback_metadata: str  # FALLBACK 컨텍스트용 간단 버전
+    system_content: str  # 대화 히스토리 system 메시지에 붙는 사진 정보
+
+
+def build_photo_context(row: Dict[str, Any]) -> PhotoContext:
+    """사진 행으로 프롬프트 조각 렌더링"""
+    # 기본 사진 정보
+    tags = ', '.join(row.get('tags') or [])
+    basic_info = f"사진 정보: {row.get('description', '')}, 위치: {row.get('location_name', '')}, 태그: {tags}"
+
+    # 분석 결과 추가
+    analysis_parts = []
+    fallback_parts = []
+    analyze_result = row.get('photo_analyze_result')
+    if analyze_result:
+        if analyze_result.get('caption'):
+            analysis_parts.append(f"분석 설명: {analyze_result['caption']}")
+            fallback_parts.append(f"사진: {analyze_result['caption'][:50]}...")
+        if analyze_result.get('mood'):
+            analysis_parts.append(f"분위기: {analyze_result['mood']}")
+            fallback_parts.append(f"분위기: {analyze_result['mood']}")
+        if analyze_result.get('key_objects'):
+            analysis_parts.append(f"주요 객체: {', '.join(analyze_result['key_objects'])}")
+        if analyze_result.get('people_description'):
+            analysis_parts.append(f"인물: {analyze_result['people_description']}")
+        if analyze_result.get('time_of_day'):
+            analysis_parts.append(f"시간대: {analyze_result['time_of_day']}")
+
+    analysis_info = ', '.join(analysis_parts)
+    return PhotoContext(
+        row=row,
+        basic_info=basic_info,
+        analysis_info=analysis_info,
+        photo_description=f"{basic_info}\n분석 결과: {analysis_info}" if analysis_info else basic_info,
+        fallback_metadata=f"참고: {', '.join(fallback_parts)}" if fallback_parts else "",
+        system_content=f" 현재 사진 정보: 파일명({row.get('filename', 'N/A')}), 설명({row.get('description', 'N/A')}), 위치({row.get('location_name', 'N/A')}), 태그({tags})",
+    )
+
+
+class PhotoContextCache:
+    """photo_id → PhotoContext LRU/TTL 캐시"""
+
+    def __init__(self, max_photos: int = 5000, ttl_seconds: float = 600):
+        self._cache = TTLCache(max_size=max_photos, ttl_seconds=ttl_seconds)
+
+    def get(self, photo_id: Optional[str]) -> Optional[PhotoContext]:
+        if not photo_id:
+            return None
+        return self._cache.get(photo_id)
+
+    def put(self, row: Dict[str, Any]) -> PhotoContext:
+        context = build_photo_context(row)
+        self._cache.set(row["id"], context)
+        return context
+
+    def context_for(self, row: Optional[Dict[str, Any]]) -> Optional[PhotoContext]:
+        """사진 행의 프롬프트 조각 (캐시에 있으면 재사용, 없으면 렌더링만 하고 캐시는 DB에서 읽은 행으로만 채움)"""
+        if not row:
+            return None
+        cached = self.get(row.get("id"))
+        if cached is not None:
+            return cached
+        return build_photo_context(row)
+
+    def invalidate(self, photo_id: str) -> None:
+        """사진 분석 결과 등 사진 행이 바뀌면 호출"""
+        self._cache.pop(photo_id)
+
+    def stats(self):
+        return self._cache.stats()
+
+
+# 워커 전역 사진 컨텍스트 캐시 (대화 워크플로우와 사진 라우터가 공유)
+photo_cache = PhotoContextCache(
+    max_photos=settings.PHOTO_CACHE_MAX_PHOTOS,
+    ttl_seconds=settings.PHOTO_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,193 @@
+"""
+사진별 평가 질문 뱅크
+사진 분석이 끝나면 Celery 작업(generate_photo_question_bank)이 기억등록/기억회상 질문과 브릿지 문장을 미리 만들어
+cist_question_templates에 photo_id, context_type = 'photo_bank'로 저장한다
+(배경 질문 생성 작업이 만든 사진별 질문은 등록/회상 짝이 없으므로 template_index에서 같은 사진의 대화에만 검색됨)
+대화 중에는 (photo_id) 인덱스 조회 한 번으로 뱅크를 워커 메모리에 올리고, 평가 턴에서는 LLM/임베딩 호출 없이 질문을 고른다
+"""
+import json
+import uuid
+from typing import Any, Dict, List, Optional
+
+from supabase import AsyncClient
+
+from core.cache import TTLCache
+from core.config import settings
+from core.metrics import SUPABASE_QUERY_SECONDS
+
+from .response_cache import normalize_utterance
+from .template_index import PHOTO_BANK_CONTEXT
+
+PHOTO_BANK_COLUMNS = "id, category, template_text, bridge_text, pair_id, difficulty_level, photo_id, created_at"
+
+_QUESTION_ITEM_SCHEMA = {
+    "type": "object",
+    "properties": {"bridge": {"type": "string"}, "question": {"type": "string"}},
+    "required": ["bridge", "question"],
+    "additionalProperties": False,
+}
+
+# 질문 뱅크 생성 구조화 출력 스키마 (OpenAI response_format, strict 모드라 최상위는 객체)
+PHOTO_QUESTION_BANK_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "photo_question_bank",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "question_sets": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "words": {"type": "array", "items": {"type": "string"}},
+                            "difficulty": {"type": "integer"},
+                            "registration": _QUESTION_ITEM_SCHEMA,
+                            "recall": _QUESTION_ITEM_SCHEMA,
+                        },
+                        "required": ["words", "difficulty", "registration", "recall"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["question_sets"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+class PhotoQuestionBank:
+    """photo_id → 사진별 질문 템플릿 목록 캐시 (빈 뱅크는 생성 작업이 끝나면 보이도록 짧게 캐시)"""
+
+    def __init__(self, max_photos: int = 5000, ttl_seconds: float = 600, empty_ttl_seconds: float = 60):
+        self._cache = TTLCache(max_size=max_photos, ttl_seconds=ttl_seconds)
+        self.empty_ttl_seconds = empty_ttl_seconds
+
+    def get(self, photo_id: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        if not photo_id:
+            return None
+        return self._cache.get(photo_id)
+
+    async def load(self, client: AsyncClient, photo_id: Optional[str]) -> List[Dict[str, Any]]:
+        """사진의 질문 뱅크 (캐시 우선, 없으면 photo_id 인덱스로 조회)"""
+        if not photo_id:
+            return []
+        rows = self.get(photo_id)
+        if rows is not None:
+            return rows
+        with SUPABASE_QUERY_SECONDS.time(table="cist_question_templates", operation="select"):
+            response = await client.table("cist_question_templates").select(
+                PHOTO_BANK_COLUMNS
+            ).eq("photo_id", photo_id).eq("context_type", PHOTO_BANK_CONTEXT).order("created_at").execute()
+        rows = response.data or []
+        self._cache.set(photo_id, rows, ttl_seconds=None if rows else self.empty_ttl_seconds)
+        return rows
+
+    def size(self, photo_id: Optional[str], category: Optional[str] = None) -> int:
+        """캐시에 올라온 뱅크의 질문 수 (아직 조회하지 않은 사진은 0)"""
+        return sum(1 for row in self.get(photo_id) or () if category is None or row["category"] == category)
+
+    def invalidate(self, photo_id: str) -> None:
+        """사진 분석으로 뱅크를 다시 만들 때 호출"""
+        self._cache.pop(photo_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+def select_photo_question(
+    rows: List[Dict[str, Any]],
+    category: str,
+    message_history: List[Dict[str, str]],
+) -> Optional[Dict[str, Any]]:
+    """뱅크에서 이번 평가 턴에 쓸 질문 선택 (이미 한 질문 제외)
+
+    기억회상은 이 대화에서 이미 물어본 기억등록 질문과 같은 pair_id를 가진 질문만 고른다.
+    """
+    asked = [normalize_utterance(message["content"]) for message in message_history if message.get("role") == "assistant"]
+
+    def was_asked(row: Dict[str, Any]) -> bool:
+        text = normalize_utterance(row["template_text"])
+        return any(text and text in message for message in asked)
+
+    candidates = [row for row in rows if row["category"] == category and not was_asked(row)]
+    if not candidates:
+        return None
+    if category == "memory_recall":
+        asked_pairs = {
+            row["pair_id"] for row in rows
+            if row["category"] == "memory_registration" and row.get("pair_id") and was_asked(row)
+        }
+        paired = [row for row in candidates if row.get("pair_id") in asked_pairs]
+        # 짝이 맞는 등록 질문을 하지 않았으면 회상 질문을 낼 수 없음
+        return paired[0] if paired else None
+    # 기억등록은 짝이 되는 회상 질문이 있는 질문을 먼저 사용
+    recall_pairs = {row.get("pair_id") for row in rows if row["category"] == "memory_recall" and row.get("pair_id")}
+    return min(candidates, key=lambda row: row.get("pair_id") not in recall_pairs)
+
+
+def parse_question_bank_output(text: str) -> List[Dict[str, Any]]:
+    """질문 뱅크 생성 응답 → 저장할 질문 목록 (template_rows 입력 형식)
+
+    세트마다 등록/회상 질문과 브릿지 문장이 모두 있고 등록 질문에 단어 3개가 모두 들어 있을 때만
+    같은 pair_id로 두 질문을 만든다. 응답 자체가 스키마에 맞지 않으면 ValueError.
+    """
+    output = json.loads(text)
+    question_sets = output.get("question_sets") if isinstance(output, dict) else None
+    if not isinstance(question_sets, list):
+        raise ValueError(f"invalid question bank output: {text[:200]!r}")
+
+    questions = []
+    for question_set in question_sets:
+        items = _valid_question_set(question_set)
+        if items is None:
+            print(f"⚠️ 형식이 잘못된 질문 세트 제외: {question_set!r}")
+            continue
+        registration, recall, difficulty = items
+        pair_id = str(uuid.uuid4())
+        for category, item in (("memory_registration", registration), ("memory_recall", recall)):
+            questions.append({
+                "category": category,
+                "question": item["question"].strip(),
+                "bridge": item["bridge"].strip(),
+                "difficulty": difficulty,
+                "pair_id": pair_id
+            })
+    return questions
+
+
+def _valid_question_set(question_set: Any) -> Optional[tuple]:
+    """(등록 질문, 회상 질문, 난이도) 또는 형식이 잘못되었으면 None"""
+    if not isinstance(question_set, dict):
+        return None
+    words = question_set.get("words")
+    if not isinstance(words, list) or len(words) != 3 or not all(isinstance(w, str) and w.strip() for w in words):
+        return None
+    items = [question_set.get("registration"), question_set.get("recall")]
+    for item in items:
+        if not isinstance(item, dict):
+            return None
+        if not all(isinstance(item.get(key), str) and item[key].strip() for key in ("bridge", "question")):
+            return None
+    # 기억등록 질문은 외울 단어를 직접 말해야 함
+    if not all(word.strip() in items[0]["question"] for word in words):
+        return None
+    difficulty = question_set.get("difficulty")
+    difficulty = min(5, max(1, difficulty)) if isinstance(difficulty, int) and not isinstance(difficulty, bool) else 1
+    return items[0], items[1], difficulty
+
+
+def render_photo_question(row: Dict[str, Any]) -> str:
+    """브릿지 문장 + 평가 질문"""
+    bridge = (row.get("bridge_text") or "").strip()
+    return f"{bridge} {row['template_text']}" if bridge else row["template_text"]
+
+
+# 워커 전역 사진 질문 뱅크 (대화 워크플로우와 사진 라우터가 공유)
+photo_question_bank = PhotoQuestionBank(
+    max_photos=settings.PHOTO_BANK_MAX_PHOTOS,
+    ttl_seconds=settings.PHOTO_BANK_TTL_SECONDS,
+    empty_ttl_seconds=settings.PHOTO_BANK_EMPTY_TTL_SECONDS
+)
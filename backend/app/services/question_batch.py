@@ -0,0 +1,271 @@
+"""
+고품질 질문 생성 Batch API 파이프라인
+QUESTION_GENERATION_MODE=batch이면 generate_high_quality_questions 작업이 GPT-4를 바로 호출하지 않고 맥락을 Redis 목록에 쌓는다
+주기 작업이 쌓인 맥락을 JSONL 요청 파일로 만들어 배치 백엔드(OpenAI Batch API 또는 로컬 대체 백엔드)에 제출하고,
+완료된 배치의 결과를 파싱해 cist_question_templates에 일괄 저장한다 (저장은 tasks.poll_question_batches)
+"""
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from core.config import settings
+
+from .dialogue_prompt import HIGH_QUALITY_QUESTION_PROMPT, HIGH_QUALITY_QUESTION_SYSTEM_PROMPT
+
+SPOOL_KEY = "question_batch:contexts"
+INFLIGHT_KEY = "question_batch:inflight"
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+# 배치 종료 상태 (expired/cancelled는 끝나지 않은 요청만 다시 쌓음)
+TERMINAL_STATES = {"completed", "failed", "expired", "cancelled"}
+RETRYABLE_STATES = {"expired", "cancelled"}
+MAX_BATCH_ATTEMPTS = 2
+
+
+def context_photo_id(context: Dict[str, Any]) -> Optional[str]:
+    return context.get("photo_id") or (context.get("photo_context") or {}).get("photo_id")
+
+
+def build_question_prompt(context: Dict[str, Any]) -> str:
+    """질문 생성 맥락 → 사용자 프롬프트 (즉시 생성과 배치 요청이 같은 프롬프트를 사용)"""
+    user_messages = context.get("user_messages") or [context.get("user_message", "")]
+    category = context.get("category")
+    focus = f"{category} 카테고리 질문을 우선 생성하세요." if category else "카테고리를 고르게 섞어 생성하세요."
+    return HIGH_QUALITY_QUESTION_PROMPT.format(
+        user_messages=" / ".join(user_messages),
+        photo_context=context.get("photo_context", {}),
+        focus=focus
+    )
+
+
+def write_batch_file(contexts: Dict[str, Dict[str, Any]], directory: str, model: str) -> str:
+    """{custom_id: 맥락} → Batch API 요청 JSONL 파일 경로"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"questions_{time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        for custom_id, context in contexts.items():
+            request = {
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": {
+                    "model": model,
+                    "messages": [
+                        {"role": "system", "content": HIGH_QUALITY_QUESTION_SYSTEM_PROMPT},
+                        {"role": "user", "content": build_question_prompt(context)}
+                    ]
+                }
+            }
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+    return path
+
+
+@dataclass
+class BatchResults:
+    """배치 결과 파싱 결과"""
+    questions: Dict[str, list] = field(default_factory=dict)  # custom_id → 생성된 질문 목록
+    failed: Dict[str, str] = field(default_factory=dict)  # custom_id → 오류
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+def parse_batch_output(lines: Iterable[str]) -> BatchResults:
+    """Batch API 결과 JSONL → 요청별 질문 목록 (요청 오류나 JSON이 아닌 응답은 failed로 분류)
+
+    JSON으로 읽을 수 없는 결과 줄은 어느 요청인지 알 수 없으므로 건너뛴다 (해당 요청은 결과 없음으로 남음).
+    """
+    results = BatchResults()
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            custom_id = item["custom_id"]
+        except (ValueError, TypeError, KeyError) as e:
+            print(f"⚠️ 배치 결과 줄 파싱 실패, 건너뜀: {e}: {line[:200]!r}")
+            continue
+        response = item.get("response") or {}
+        if item.get("error") or response.get("status_code") != 200:
+            results.failed[custom_id] = str(item.get("error") or f"status {response.get('status_code')}")
+            continue
+        body = response.get("body") or {}
+        usage = body.get("usage") or {}
+        results.prompt_tokens += usage.get("prompt_tokens", 0)
+        results.completion_tokens += usage.get("completion_tokens", 0)
+        try:
+            questions = json.loads(body["choices"][0]["message"]["content"])
+            if not isinstance(questions, list):
+                raise ValueError("response is not a JSON array")
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            results.failed[custom_id] = f"invalid response: {e}"
+            continue
+        results.questions[custom_id] = questions
+    return results
+
+
+class QuestionSpool:
+    """Redis에 쌓인 질문 생성 맥락과 제출된 배치 기록 (Celery 워커 간 공유)"""
+
+    def __init__(self, redis_client, key: str = SPOOL_KEY, inflight_key: str = INFLIGHT_KEY):
+        self.redis = redis_client
+        self.key = key
+        self.inflight_key = inflight_key
+
+    def push(self, *contexts: Dict[str, Any]) -> int:
+        if not contexts:
+            return self.size()
+        return self.redis.rpush(self.key, *(json.dumps(context, ensure_ascii=False) for context in contexts))
+
+    def pop(self, limit: int) -> List[Dict[str, Any]]:
+        """앞에서부터 최대 limit개를 꺼냄 (조회와 삭제를 한 트랜잭션으로 처리해 워커 간 중복 제출 방지)"""
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.lrange(self.key, 0, limit - 1)
+        pipe.ltrim(self.key, limit, -1)
+        items, _ = pipe.execute()
+        return [json.loads(item) for item in items]
+
+    def requeue(self, contexts: List[Dict[str, Any]]) -> None:
+        """제출하지 못한 맥락을 원래 순서대로 앞에 되돌림"""
+        if contexts:
+            self.redis.lpush(self.key, *(json.dumps(context, ensure_ascii=False) for context in reversed(contexts)))
+
+    def size(self) -> int:
+        return self.redis.llen(self.key)
+
+    def track(self, batch_id: str, record: Dict[str, Any]) -> None:
+        self.redis.hset(self.inflight_key, batch_id, json.dumps(record, ensure_ascii=False))
+
+    def inflight(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            batch_id.decode() if isinstance(batch_id, bytes) else batch_id: json.loads(record)
+            for batch_id, record in self.redis.hgetall(self.inflight_key).items()
+        }
+
+    def untrack(self, batch_id: str) -> None:
+        self.redis.hdel(self.inflight_key, batch_id)
+
+
+@dataclass
+class BatchStatus:
+    state: str  # in_progress / completed / failed / expired / cancelled
+    output: Optional[str] = None  # 결과 파일 (백엔드별 식별자)
+    error: Optional[str] = None
+
+
+class BatchBackend:
+    """배치 백엔드 인터페이스 (요청 파일 제출 / 상태 조회 / 결과 JSONL 읽기)"""
+
+    name = ""
+
+    def submit(self, path: str) -> str:
+        raise NotImplementedError
+
+    def status(self, batch_id: str) -> BatchStatus:
+        raise NotImplementedError
+
+    def results(self, status: BatchStatus) -> List[str]:
+        raise NotImplementedError
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """OpenAI Batch API (24시간 완료 창, 실시간 호출 대비 할인 가격)"""
+
+    name = "openai"
+
+    def __init__(self, client):
+        self.client = client
+
+    def submit(self, path: str) -> str:
+        with open(path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window="24h",
+            metadata={"source": "question_generation"}
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> BatchStatus:
+        batch = self.client.batches.retrieve(batch_id)
+        # validating/in_progress/finalizing/cancelling은 아직 진행 중
+        state = batch.status if batch.status in TERMINAL_STATES else "in_progress"
+        error = None
+        if batch.errors and batch.errors.data:
+            error = "; ".join(str(item.message) for item in batch.errors.data)
+        return BatchStatus(state=state, output=batch.output_file_id, error=error)
+
+    def results(self, status: BatchStatus) -> List[str]:
+        if not status.output:
+            return []
+        return self.client.files.content(status.output).text.splitlines()
+
+
+def default_local_responder(body: Dict[str, Any]) -> str:
+    """로컬 백엔드 기본 응답 (요청 프롬프트의 우선 카테고리로 고정 질문 하나 생성)"""
+    prompt = body["messages"][-1]["content"]
+    category = next(
+        (line.split(" 카테고리")[0].strip() for line in prompt.splitlines() if "카테고리 질문을 우선" in line),
+        "orientation_time"
+    )
+    return json.dumps([{"category": category, "question": f"{category} 확인 질문입니다. 답해 주시겠어요?", "difficulty": 2}], ensure_ascii=False)
+
+
+class LocalBatchBackend(BatchBackend):
+    """로컬 대체 백엔드 (제출 즉시 responder로 결과 JSONL을 만들어 OpenAI 결과 형식으로 저장, 개발·테스트용)"""
+
+    name = "local"
+
+    def __init__(self, directory: str, responder: Callable[[Dict[str, Any]], str] = default_local_responder):
+        self.directory = directory
+        self.responder = responder
+
+    def submit(self, path: str) -> str:
+        batch_id = f"local_batch_{uuid.uuid4().hex}"
+        os.makedirs(self.directory, exist_ok=True)
+        with open(path, encoding="utf-8") as requests, open(self._output_path(batch_id), "w", encoding="utf-8") as output:
+            for line in requests:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                result = {"id": f"batch_req_{uuid.uuid4().hex}", "custom_id": request["custom_id"], "response": None, "error": None}
+                try:
+                    content = self.responder(request["body"])
+                    result["response"] = {
+                        "status_code": 200,
+                        "body": {
+                            "model": request["body"]["model"],
+                            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+                        }
+                    }
+                except Exception as e:
+                    result["error"] = {"code": "local_responder_error", "message": str(e)}
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        return batch_id
+
+    def status(self, batch_id: str) -> BatchStatus:
+        path = self._output_path(batch_id)
+        if not os.path.exists(path):
+            return BatchStatus(state="failed", error="output file not found")
+        return BatchStatus(state="completed", output=path)
+
+    def results(self, status: BatchStatus) -> List[str]:
+        with open(status.output, encoding="utf-8") as f:
+            return f.read().splitlines()
+
+    def _output_path(self, batch_id: str) -> str:
+        return os.path.join(self.directory, f"{batch_id}_output.jsonl")
+
+
+def create_batch_backend(name: str) -> BatchBackend:
+    """설정 이름 → 배치 백엔드 (제출한 백엔드로 폴링하도록 배치 기록에 이름을 남김)"""
+    if name == OpenAIBatchBackend.name:
+        from openai import OpenAI
+        return OpenAIBatchBackend(OpenAI(api_key=os.getenv("OPENAI_API_KEY")))
+    if name == LocalBatchBackend.name:
+        return LocalBatchBackend(settings.QUESTION_BATCH_DIR)
+    raise ValueError(f"Unknown question batch backend: {name}")
@@ -0,0 +1,138 @@
+"""
+고품질 질문 생성 작업 병합/디바운스
+fallback 턴마다 GPT-4 작업을 바로 발행하지 않고 (photo_id, category)별로 디바운스 창 동안 대기 작업 하나만 유지하며,
+그 사이 들어온 대화 맥락(사용자 발화)은 대기 작업에 합친다
+해당 사진·카테고리의 템플릿 뱅크가 이미 충분하면 작업을 생략하고, 발행한 키는 작업이 템플릿을 채울 때까지(cooldown) 다시 발행하지 않는다
+대기 작업과 발행 기록은 워커 로컬이다
+"""
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from core.cache import TTLCache
+from core.metrics import QUESTION_JOB_REQUESTS_TOTAL
+
+JobKey = Tuple[Optional[str], Optional[str]]  # (photo_id, category)
+
+
+@dataclass
+class PendingJob:
+    """디바운스 창 동안 합쳐지는 질문 생성 작업"""
+    photo_id: Optional[str]
+    category: Optional[str]
+    photo_context: Dict[str, Any]
+    user_messages: List[str] = field(default_factory=list)
+    conversation_ids: List[str] = field(default_factory=list)
+    requests: int = 0
+
+    def context(self) -> Dict[str, Any]:
+        """Celery 작업 인자 (기존 단건 형식의 user_message/conversation_id도 유지)"""
+        return {
+            "user_message": self.user_messages[-1] if self.user_messages else "",
+            "user_messages": self.user_messages,
+            "conversation_id": self.conversation_ids[-1] if self.conversation_ids else "",
+            "conversation_ids": self.conversation_ids,
+            "photo_id": self.photo_id,
+            "category": self.category,
+            "photo_context": self.photo_context,
+        }
+
+
+class QuestionJobScheduler:
+    """(photo_id, category)별 질문 생성 작업 병합 및 지연 발행"""
+
+    def __init__(
+        self,
+        publish: Callable[[Dict[str, Any]], Awaitable[None]],
+        bank_size: Callable[[Optional[str], Optional[str]], int],
+        debounce_seconds: float = 30.0,
+        cooldown_seconds: float = 600.0,
+        saturation: int = 5,
+        max_contexts: int = 5,
+        max_keys: int = 10000,
+    ):
+        self.publish = publish
+        self.bank_size = bank_size
+        self.debounce_seconds = debounce_seconds
+        self.saturation = saturation
+        self.max_contexts = max_contexts
+        self._pending: Dict[JobKey, PendingJob] = {}
+        self._timers: Dict[JobKey, asyncio.Task] = {}
+        self._recent = TTLCache(max_size=max_keys, ttl_seconds=cooldown_seconds)
+        self.counters: Dict[str, int] = {}
+
+    def submit(
+        self,
+        photo_id: Optional[str],
+        category: Optional[str],
+        user_message: str,
+        conversation_id: str,
+        photo_context: Dict[str, Any],
+    ) -> str:
+        """질문 생성 요청 접수 후 처리 결과 반환 (scheduled/coalesced/saturated/cooldown)"""
+        key = (photo_id, category)
+        if self.bank_size(photo_id, category) >= self.saturation:
+            return self._count("saturated")
+        if key in self._recent:
+            return self._count("cooldown")
+
+        job = self._pending.get(key)
+        outcome = "coalesced"
+        if job is None:
+            job = self._pending[key] = PendingJob(photo_id, category, photo_context)
+            self._timers[key] = asyncio.get_running_loop().create_task(self._flush_later(key))
+            outcome = "scheduled"
+        job.requests += 1
+        if user_message and user_message not in job.user_messages:
+            job.user_messages = (job.user_messages + [user_message])[-self.max_contexts:]
+        if conversation_id not in job.conversation_ids:
+            job.conversation_ids.append(conversation_id)
+
+        if outcome == "coalesced":
+            return self._count(outcome)
+        return outcome
+
+    async def close(self) -> None:
+        """종료 시 대기 중인 작업을 디바운스 없이 바로 발행"""
+        for key, timer in list(self._timers.items()):
+            timer.cancel()
+            await self._flush(key)
+        self._timers.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        published = self.counters.get("published", 0)
+        avoided = sum(self.counters.get(outcome, 0) for outcome in ("coalesced", "saturated", "cooldown"))
+        requests = published + avoided + self.counters.get("failed", 0)
+        return {
+            "pending": len(self._pending),
+            **self.counters,
+            "jobs_avoided": avoided,
+            "avoided_ratio": avoided / requests if requests else 0.0,
+        }
+
+    async def _flush_later(self, key: JobKey) -> None:
+        await asyncio.sleep(self.debounce_seconds)
+        self._timers.pop(key, None)
+        await self._flush(key)
+
+    async def _flush(self, key: JobKey) -> None:
+        job = self._pending.pop(key, None)
+        if job is None:
+            return
+        # 대기하는 동안 다른 작업이 뱅크를 채웠으면 생략
+        if self.bank_size(job.photo_id, job.category) >= self.saturation:
+            self._count("saturated")
+            return
+        try:
+            await self.publish(job.context())
+            self._recent.set(key, True)
+            self._count("published")
+            print(f"📤 질문 생성 작업 발행: photo_id={job.photo_id}, category={job.category}, 병합 요청 {job.requests}개")
+        except Exception as e:
+            self._count("failed")
+            print(f"❌ 질문 생성 작업 발행 실패: photo_id={job.photo_id}, category={job.category}: {e}")
+
+    def _count(self, outcome: str) -> str:
+        self.counters[outcome] = self.counters.get(outcome, 0) + 1
+        QUESTION_JOB_REQUESTS_TOTAL.inc(outcome=outcome)
+        return outcome
@@ -0,0 +1,79 @@
+"""
+반복 발화 응답 캐시
+같은 세션·같은 사진에서 사용자가 거의 같은 말을 반복하면 LLM을 다시 호출하지 않고 직전 응답을 재사용한다
+발화는 공백/문장부호를 제거하고 한글을 정규화한 형태로 비교하며, 유사도가 기준 이상이면 같은 발화로 본다
+"""
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.cache import TTLCache
+
+
+def normalize_utterance(text: str) -> str:
+    """비교용 발화 정규화 (호환 자모 → 완성형 한글, 소문자, 문자/숫자만 남김)"""
+    # NFKC로 호환 자모·전각 문자를 표준 형태로 바꾼 뒤 NFC로 한글 음절 조합
+    text = unicodedata.normalize("NFC", unicodedata.normalize("NFKC", text or "")).lower()
+    return "".join(ch for ch in text if unicodedata.category(ch)[0] in ("L", "N"))
+
+
+class ResponseCache:
+    """(conversation_id, photo_id)별 최근 발화 → 응답 캐시"""
+
+    def __init__(
+        self,
+        max_scopes: int = 2000,
+        max_entries_per_scope: int = 20,
+        ttl_seconds: float = 600,
+        similarity_threshold: float = 0.9,
+        min_chars: int = 4,
+    ):
+        self._scopes = TTLCache(max_size=max_scopes, ttl_seconds=ttl_seconds)
+        self.max_entries_per_scope = max_entries_per_scope
+        self.similarity_threshold = similarity_threshold
+        self.min_chars = min_chars
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, conversation_id: str, photo_id: Optional[str], user_message: str) -> Optional[str]:
+        """거의 같은 이전 발화에 대한 응답 반환 (없으면 None)"""
+        normalized = normalize_utterance(user_message)
+        # "네", "응" 같은 짧은 대답은 맥락에 따라 응답이 달라야 하므로 캐시하지 않음
+        if len(normalized) < self.min_chars:
+            return None
+
+        entries: List[Tuple[str, str]] = self._scopes.get((conversation_id, photo_id)) or []
+        best_score, best_response = 0.0, None
+        for cached_utterance, response in entries:
+            if cached_utterance == normalized:
+                best_score, best_response = 1.0, response
+                break
+            score = SequenceMatcher(None, cached_utterance, normalized).ratio()
+            if score > best_score:
+                best_score, best_response = score, response
+
+        if best_response is not None and best_score >= self.similarity_threshold:
+            self.hits += 1
+            return best_response
+        self.misses += 1
+        return None
+
+    def put(self, conversation_id: str, photo_id: Optional[str], user_message: str, response: str) -> None:
+        normalized = normalize_utterance(user_message)
+        if len(normalized) < self.min_chars or not response:
+            return
+
+        key = (conversation_id, photo_id)
+        entries = [entry for entry in (self._scopes.get(key) or []) if entry[0] != normalized]
+        entries.append((normalized, response))
+        # 세션당 최근 발화만 유지
+        self._scopes.set(key, entries[-self.max_entries_per_scope:])
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "scopes": len(self._scopes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,159 @@
+"""
+라우터 빠른 경로 분류기
+세 번째 턴 이후 standard_chat / assessment_chat 결정 중 규칙으로 명확한 경우를 네트워크 호출 없이 처리하고,
+애매한 경우에만 LLM 라우터(ROUTER_PROMPT)를 호출하도록 "uncertain"을 반환한다
+"""
+import json
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# llm_system.check_end_keywords와 같은 종료 키워드
+END_KEYWORDS = ['종료', 'exit', 'quit', 'q', '그만', '끝', '종료해줘', '그만해', '멈춰']
+
+# 한글 종료 키워드는 어간 + 허용 어미로만 비교 ("그만큼", "끝까지", "끝내주게" 같은 다른 단어는 제외)
+_KOREAN_END_SUFFIXES: Dict[str, Tuple[str, ...]] = {
+    "종료": ("", "요", "해", "해요", "해줘", "해줘요", "해주세요", "할래", "할래요", "하자", "할게요", "합니다"),
+    "그만": ("", "요", "해", "해요", "해줘", "해줘요", "해주세요", "할래", "할래요", "하자", "합시다", "할게", "할게요", "둘래", "둘래요"),
+    "끝": ("", "이야", "이에요", "입니다", "내", "내요", "내자", "내줘", "내줘요", "낼래", "낼래요", "낼게요"),
+    "멈춰": ("", "요", "줘", "줘요", "주세요"),
+}
+
+# ROUTER_PROMPT 기억등록 트리거의 카테고리 예시 (동일 카테고리 단어 3개 이상이면 기억등록)
+CATEGORY_WORDS: Dict[str, Tuple[str, ...]] = {
+    "과일": ("사과", "배", "복숭아", "포도", "수박", "참외", "딸기", "귤", "감", "바나나"),
+    "장소": ("집", "학교", "병원", "시장", "교회", "절", "공원", "바다", "산", "역"),
+    "교통수단": ("자동차", "택시", "버스", "기차", "자전거", "배", "비행기", "지하철"),
+    "식재료": ("소금", "설탕", "다시다", "간장", "된장", "고추장", "참기름", "식초"),
+    "채소": ("파", "당근", "감자", "배추", "무", "양파", "고구마", "오이", "호박"),
+}
+
+ASSESSMENT_CHAT = "assessment_chat"
+STANDARD_CHAT = "standard_chat"
+UNCERTAIN = "uncertain"
+
+_WORD_PATTERN = re.compile(r"[가-힣A-Za-z]+")
+
+# LLM 라우터 구조화 출력 스키마 (OpenAI response_format, strict 모드라 자유 텍스트가 나오지 않음)
+ROUTER_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "route_decision",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "route": {"type": "string", "enum": [STANDARD_CHAT, ASSESSMENT_CHAT]},
+                "assessment_item": {"type": ["string", "null"], "enum": ["registration", "recall", None]},
+            },
+            "required": ["route", "assessment_item"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# 카테고리 단어 뒤에 붙을 수 있는 조사 ("사과를", "버스에서")
+_PARTICLES = ("", "이", "가", "을", "를", "은", "는", "도", "의", "에", "에서", "에는", "으로", "로", "와", "과", "랑", "이랑", "하고", "만", "까지", "이나", "나")
+
+
+@dataclass
+class RouteDecision:
+    """분류 결과 (route가 "uncertain"이면 LLM 라우터 호출)"""
+    route: str
+    assessment_item: Optional[str] = None  # "registration" 또는 "recall"
+    reason: str = ""
+
+
+class RouteClassifier:
+    """규칙/특징 기반 라우팅 분류기 (경로별 발생 횟수 기록)"""
+
+    def __init__(self, min_turns_between: int = 2, recall_delay: int = 6, short_answer_chars: int = 4):
+        self.min_turns_between = min_turns_between
+        self.recall_delay = recall_delay
+        self.short_answer_chars = short_answer_chars
+        self.path_counts: Dict[str, int] = {}
+
+    def record(self, path: str) -> None:
+        self.path_counts[path] = self.path_counts.get(path, 0) + 1
+
+    def classify(
+        self,
+        turn_count: int,
+        user_message: str,
+        recent_messages: List[Dict[str, str]],
+        assessment_turns: Dict[str, int],
+        last_attempt_turn: int = 0,
+    ) -> RouteDecision:
+        """라우팅 결정 (assessment_turns: 평가 항목 → 실행된 턴 번호, last_attempt_turn: 마지막 평가 라우팅 턴)"""
+        # 대화 시작 후 3번째 턴은 반드시 일상대화
+        if turn_count <= 3:
+            return RouteDecision(STANDARD_CHAT, reason="third_turn")
+
+        if self._has_end_keyword(user_message):
+            return RouteDecision(STANDARD_CHAT, reason="end_keyword")
+
+        # 같은 평가항목은 세션당 1회 → 기억회상까지 끝났으면 더 할 평가가 없음
+        if "recall" in assessment_turns:
+            return RouteDecision(STANDARD_CHAT, reason="recall_done")
+
+        # 기억회상은 기억등록 recall_delay턴(ROUTER_RECALL_DELAY_TURNS) 뒤에 반드시 실행
+        registration_turn = assessment_turns.get("registration")
+        if registration_turn is not None:
+            if turn_count - registration_turn >= self.recall_delay:
+                return RouteDecision(ASSESSMENT_CHAT, "recall", reason="recall_due")
+            return RouteDecision(STANDARD_CHAT, reason="recall_wait")
+
+        # 두 번째 턴(언어기능 평가)이 항상 마지막 평가의 기준점
+        # 템플릿이 없어 평가 질문을 못 한 턴도 기준에 포함 (매 턴 평가로 라우팅되지 않도록)
+        last_assessment_turn = max([2, last_attempt_turn, *assessment_turns.values()])
+        if turn_count - last_assessment_turn < self.min_turns_between:
+            return RouteDecision(STANDARD_CHAT, reason="assessment_cooldown")
+
+        if len(user_message.strip()) <= self.short_answer_chars:
+            return RouteDecision(STANDARD_CHAT, reason="short_answer")
+
+        # 최근 5턴 안의 동일 카테고리 단어 수
+        best_count = self._max_category_count(recent_messages + [{"role": "user", "content": user_message}])
+        if best_count >= 3:
+            return RouteDecision(ASSESSMENT_CHAT, "registration", reason="category_trigger")
+        if best_count == 0:
+            return RouteDecision(STANDARD_CHAT, reason="no_category_words")
+
+        return RouteDecision(UNCERTAIN, reason="uncertain")
+
+    @staticmethod
+    def parse_llm_output(text: str) -> Tuple[str, Optional[str]]:
+        """LLM 라우터 구조화 출력(ROUTER_RESPONSE_FORMAT) 파싱 (스키마에 맞지 않으면 ValueError)"""
+        output = json.loads(text)
+        route = output.get("route") if isinstance(output, dict) else None
+        assessment_item = output.get("assessment_item") if isinstance(output, dict) else None
+        if route not in (STANDARD_CHAT, ASSESSMENT_CHAT) or assessment_item not in ("registration", "recall", None):
+            raise ValueError(f"invalid router output: {text!r}")
+        # 평가 항목 없이 평가를 고르면 실행할 질문이 없으므로 일상대화
+        if route == ASSESSMENT_CHAT and assessment_item:
+            return ASSESSMENT_CHAT, assessment_item
+        return STANDARD_CHAT, None
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.path_counts)
+
+    @staticmethod
+    def _has_end_keyword(user_message: str) -> bool:
+        # 단어 단위로만 비교 ("q"가 "quite"에, "그만"이 "그만큼"에 걸리지 않도록)
+        for token in _WORD_PATTERN.findall(user_message.lower()):
+            if token in END_KEYWORDS:
+                return True
+            if any(token.startswith(stem) and token[len(stem):] in suffixes for stem, suffixes in _KOREAN_END_SUFFIXES.items()):
+                return True
+        return False
+
+    @staticmethod
+    def _max_category_count(messages: List[Dict[str, str]]) -> int:
+        text = " ".join(m.get("content", "") for m in messages[-10:])
+        words = _WORD_PATTERN.findall(text)
+        best = 0
+        for category_words in CATEGORY_WORDS.values():
+            # 조사가 붙은 형태도 세되 "감사", "배고파" 같은 다른 단어는 제외, 같은 단어는 한 번만
+            found = {w for w in category_words if any(token.startswith(w) and token[len(w):] in _PARTICLES for token in words)}
+            best = max(best, len(found))
+        return best
@@ -0,0 +1,74 @@
+"""
+대화 세션 상태 캐시
+매 턴 DB에서 사진 정보와 전체 대화 내역을 다시 읽지 않도록 conversation_id별 상태를 워커 메모리에 보관
+캐시 미스일 때만 init_state_node가 Supabase에서 상태를 복원한다
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from core.cache import TTLCache
+
+
+@dataclass
+class SessionState:
+    """캐시에 보관되는 세션 상태"""
+    message_history: List[Dict[str, str]]
+    photo_info: Optional[Dict[str, Any]]
+    turn_count: int  # 다음 턴 번호 (다음 conversation_order)
+    assessment_completed: Dict[str, bool] = field(default_factory=dict)
+    history_summary: str = ""  # 최근 턴 창 밖으로 밀려난 대화의 누적 요약
+    summarized_count: int = 0  # 요약에 반영된 앞쪽 대화 메시지 수 (system 메시지 제외)
+    assessment_turns: Dict[str, int] = field(default_factory=dict)  # 기억등록/회상 평가 항목 → 실행된 턴
+    precomputed_responses: Dict[str, str] = field(default_factory=dict)  # 평가 노드 → 세션 시작 시 미리 만든 응답
+    assessment_attempt_turn: int = 0  # 마지막으로 기억 평가로 라우팅된 턴 (템플릿이 없어 일반 응답으로 대체된 경우 포함)
+
+
+class SessionStateCache:
+    """conversation_id → SessionState LRU/TTL 캐시"""
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: float = 1800):
+        self._cache = TTLCache(max_size=max_sessions, ttl_seconds=ttl_seconds)
+
+    def get(self, conversation_id: str) -> Optional[SessionState]:
+        return self._cache.get(conversation_id)
+
+    def put(self, conversation_id: str, state: SessionState) -> None:
+        self._cache.set(conversation_id, state)
+
+    def invalidate(self, conversation_id: str) -> None:
+        """다음 턴에서 DB로부터 다시 복원하도록 세션 상태 제거"""
+        self._cache.pop(conversation_id)
+
+    def append_turn(
+        self,
+        conversation_id: str,
+        user_message: str,
+        ai_response: str,
+        assessment_completed: Optional[Dict[str, bool]] = None,
+        assessment_turns: Optional[Dict[str, int]] = None,
+        assessment_attempt_turn: int = 0,
+    ) -> Optional[int]:
+        """완료된 턴을 캐시된 상태에 제자리 추가하고 기록된 턴 번호 반환 (캐시에 없으면 None)"""
+        session = self._cache.get(conversation_id)
+        if session is None:
+            return None
+
+        # init_state_node가 DB에서 복원할 때와 같은 순서(ai_output → user_input)로 추가
+        if ai_response:
+            session.message_history.append({"role": "assistant", "content": ai_response})
+        if user_message:
+            session.message_history.append({"role": "user", "content": user_message})
+        if assessment_completed:
+            session.assessment_completed.update(assessment_completed)
+        if assessment_turns:
+            session.assessment_turns.update(assessment_turns)
+        session.assessment_attempt_turn = max(session.assessment_attempt_turn, assessment_attempt_turn)
+
+        recorded_turn = session.turn_count
+        session.turn_count += 1
+        # 접근 시각 기준으로 TTL 갱신
+        self._cache.set(conversation_id, session)
+        return recorded_turn
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
@@ -0,0 +1,216 @@
+"""
+CIST 질문 템플릿 벡터 인덱스
+cist_question_templates의 임베딩을 워커 메모리의 NumPy 행렬(정규화)로 보관하고,
+최근 대화 임베딩과의 내적(코사인 유사도)으로 카테고리별 top-k 템플릿을 찾는다
+새 템플릿(Celery 작업이 추가)은 created_at 워터마크 기준으로 주기적으로 증분 반영한다
+Celery 작업이 사진 대화에서 만든 템플릿(photo_id가 있는 행)은 검색 시 같은 사진의 대화에서만 후보로 쓰고,
+사진 분석 시 미리 만든 질문 뱅크(context_type = 'photo_bank')는 제외한다 (photo_question_bank에서 사진 단위로 조회)
+"""
+import asyncio
+import hashlib
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import tiktoken
+from langchain_openai import OpenAIEmbeddings
+from supabase import AsyncClient
+
+from core.llm_gateway import llm_gateway
+from core.metrics import SUPABASE_QUERY_SECONDS
+
+from .response_cache import normalize_utterance
+
+TEMPLATE_COLUMNS = "id, category, template_text, context_type, difficulty_level, photo_id, created_at"
+PHOTO_BANK_CONTEXT = "photo_bank"
+
+
+def template_hash(template_text: str, photo_id: Optional[str] = None) -> str:
+    """중복 판별용 템플릿 해시 (사진별, 공백/문장부호/대소문자를 무시한 정규화 텍스트 기준)"""
+    return hashlib.sha256(f"{photo_id or ''}:{normalize_utterance(template_text)}".encode("utf-8")).hexdigest()
+
+
+def template_rows(questions: list, photo_id: Optional[str] = None, context_type: str = "photo_based") -> List[Dict[str, Any]]:
+    """생성된 질문 → cist_question_templates 행 (형식이 잘못된 항목 제외, 같은 응답 안의 중복 제거)"""
+    rows = {}
+    for question_data in questions:
+        if not isinstance(question_data, dict) or not question_data.get("category") or not question_data.get("question"):
+            continue
+        text = question_data["question"].strip()
+        key = template_hash(text, photo_id)
+        if key in rows:
+            continue
+        try:
+            difficulty = min(5, max(1, int(question_data.get("difficulty", 1))))
+        except (TypeError, ValueError):
+            difficulty = 1
+        rows[key] = {
+            "category": question_data["category"][:50],
+            "template_text": text,
+            "difficulty_level": difficulty,
+            "context_type": context_type,
+            "photo_id": photo_id,
+            "template_hash": key
+        }
+        if question_data.get("bridge"):
+            rows[key]["bridge_text"] = question_data["bridge"].strip()
+        if question_data.get("pair_id"):
+            rows[key]["pair_id"] = question_data["pair_id"]
+    return list(rows.values())
+
+
+class TemplateIndex:
+    """질문 템플릿 임베딩 인덱스 (정규화된 행렬 + 카테고리 필터 top-k)"""
+
+    def __init__(self, embeddings: OpenAIEmbeddings, refresh_interval: float = 60.0):
+        self.embeddings = embeddings
+        self.refresh_interval = refresh_interval
+
+        self._matrix: Optional[np.ndarray] = None  # (템플릿 수, 임베딩 차원), 행 단위 L2 정규화
+        self._rows: List[Dict[str, Any]] = []
+        self._categories = np.array([], dtype=object)
+        self._photo_ids = np.array([], dtype=object)  # 공용 템플릿은 ""
+        self._ids = set()
+        self._watermark: Optional[str] = None  # 반영된 템플릿의 최신 created_at
+        self._last_refresh = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._matrix is not None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    async def warm_tokenizer(self) -> None:
+        """임베딩 요청 전 토큰화에 쓰는 tiktoken 인코딩 미리 로드 (첫 검색에서 BPE 파일 다운로드로 이벤트 루프가 멈추지 않도록)"""
+        model_name = getattr(self.embeddings, "tiktoken_model_name", None) or self.embeddings.model
+
+        def load_encoding():
+            try:
+                return tiktoken.encoding_for_model(model_name)
+            except KeyError:
+                return tiktoken.get_encoding("cl100k_base")
+
+        try:
+            await asyncio.to_thread(load_encoding)
+        except Exception as e:
+            print(f"⚠️ 임베딩 토큰화 인코딩 미리 로드 실패: {e}")
+
+    async def load(self, client: AsyncClient) -> None:
+        """전체 템플릿 임베딩 후 인덱스 구성 (서버 시작 시 호출)"""
+        async with self._lock:
+            with SUPABASE_QUERY_SECONDS.time(table="cist_question_templates", operation="select"):
+                response = await client.table("cist_question_templates").select(
+                    TEMPLATE_COLUMNS
+                ).neq("context_type", PHOTO_BANK_CONTEXT).order("created_at").execute()
+            self._matrix = None
+            self._rows = []
+            self._categories = np.array([], dtype=object)
+            self._photo_ids = np.array([], dtype=object)
+            self._ids = set()
+            self._watermark = None
+            await self._add(response.data or [])
+            self._last_refresh = time.monotonic()
+            print(f"✅ 질문 템플릿 인덱스 로드: {len(self._rows)}개")
+
+    async def refresh(self, client: AsyncClient) -> int:
+        """워터마크 이후 추가된 템플릿만 임베딩해 인덱스에 추가하고 추가된 수 반환"""
+        if not self.loaded:
+            await self.load(client)
+            return len(self._rows)
+
+        async with self._lock:
+            query = client.table("cist_question_templates").select(TEMPLATE_COLUMNS).neq("context_type", PHOTO_BANK_CONTEXT)
+            if self._watermark:
+                # 같은 시각에 들어온 템플릿을 놓치지 않도록 gte로 읽고 id로 중복 제거
+                query = query.gte("created_at", self._watermark)
+            with SUPABASE_QUERY_SECONDS.time(table="cist_question_templates", operation="select"):
+                response = await query.order("created_at").execute()
+            new_rows = [row for row in (response.data or []) if row["id"] not in self._ids]
+            await self._add(new_rows)
+            self._last_refresh = time.monotonic()
+            if new_rows:
+                print(f"🔄 질문 템플릿 인덱스 갱신: +{len(new_rows)}개 (총 {len(self._rows)}개)")
+            return len(new_rows)
+
+    def schedule_refresh(self, client: AsyncClient) -> None:
+        """갱신 주기가 지났으면 백그라운드에서 증분 갱신 (검색 경로를 막지 않음)"""
+        if time.monotonic() - self._last_refresh < self.refresh_interval:
+            return
+        if self._refresh_task and not self._refresh_task.done():
+            return
+        self._last_refresh = time.monotonic()
+        self._refresh_task = asyncio.get_running_loop().create_task(self._safe_refresh(client))
+
+    async def search(
+        self,
+        query_text: str,
+        category: Optional[str] = None,
+        k: int = 3,
+        photo_id: Optional[str] = None,
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        """질의 텍스트와 코사인 유사도가 높은 템플릿 top-k [(점수, 템플릿)]
+
+        공용 템플릿과 photo_id 사진의 템플릿만 후보로 쓰고, category가 있으면 해당 카테고리만 고른다.
+        """
+        if not self._rows:
+            return []
+
+        embedding = await llm_gateway.arun(self.embeddings.model, lambda: self.embeddings.aembed_query(query_text))
+        query_vector = self._normalize(np.asarray(embedding, dtype=np.float32))
+        in_scope = (self._photo_ids == "") | (self._photo_ids == (photo_id or ""))
+        if category:
+            in_scope &= self._categories == category
+        candidates = np.flatnonzero(in_scope)
+        if candidates.size == 0:
+            return []
+
+        scores = self._matrix[candidates] @ query_vector
+        top = np.argsort(-scores)[:k]
+        return [(float(scores[i]), self._rows[candidates[i]]) for i in top]
+
+    def bank_size(self, category: Optional[str] = None, photo_id: Optional[str] = None) -> int:
+        """공용 템플릿 수 (photo_id를 주면 해당 사진의 템플릿 수, category를 주면 해당 카테고리만)"""
+        in_scope = self._photo_ids == (photo_id or "")
+        if category is not None:
+            in_scope &= self._categories == category
+        return int(np.count_nonzero(in_scope))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "templates": len(self._rows),
+            "watermark": self._watermark,
+        }
+
+    async def _add(self, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            if self._matrix is None:
+                self._matrix = np.zeros((0, 0), dtype=np.float32)
+            return
+
+        texts = [row["template_text"] for row in rows]
+        vectors = await llm_gateway.arun(self.embeddings.model, lambda: self.embeddings.aembed_documents(texts))
+        matrix = self._normalize(np.asarray(vectors, dtype=np.float32))
+        if self._matrix is None or self._matrix.size == 0:
+            self._matrix = matrix
+        else:
+            self._matrix = np.vstack([self._matrix, matrix])
+
+        self._rows.extend(rows)
+        self._categories = np.concatenate([self._categories, np.array([row["category"] for row in rows], dtype=object)])
+        self._photo_ids = np.concatenate([self._photo_ids, np.array([row.get("photo_id") or "" for row in rows], dtype=object)])
+        self._ids.update(row["id"] for row in rows)
+        self._watermark = max(filter(None, [self._watermark] + [row.get("created_at") for row in rows]), default=None)
+
+    async def _safe_refresh(self, client: AsyncClient) -> None:
+        try:
+            await self.refresh(client)
+        except Exception as e:
+            print(f"❌ 질문 템플릿 인덱스 갱신 실패: {e}")
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
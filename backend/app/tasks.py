@@ -3,10 +3,23 @@ Celery 비동기 작업 처리
 고품질 질문 생성 및 캐시 저장을 백그라운드에서 처리
 """
 from celery import Celery
+from celery.schedules import crontab
 import os
 from supabase import create_client
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
+import time
+import redis
+from core.config import settings, supabase_admin
+from core.llm_gateway import llm_gateway
+from services.template_index import template_hash, template_rows
+from services.photo_cache import build_photo_context
+from services.dialogue_prompt import PHOTO_QUESTION_BANK_PROMPT, PHOTO_QUESTION_BANK_SYSTEM_PROMPT, HIGH_QUALITY_QUESTION_SYSTEM_PROMPT
+from services.photo_question_bank import PHOTO_QUESTION_BANK_RESPONSE_FORMAT, parse_question_bank_output
+from services.question_batch import (
+    MAX_BATCH_ATTEMPTS, RETRYABLE_STATES, TERMINAL_STATES, QuestionSpool,
+    build_question_prompt, context_photo_id, create_batch_backend, parse_batch_output, write_batch_file
+)
 
 # Celery 앱 초기화
 rabbitmq_user = os.getenv('RABBITMQ_USER', 'admin')
@@ -26,6 +39,9 @@ supabase = create_client(
     os.getenv("SUPABASE_ANON_KEY")
 )
 
+# 배치 모드 질문 생성 맥락 / 제출된 배치 기록 (Celery 결과 백엔드와 같은 Redis)
+question_spool = QuestionSpool(redis.Redis(host=redis_host, port=6379, db=0, decode_responses=True))
+
 # LLM 초기화 (고품질 모델) with LangSmith 지원
 langsmith_tracing = os.getenv("LANGSMITH_TRACING", "true").lower() == "true"
 langsmith_metadata = {
@@ -34,8 +50,21 @@ langsmith_metadata = {
     "environment": os.getenv("ENVIRONMENT", "development")
 }
 
+# 재시도/속도 제한은 llm_gateway에서 처리
 llm_high_quality = ChatOpenAI(
     model="gpt-4",
+    max_retries=0,
+    include_response_headers=True,
+    api_key=os.getenv("OPENAI_API_KEY"),
+    metadata=langsmith_metadata if langsmith_tracing else None
+)
+
+# 사진 질문 뱅크 생성 LLM (구조화 출력으로 JSON 스키마에 맞는 응답만 받음)
+llm_photo_bank = ChatOpenAI(
+    model=settings.PHOTO_BANK_MODEL,
+    max_retries=0,
+    include_response_headers=True,
+    model_kwargs={"response_format": PHOTO_QUESTION_BANK_RESPONSE_FORMAT},
     api_key=os.getenv("OPENAI_API_KEY"),
     metadata=langsmith_metadata if langsmith_tracing else None
 )
@@ -44,58 +73,41 @@ llm_high_quality = ChatOpenAI(
 def generate_high_quality_questions(conversation_context: dict):
     """
     백그라운드에서 고품질 인지기능 평가 질문 생성
+    
+    question_scheduler가 같은 (photo_id, category)의 요청을 병합해 보내므로
+    user_messages에는 여러 대화의 사용자 발화가 들어 있을 수 있다. 생성한 질문은 photo_id와 함께 저장된다.
     """
     try:
-        user_message = conversation_context.get("user_message", "")
-        photo_context = conversation_context.get("photo_context", {})
         conversation_id = conversation_context.get("conversation_id", "")
+        photo_id = context_photo_id(conversation_context)
         
-        prompt = f"""
-        다음 대화 맥락을 바탕으로 치매 진단에 유용한 고품질 인지기능 평가 질문을 5개 생성하세요.
-        
-        사용자 메시지: {user_message}
-        사진 정보: {photo_context}
-        
-        각 질문은 다음 카테고리 중 하나에 해당해야 합니다:
-        - orientation_time: 시간 지남력
-        - orientation_place: 장소 지남력  
-        - memory_registration: 기억 등록
-        - memory_recall: 기억 회상
-        - attention: 주의력
-        - executive_function: 실행기능
-        - language_naming: 언어 명명
-        
-        JSON 형식으로 응답:
-        [
-            {{
-                "category": "orientation_time",
-                "question": "지금이 몇 시인지 알 수 있나요?",
-                "difficulty": 2
-            }},
-            ...
-        ]
-        """
+        # 배치 모드에서는 맥락만 쌓고 submit_question_batch가 모아서 Batch API로 제출
+        if settings.QUESTION_GENERATION_MODE == "batch":
+            spooled = question_spool.push(conversation_context)
+            return {
+                "status": "spooled",
+                "spooled_contexts": spooled,
+                "conversation_id": conversation_id
+            }
         
-        response = llm_high_quality.invoke([
-            SystemMessage(content="당신은 치매 진단 전문가입니다."),
-            HumanMessage(content=prompt)
+        response = llm_gateway.invoke(llm_high_quality, [
+            SystemMessage(content=HIGH_QUALITY_QUESTION_SYSTEM_PROMPT),
+            HumanMessage(content=build_question_prompt(conversation_context))
         ])
         
-        # 생성된 질문들을 Supabase에 저장
+        # 생성된 질문들을 한 번에 저장 (같은 사진에 이미 있는 템플릿은 template_hash 충돌로 건너뜀)
         import json
         questions = json.loads(response.content)
-        
-        for question_data in questions:
-            supabase.table("cist_question_templates").insert({
-                "category": question_data["category"],
-                "template_text": question_data["question"],
-                "difficulty_level": question_data.get("difficulty", 1),
-                "context_type": "photo_based"
-            }).execute()
+        rows = template_rows(questions, photo_id)
+        if rows:
+            supabase.table("cist_question_templates").upsert(
+                rows, on_conflict="template_hash", ignore_duplicates=True
+            ).execute()
         
         return {
             "status": "success",
             "questions_generated": len(questions),
+            "templates_submitted": len(rows),
             "conversation_id": conversation_id
         }
         
@@ -107,6 +119,196 @@ def generate_high_quality_questions(conversation_context: dict):
             "conversation_id": conversation_id
         }
 
+@celery_app.task
+def generate_photo_question_bank(photo_id: str, pair_count: int = 4):
+    """
+    사진별 평가 질문 뱅크 생성 (사진 분석 완료 시 발행)
+    
+    사진 분석 결과로 기억등록/기억회상 질문 세트와 브릿지 문장을 만들어 photo_id와 함께 저장한다.
+    같은 세트의 등록/회상 질문은 pair_id를 공유해 대화 중 회상 질문이 등록한 단어와 맞도록 한다.
+    """
+    try:
+        response = supabase.table("photos").select(
+            "id, filename, description, tags, location_name, photo_analyze_result"
+        ).eq("id", photo_id).execute()
+        if not response.data:
+            return {"status": "error", "error": "Photo not found", "photo_id": photo_id}
+        
+        photo = build_photo_context(response.data[0])
+        response = llm_gateway.invoke(llm_photo_bank, [
+            SystemMessage(content=PHOTO_QUESTION_BANK_SYSTEM_PROMPT),
+            HumanMessage(content=PHOTO_QUESTION_BANK_PROMPT.format(
+                pair_count=pair_count,
+                photo_description=photo.photo_description
+            ))
+        ])
+        
+        # 형식이 잘못된 세트(브릿지/질문 누락, 등록 질문에 단어 누락)는 세트 전체를 버림
+        questions = parse_question_bank_output(response.content)
+        rows = template_rows(questions, photo_id, context_type="photo_bank")
+        if rows:
+            supabase.table("cist_question_templates").upsert(
+                rows, on_conflict="template_hash", ignore_duplicates=True
+            ).execute()
+        
+        print(f"📷 사진 질문 뱅크 생성: photo_id={photo_id}, 질문 {len(rows)}개")
+        return {
+            "status": "success",
+            "photo_id": photo_id,
+            "templates_submitted": len(rows)
+        }
+        
+    except Exception as e:
+        print(f"Photo question bank generation failed: {e}")
+        return {"status": "error", "error": str(e), "photo_id": photo_id}
+
+@celery_app.task
+def compact_question_templates(page_size: int = 1000, batch_size: int = 200):
+    """
+    중복 질문 템플릿 정리
+    
+    정규화 텍스트 해시(사진별)가 같은 템플릿 중 가장 먼저 만들어진 하나만 남기고 삭제한 뒤,
+    template_hash가 비어 있거나 다른 기존 템플릿의 해시를 채운다.
+    (서버 워커의 템플릿 인덱스는 증분 갱신만 하므로 삭제된 템플릿은 재시작 시 반영된다)
+    다른 사용자의 템플릿까지 조회/삭제/갱신해야 하므로 RLS를 우회하는 서비스 역할 클라이언트를 사용한다.
+    """
+    try:
+        templates = []
+        offset = 0
+        while True:
+            response = supabase_admin.table("cist_question_templates").select(
+                "id, category, template_text, context_type, difficulty_level, photo_id, template_hash, created_at"
+            ).order("created_at").order("id").range(offset, offset + page_size - 1).execute()
+            templates.extend(response.data or [])
+            if len(response.data or []) < page_size:
+                break
+            offset += page_size
+        
+        kept = {}
+        duplicate_ids = []
+        for template in templates:
+            key = template_hash(template["template_text"], template.get("photo_id"))
+            if key in kept:
+                duplicate_ids.append(template["id"])
+            else:
+                kept[key] = template
+        
+        # 해시를 채우기 전에 중복을 먼저 삭제 (unique 인덱스 충돌 방지)
+        for start in range(0, len(duplicate_ids), batch_size):
+            supabase_admin.table("cist_question_templates").delete().in_(
+                "id", duplicate_ids[start:start + batch_size]
+            ).execute()
+        
+        backfill = [
+            {**template, "template_hash": key}
+            for key, template in kept.items()
+            if template.get("template_hash") != key
+        ]
+        for start in range(0, len(backfill), batch_size):
+            supabase_admin.table("cist_question_templates").upsert(
+                backfill[start:start + batch_size], on_conflict="id"
+            ).execute()
+        
+        print(f"🧹 질문 템플릿 정리: {len(templates)}개 중 중복 {len(duplicate_ids)}개 삭제, 해시 {len(backfill)}개 갱신")
+        return {
+            "status": "success",
+            "scanned": len(templates),
+            "duplicates_removed": len(duplicate_ids),
+            "hashes_backfilled": len(backfill)
+        }
+        
+    except Exception as e:
+        print(f"Question template compaction failed: {e}")
+        return {"status": "error", "error": str(e)}
+
+@celery_app.task
+def submit_question_batch(max_requests: int = None):
+    """
+    배치 모드에서 쌓인 질문 생성 맥락을 JSONL 요청 파일로 만들어 배치 백엔드에 제출 (주기 작업)
+
+    제출한 배치는 맥락과 함께 기록해 두고 poll_question_batches가 결과를 저장한다.
+    제출에 실패하면 꺼낸 맥락을 다시 쌓아 다음 주기에 제출한다.
+    """
+    contexts = []
+    try:
+        contexts = question_spool.pop(max_requests or settings.QUESTION_BATCH_MAX_REQUESTS)
+        if not contexts:
+            return {"status": "empty"}
+
+        requests = {f"ctx-{index}": context for index, context in enumerate(contexts)}
+        path = write_batch_file(requests, settings.QUESTION_BATCH_DIR, settings.QUESTION_BATCH_MODEL)
+        backend = create_batch_backend(settings.QUESTION_BATCH_BACKEND)
+        batch_id = backend.submit(path)
+        question_spool.track(batch_id, {
+            "backend": backend.name,
+            "input_file": path,
+            "submitted_at": time.time(),
+            "contexts": requests
+        })
+
+        print(f"📦 질문 생성 배치 제출: {batch_id} ({backend.name}), 요청 {len(requests)}개")
+        return {"status": "submitted", "batch_id": batch_id, "requests": len(requests)}
+
+    except Exception as e:
+        question_spool.requeue(contexts)
+        print(f"Question batch submission failed: {e}")
+        return {"status": "error", "error": str(e), "requeued": len(contexts)}
+
+@celery_app.task
+def poll_question_batches(upsert_size: int = 500):
+    """
+    제출된 질문 생성 배치 상태 확인 후 끝난 배치의 결과를 cist_question_templates에 일괄 저장 (주기 작업)
+
+    요청별 오류나 JSON이 아닌 응답은 버리고, 만료/취소된 배치에서 끝나지 않은 요청만 다시 쌓는다.
+    """
+    summary = {"pending": 0, "completed": 0, "failed": 0, "templates_submitted": 0, "requeued": 0, "tokens": 0}
+    for batch_id, record in question_spool.inflight().items():
+        try:
+            backend = create_batch_backend(record["backend"])
+            status = backend.status(batch_id)
+            if status.state not in TERMINAL_STATES:
+                summary["pending"] += 1
+                continue
+
+            results = parse_batch_output(backend.results(status) if status.output else [])
+            contexts = record["contexts"]
+            rows = {}
+            for custom_id, questions in results.questions.items():
+                if custom_id not in contexts:
+                    continue
+                for row in template_rows(questions, context_photo_id(contexts[custom_id])):
+                    rows[row["template_hash"]] = row
+            rows = list(rows.values())
+            for start in range(0, len(rows), upsert_size):
+                supabase.table("cist_question_templates").upsert(
+                    rows[start:start + upsert_size], on_conflict="template_hash", ignore_duplicates=True
+                ).execute()
+
+            retry = []
+            if status.state in RETRYABLE_STATES:
+                for custom_id, context in contexts.items():
+                    attempts = context.get("batch_attempts", 1)
+                    if custom_id not in results.questions and custom_id not in results.failed and attempts < MAX_BATCH_ATTEMPTS:
+                        retry.append({**context, "batch_attempts": attempts + 1})
+            question_spool.requeue(retry)
+            question_spool.untrack(batch_id)
+
+            summary["completed" if status.state == "completed" else "failed"] += 1
+            summary["templates_submitted"] += len(rows)
+            summary["requeued"] += len(retry)
+            summary["tokens"] += results.prompt_tokens + results.completion_tokens
+            print(
+                f"📥 질문 생성 배치 {status.state}: {batch_id}, 성공 {len(results.questions)}/{len(contexts)}개, "
+                f"실패 {len(results.failed)}개, 재제출 {len(retry)}개, 템플릿 {len(rows)}개"
+                + (f" ({status.error})" if status.error else "")
+            )
+
+        except Exception as e:
+            # 기록을 남겨 두고 다음 주기에 다시 확인
+            print(f"Question batch polling failed: {batch_id}: {e}")
+
+    return {"status": "success", **summary}
+
 @celery_app.task
 def analyze_conversation_patterns(conversation_id: str):
     """
@@ -147,4 +349,20 @@ celery_app.conf.update(
     broker_connection_retry_on_startup=True,
     broker_connection_retry=True,
     broker_connection_max_retries=10,
+    # 주기 작업 (celery beat)
+    beat_schedule={
+        "compact-question-templates": {
+            "task": "tasks.compact_question_templates",
+            "schedule": crontab(hour=4, minute=0),
+        },
+        # 배치 모드 질문 생성 (쌓인 맥락이 없거나 진행 중인 배치가 없으면 바로 끝남)
+        "submit-question-batch": {
+            "task": "tasks.submit_question_batch",
+            "schedule": settings.QUESTION_BATCH_SUBMIT_MINUTES * 60,
+        },
+        "poll-question-batches": {
+            "task": "tasks.poll_question_batches",
+            "schedule": settings.QUESTION_BATCH_POLL_MINUTES * 60,
+        },
+    },
 )
\ No newline at end of file
@@ -0,0 +1,594 @@
+#!/usr/bin/env python3
+"""
+DialogueWorkflow 오프라인 재생 벤치마크
+기록된 대화(분석 리포트의 답변, conversations 테이블 내보내기, 또는 내장 예시 대화)를
+DialogueWorkflow.process_message(또는 stream_message)로 재생하고
+턴 처리량(turns/sec), 턴 지연 시간 분포, 노드별 실행 시간과 메모리 할당량을 출력한다
+
+OpenAI와 Supabase 대신 지연 시간 분포를 설정할 수 있는 가짜 LLM/임베딩과 인메모리 Supabase를 사용하므로
+네트워크나 자격 증명 없이 로컬에서 실행할 수 있다
+
+사용 예:
+    python replay_benchmark.py                                   # 내장 예시 대화
+    python replay_benchmark.py --source app/analysis             # 분석 리포트의 답변 재생
+    python replay_benchmark.py --source conversations.json --concurrency 20 --llm-latency lognormal:0.8,0.5
+    python replay_benchmark.py --repeat 10 --stream --json
+"""
+import argparse
+import asyncio
+import contextlib
+import glob
+import json
+import math
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+import uuid
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+# app 디렉터리 모듈(core, services)을 불러오기 위한 경로 설정
+APP_DIR = Path(__file__).resolve().parent / "app"
+sys.path.insert(0, str(APP_DIR))
+sys.path.insert(0, str(APP_DIR.parent))
+
+# 설정 검증을 통과하기 위한 가짜 값 (네트워크에 접근하지 않음)
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_ANON_KEY", "eyJhbGciOiJIUzI1NiJ9.e30.benchmark")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "eyJhbGciOiJIUzI1NiJ9.e30.benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ["LANGSMITH_TRACING"] = "false"
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# 내장 예시 대화 (기억등록 트리거, 반복 발화, 짧은 대답, 종료 키워드 포함)
+SAMPLE_DIALOGUES = [
+    ["안녕하세요", "바다예요", "딸이랑 손자랑 같이 갔었어요", "사과랑 배랑 포도를 싸 가서 먹었지",
+     "그날 날씨가 참 좋았어요", "네", "기차를 타고 갔어요", "그날 날씨가 참 좋았어요",
+     "손자가 모래성을 쌓았어요", "아까 말한 과일이요? 사과, 배, 포도", "재밌었어요", "이제 그만할게요"],
+    ["응", "산이야", "남편이랑 등산을 자주 다녔어", "버스 타고 택시 타고 자전거도 탔지",
+     "정상에서 김밥을 먹었어", "그때는 다리가 튼튼했지", "음", "막걸리도 한 잔 했어",
+     "내려올 때 비가 왔던 것 같아", "버스, 택시, 자전거", "고마워요", "끝"],
+    ["누구세요", "우리 집 마당이에요", "감나무가 있었어요", "감을 따서 곶감을 만들었지",
+     "어머니가 된장 간장 고추장을 담그셨어", "겨울에는 눈이 많이 왔어", "모르겠어요",
+     "동생들이랑 썰매를 탔어", "된장, 간장, 고추장", "옛날 생각이 나네요"],
+]
+
+DEFAULT_REPLIES = [
+    "그러셨군요. 그때 기분이 어떠셨어요?",
+    "정말 즐거운 추억이네요. 조금 더 이야기해 주시겠어요?",
+    "함께 가신 분들은 지금도 자주 만나세요?",
+    "사진 속 모습이 참 행복해 보여요. 그날 무엇을 하셨나요?",
+]
+
+
+# 지연 시간 분포
+
+class LatencyDistribution:
+    """지연 시간 분포 ("fixed:0.3", "uniform:0.1,0.5", "normal:0.4,0.1", "lognormal:<중앙값>,<sigma>")"""
+
+    def __init__(self, spec: str, rng: random.Random):
+        self.spec = spec
+        self.rng = rng
+        kind, _, params = spec.partition(":")
+        self.kind = kind.strip().lower()
+        self.params = [float(p) for p in params.split(",") if p.strip()] if params else []
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if self.kind not in expected or len(self.params) != expected[self.kind]:
+            raise ValueError(f"지원하지 않는 지연 시간 분포: {spec}")
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = self.rng.uniform(*self.params)
+        elif self.kind == "normal":
+            value = self.rng.gauss(*self.params)
+        else:
+            median, sigma = self.params
+            value = self.rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+        return max(0.0, value)
+
+    async def wait(self) -> None:
+        delay = self.sample()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+# 가짜 LLM / 임베딩
+
+class FakeChatModel(BaseChatModel):
+    """지연 시간 분포를 따르는 가짜 채팅 모델 (스트리밍/usage_metadata 지원)"""
+
+    model_name: str = "fake-chat"
+    replies: List[str] = DEFAULT_REPLIES
+    first_token_latency: Any = None  # LatencyDistribution
+    inter_token_seconds: float = 0.0
+    rng: Any = None
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-replay"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        self.calls += 1
+        return (self.rng or random).choice(self.replies)
+
+    def _usage(self, messages: List[BaseMessage], reply: str) -> Dict[str, int]:
+        input_tokens = sum(len(str(m.content)) for m in messages) // 2
+        output_tokens = max(1, len(reply) // 2)
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        raise NotImplementedError("벤치마크는 비동기 호출만 사용합니다")
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        reply = self._reply(messages)
+        if self.first_token_latency:
+            await self.first_token_latency.wait()
+        await asyncio.sleep(self.inter_token_seconds * len(reply.split()))
+        message = AIMessage(content=reply, usage_metadata=self._usage(messages, reply))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        reply = self._reply(messages)
+        if self.first_token_latency:
+            await self.first_token_latency.wait()
+        words = reply.split(" ")
+        for index, word in enumerate(words):
+            if index and self.inter_token_seconds:
+                await asyncio.sleep(self.inter_token_seconds)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word if index == 0 else f" {word}"))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        # stream_usage=True처럼 마지막 청크에 usage 포함
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, reply)))
+
+
+class FakeEmbeddings:
+    """문자 해시 기반 결정적 임베딩 (지연 시간 분포 적용)"""
+
+    def __init__(self, latency: LatencyDistribution, dimensions: int = 256):
+        self.model = "fake-embedding"
+        self.latency = latency
+        self.dimensions = dimensions
+        self.calls = 0
+
+    def _vector(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for a, b in zip(text, text[1:] + " "):
+            vector[zlib.crc32((a + b).encode()) % self.dimensions] += 1.0
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        await self.latency.wait()
+        return self._vector(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        await self.latency.wait()
+        return [self._vector(text) for text in texts]
+
+
+# 인메모리 Supabase
+
+class _Response:
+    def __init__(self, data: Any):
+        self.data = data
+
+
+class InMemoryQuery:
+    """supabase-py 쿼리 빌더 중 대화 워크플로우가 쓰는 부분만 흉내"""
+
+    def __init__(self, db: "InMemorySupabase", table: str):
+        self.db = db
+        self.table_name = table
+        self.operation = "select"
+        self.filters: List[tuple] = []
+        self.order_by: Optional[tuple] = None
+        self.limit_count: Optional[int] = None
+        self.single_row = False
+        self.payload: Any = None
+        self.ignore_duplicates = False
+
+    def select(self, *columns, **kwargs) -> "InMemoryQuery":
+        self.operation = "select"
+        return self
+
+    def insert(self, payload, **kwargs) -> "InMemoryQuery":
+        self.operation, self.payload = "insert", payload
+        return self
+
+    def upsert(self, payload, on_conflict: str = "id", ignore_duplicates: bool = False, **kwargs) -> "InMemoryQuery":
+        self.operation, self.payload, self.ignore_duplicates = "upsert", payload, ignore_duplicates
+        return self
+
+    def update(self, payload, **kwargs) -> "InMemoryQuery":
+        self.operation, self.payload = "update", payload
+        return self
+
+    def eq(self, column: str, value: Any) -> "InMemoryQuery":
+        self.filters.append((column, lambda v, value=value: str(v) == str(value)))
+        return self
+
+    def neq(self, column: str, value: Any) -> "InMemoryQuery":
+        # SQL과 같이 NULL은 어떤 값과도 같지 않다고 보지 않음 (NULL <> x는 NULL)
+        self.filters.append((column, lambda v, value=value: v is not None and str(v) != str(value)))
+        return self
+
+    def gte(self, column: str, value: Any) -> "InMemoryQuery":
+        self.filters.append((column, lambda v, value=value: v is not None and str(v) >= str(value)))
+        return self
+
+    def is_(self, column: str, value: Any) -> "InMemoryQuery":
+        self.filters.append((column, lambda v, value=value: v is None if value in (None, "null") else v == value))
+        return self
+
+    def contains(self, column: str, values: List[Any]) -> "InMemoryQuery":
+        self.filters.append((column, lambda v, values=values: set(map(str, values)) <= set(map(str, v or []))))
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "InMemoryQuery":
+        self.order_by = (column, desc)
+        return self
+
+    def limit(self, count: int) -> "InMemoryQuery":
+        self.limit_count = count
+        return self
+
+    def single(self) -> "InMemoryQuery":
+        self.single_row = True
+        return self
+
+    async def execute(self) -> _Response:
+        self.db.operations[(self.table_name, self.operation)] += 1
+        await self.db.latency.wait()
+        return self.db.apply(self)
+
+
+class InMemorySupabase:
+    """테이블별 행 목록을 메모리에 보관하는 AsyncClient 대용"""
+
+    def __init__(self, latency: LatencyDistribution):
+        self.latency = latency
+        self.tables: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.operations: Dict[tuple, int] = defaultdict(int)
+
+    def table(self, name: str) -> InMemoryQuery:
+        return InMemoryQuery(self, name)
+
+    def apply(self, query: InMemoryQuery) -> _Response:
+        rows = self.tables[query.table_name]
+        if query.operation in ("insert", "upsert"):
+            payload = query.payload if isinstance(query.payload, list) else [query.payload]
+            written = []
+            existing = {row.get("id"): row for row in rows}
+            for row in payload:
+                row = dict(row)
+                row.setdefault("id", str(uuid.uuid4()))
+                row.setdefault("created_at", time.strftime("%Y-%m-%dT%H:%M:%S"))
+                if row["id"] in existing:
+                    if query.operation == "upsert" and not query.ignore_duplicates:
+                        existing[row["id"]].update(row)
+                    continue
+                rows.append(row)
+                written.append(row)
+            return _Response(written)
+
+        matched = [row for row in rows if all(check(row.get(column)) for column, check in query.filters)]
+        if query.operation == "update":
+            for row in matched:
+                row.update(query.payload)
+            return _Response(matched)
+        if query.order_by:
+            column, desc = query.order_by
+            matched.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        if query.limit_count is not None:
+            matched = matched[:query.limit_count]
+        if query.single_row:
+            return _Response(matched[0] if matched else None)
+        return _Response(matched)
+
+
+# 재생할 대화 불러오기
+
+def load_analysis_reports(path: str) -> List[List[str]]:
+    """분석 리포트(app/analysis/*_analysis.txt)의 "💬 답변:" 줄을 대화별 사용자 발화로 추출"""
+    files = sorted(glob.glob(os.path.join(path, "*_analysis.txt"))) if os.path.isdir(path) else [path]
+    dialogues = []
+    for file in files:
+        text = Path(file).read_text(encoding="utf-8")
+        answers = [a.strip() for a in re.findall(r"💬 답변:(.*)", text)]
+        answers = [a for a in answers if a and a != "session_completed"]
+        if answers:
+            dialogues.append(answers)
+    return dialogues
+
+
+def load_conversations_export(path: str) -> List[List[str]]:
+    """conversations 테이블 내보내기(JSON 배열 또는 JSONL)를 세션별·순서별 사용자 발화로 변환"""
+    text = Path(path).read_text(encoding="utf-8").strip()
+    rows = json.loads(text) if text.startswith("[") else [json.loads(line) for line in text.splitlines() if line.strip()]
+    sessions: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for row in rows:
+        sessions[str(row.get("session_id"))].append(row)
+
+    dialogues = []
+    for session_rows in sessions.values():
+        session_rows.sort(key=lambda row: row.get("conversation_order") or 0)
+        utterances = [(row.get("user_input") or row.get("user_response_text") or "").strip() for row in session_rows]
+        utterances = [u for u in utterances if u]
+        if utterances:
+            dialogues.append(utterances)
+    return dialogues
+
+
+def load_dialogues(source: Optional[str]) -> List[List[str]]:
+    if not source:
+        return [list(dialogue) for dialogue in SAMPLE_DIALOGUES]
+    if os.path.isdir(source) or source.endswith(".txt"):
+        return load_analysis_reports(source)
+    return load_conversations_export(source)
+
+
+# 벤치마크 실행
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(p / 100 * len(ordered))) - 1]
+
+
+def install_node_allocation_probe(node_allocations: Dict[str, List[int]]) -> None:
+    """노드 래퍼에 tracemalloc 할당량 측정 추가 (동시 실행 수 1일 때만 노드별 값이 정확함)"""
+    from services.dialogue_workflow import DialogueWorkflow
+
+    timed_node = DialogueWorkflow._timed_node
+
+    def probed_node(name, node):
+        timed = timed_node(name, node)
+
+        async def run(state):
+            before = tracemalloc.get_traced_memory()[0]
+            try:
+                return await timed(state)
+            finally:
+                node_allocations[name].append(tracemalloc.get_traced_memory()[0] - before)
+        return run
+
+    DialogueWorkflow._timed_node = staticmethod(probed_node)
+
+
+@contextlib.contextmanager
+def quiet(enabled: bool) -> Iterator[None]:
+    """워크플로우의 단계별 print 출력 숨김"""
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+async def replay(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    dialogues = load_dialogues(args.source)
+    if not dialogues:
+        raise SystemExit(f"재생할 대화가 없습니다: {args.source}")
+    dialogues = [dialogue[:args.max_turns] if args.max_turns else dialogue for dialogue in dialogues] * args.repeat
+
+    node_allocations: Dict[str, List[int]] = defaultdict(list)
+    if args.trace_memory:
+        tracemalloc.start()
+        install_node_allocation_probe(node_allocations)
+
+    from core.metrics import NODE_DURATION_SECONDS
+    from services.dialogue_workflow import DialogueWorkflow
+
+    db = InMemorySupabase(LatencyDistribution(args.db_latency, rng))
+    photo_id = str(uuid.uuid4())
+    db.tables["photos"].append({
+        "id": photo_id,
+        "filename": "family_trip.jpg",
+        "description": "가족과 함께 바닷가에서 찍은 사진",
+        "location_name": "부산 해운대",
+        "tags": ["가족", "바다", "여름"],
+        "photo_analyze_result": {"caption": "바닷가에서 웃고 있는 가족", "mood": "즐거움", "key_objects": ["파라솔", "모래성", "수박"]},
+    })
+    for category, text in [
+        ("memory_registration", "제가 세 가지 단어를 말씀드릴게요. 사과, 기차, 된장. 기억해 두세요."),
+        ("memory_registration", "지금 말씀하신 과일 이름 세 가지를 다시 한번 말씀해 주세요."),
+        ("memory_recall", "아까 기억해 달라고 했던 세 가지 단어가 무엇이었죠?"),
+        ("memory_recall", "조금 전에 말씀하신 과일 이름들을 다시 떠올려 보시겠어요?"),
+    ]:
+        db.tables["cist_question_templates"].append({
+            "id": str(uuid.uuid4()), "category": category, "template_text": text,
+            "context_type": "photo_based", "difficulty_level": 1, "created_at": "2025-01-01T00:00:00",
+        })
+
+    # 사진 분석 시 미리 만든 사진별 질문 뱅크 (등록/회상 한 세트)
+    pair_id = str(uuid.uuid4())
+    for category, bridge, text in [
+        ("memory_registration", "바닷가에 가면 간식이 빠질 수 없죠.", "수박, 옥수수, 아이스크림을 좋아하시는 순서대로 말씀해 주세요."),
+        ("memory_recall", "바닷가 이야기를 하다 보니 출출하네요.", "아까 말씀드린 간식 세 가지를 좋아하시는 순서대로 다시 말씀해 주세요."),
+    ]:
+        db.tables["cist_question_templates"].append({
+            "id": str(uuid.uuid4()), "category": category, "template_text": text, "bridge_text": bridge,
+            "pair_id": pair_id, "photo_id": photo_id, "context_type": "photo_bank", "difficulty_level": 1,
+            "created_at": "2025-01-01T00:00:00",
+        })
+
+    with quiet(not args.verbose):
+        workflow = DialogueWorkflow()
+        llm_latency = LatencyDistribution(args.llm_latency, rng)
+        workflow.llm_mini = FakeChatModel(model_name="fake-mini", first_token_latency=llm_latency, inter_token_seconds=args.inter_token, rng=rng)
+        workflow.llm_nano = FakeChatModel(model_name="fake-nano", first_token_latency=LatencyDistribution(args.nano_latency, rng), inter_token_seconds=args.inter_token, rng=rng)
+        workflow.llm_router = FakeChatModel(model_name="fake-router", replies=['{"route": "standard_chat", "assessment_item": null}'], first_token_latency=llm_latency, rng=rng)
+        workflow.embeddings = FakeEmbeddings(LatencyDistribution(args.embedding_latency, rng))
+        workflow.template_index.embeddings = workflow.embeddings
+        await workflow.template_index.load(db)
+
+    # Celery 발행은 브로커 없이 집계만
+    background_tasks = []
+
+    async def record_background_task(context: dict) -> None:
+        background_tasks.append(context)
+
+    workflow.question_scheduler.publish = record_background_task
+
+    turn_latencies: List[float] = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def run_dialogue(utterances: List[str]) -> None:
+        async with semaphore:
+            conversation_id = str(uuid.uuid4())
+            db.tables["sessions"].append({"id": conversation_id, "user_id": "benchmark", "photo_id": photo_id})
+            for utterance in utterances:
+                workflow_input = {
+                    "conversation_id": conversation_id,
+                    "user_id": "benchmark",
+                    "user_message": utterance,
+                    "photo_context": {"photo_id": photo_id},
+                }
+                started = time.perf_counter()
+                if args.stream:
+                    async for _ in workflow.stream_message(workflow_input, authenticated_client=db):
+                        pass
+                else:
+                    await workflow.process_message(workflow_input, authenticated_client=db)
+                turn_latencies.append(time.perf_counter() - started)
+                if args.think_time:
+                    await asyncio.sleep(args.think_time)
+
+    node_before = NODE_DURATION_SECONDS.snapshot()
+    started = time.perf_counter()
+    with quiet(not args.verbose):
+        await asyncio.gather(*(run_dialogue(dialogue) for dialogue in dialogues))
+        replay_seconds = time.perf_counter() - started
+        await workflow.conversation_writer.close()
+        await workflow.question_scheduler.close()
+    node_after = NODE_DURATION_SECONDS.snapshot()
+
+    current_memory, peak_memory = tracemalloc.get_traced_memory() if args.trace_memory else (0, 0)
+    top_allocations = []
+    if args.trace_memory:
+        snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(True, f"{APP_DIR}{os.sep}*")])
+        top_allocations = [
+            {"location": str(stat.traceback[0]).replace(str(APP_DIR) + os.sep, ""), "kib": round(stat.size / 1024, 1)}
+            for stat in snapshot.statistics("lineno")[:10]
+        ]
+        tracemalloc.stop()
+
+    nodes = {}
+    for (node,), (count, total) in sorted(node_after.items()):
+        before_count, before_total = node_before.get((node,), (0, 0.0))
+        count, total = count - before_count, total - before_total
+        if not count:
+            continue
+        allocations = node_allocations.get(node, [])
+        nodes[node] = {
+            "calls": count,
+            "total_ms": round(total * 1000, 2),
+            "avg_ms": round(total * 1000 / count, 3),
+            "avg_alloc_kib": round(sum(allocations) / len(allocations) / 1024, 2) if allocations else None,
+        }
+
+    turns = len(turn_latencies)
+    return {
+        "config": {
+            "source": args.source or "sample",
+            "dialogues": len(dialogues),
+            "concurrency": args.concurrency,
+            "mode": "stream" if args.stream else "process",
+            "llm_latency": args.llm_latency,
+            "nano_latency": args.nano_latency,
+            "db_latency": args.db_latency,
+            "embedding_latency": args.embedding_latency,
+        },
+        "turns": turns,
+        "wall_seconds": round(replay_seconds, 3),
+        "turns_per_second": round(turns / replay_seconds, 2) if replay_seconds else 0.0,
+        "turn_latency_ms": {
+            "p50": round(percentile(turn_latencies, 50) * 1000, 2),
+            "p95": round(percentile(turn_latencies, 95) * 1000, 2),
+            "p99": round(percentile(turn_latencies, 99) * 1000, 2),
+            "max": round(max(turn_latencies, default=0) * 1000, 2),
+        },
+        "nodes": nodes,
+        "llm_calls": {m.model_name: m.calls for m in (workflow.llm_mini, workflow.llm_nano, workflow.llm_router)},
+        "embedding_calls": workflow.embeddings.calls,
+        "db_operations": {f"{table}.{operation}": count for (table, operation), count in sorted(db.operations.items())},
+        "background_tasks": len(background_tasks),
+        "question_jobs": workflow.question_scheduler.stats(),
+        "memory": {
+            "current_kib": round(current_memory / 1024, 1),
+            "peak_kib": round(peak_memory / 1024, 1),
+            "top_allocations": top_allocations,
+        } if args.trace_memory else None,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    config = report["config"]
+    print("=" * 60)
+    print("📈 DialogueWorkflow 재생 벤치마크")
+    print("=" * 60)
+    print(f"대화 소스: {config['source']} ({config['dialogues']}개 대화, 동시 실행 {config['concurrency']}, {config['mode']})")
+    print(f"지연 시간: LLM={config['llm_latency']}, nano={config['nano_latency']}, DB={config['db_latency']}, 임베딩={config['embedding_latency']}")
+    print("-" * 60)
+    print(f"턴 수: {report['turns']}  /  소요 시간: {report['wall_seconds']}s  /  처리량: {report['turns_per_second']} turns/sec")
+    latency = report["turn_latency_ms"]
+    print(f"턴 지연 시간(ms): p50={latency['p50']}  p95={latency['p95']}  p99={latency['p99']}  max={latency['max']}")
+    print("-" * 60)
+    print(f"{'노드':<20}{'호출':>8}{'합계(ms)':>12}{'평균(ms)':>12}{'평균 할당(KiB)':>16}")
+    for node, stats in report["nodes"].items():
+        alloc = "-" if stats["avg_alloc_kib"] is None else stats["avg_alloc_kib"]
+        print(f"{node:<20}{stats['calls']:>8}{stats['total_ms']:>12}{stats['avg_ms']:>12}{alloc:>16}")
+    print("-" * 60)
+    print(f"LLM 호출: {report['llm_calls']}  /  임베딩 호출: {report['embedding_calls']}  /  백그라운드 작업: {report['background_tasks']} (생략 {report['question_jobs']['jobs_avoided']})")
+    print(f"DB 작업: {report['db_operations']}")
+    if report["memory"]:
+        memory = report["memory"]
+        print(f"메모리(tracemalloc): 현재 {memory['current_kib']} KiB, 최대 {memory['peak_kib']} KiB")
+        for allocation in memory["top_allocations"]:
+            print(f"  {allocation['kib']:>10} KiB  {allocation['location']}")
+    print("=" * 60)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="DialogueWorkflow 오프라인 재생 벤치마크")
+    parser.add_argument("--source", help="분석 리포트 디렉터리/파일 또는 conversations 내보내기(JSON/JSONL), 생략 시 내장 예시 대화")
+    parser.add_argument("--repeat", type=int, default=1, help="대화 목록 반복 횟수")
+    parser.add_argument("--max-turns", type=int, default=0, help="대화별 최대 턴 수 (0이면 전체)")
+    parser.add_argument("--concurrency", type=int, default=1, help="동시에 진행할 대화 수")
+    parser.add_argument("--stream", action="store_true", help="process_message 대신 stream_message 사용")
+    parser.add_argument("--llm-latency", default="lognormal:0.6,0.4", help="gpt-4o-mini/라우터 첫 토큰 지연 분포")
+    parser.add_argument("--nano-latency", default="lognormal:0.4,0.4", help="fallback/요약 모델 첫 토큰 지연 분포")
+    parser.add_argument("--inter-token", type=float, default=0.0, help="스트리밍 토큰 간 지연(초)")
+    parser.add_argument("--db-latency", default="normal:0.02,0.005", help="Supabase 쿼리 지연 분포")
+    parser.add_argument("--embedding-latency", default="lognormal:0.15,0.3", help="임베딩 호출 지연 분포")
+    parser.add_argument("--think-time", type=float, default=0.0, help="턴 사이 사용자 대기 시간(초)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-trace-memory", dest="trace_memory", action="store_false", help="tracemalloc 측정 끄기")
+    parser.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    parser.add_argument("--verbose", action="store_true", help="워크플로우 로그 출력")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(replay(args))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
@@ -0,0 +1,17 @@
+"""
+테스트 공통 설정
+app 디렉터리 모듈(core, services)을 불러올 수 있도록 경로를 추가하고,
+설정 검증을 통과하기 위한 가짜 자격 증명을 넣는다 (네트워크에 접근하지 않음)
+"""
+import os
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+sys.path.insert(0, str(APP_DIR))
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_ANON_KEY", "eyJhbGciOiJIUzI1NiJ9.e30.test")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "eyJhbGciOiJIUzI1NiJ9.e30.test")
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ["LANGSMITH_TRACING"] = "false"
@@ -0,0 +1,222 @@
+"""
+ConversationWriter 오류 처리 테스트
+PostgreSQL 제약 조건을 흉내 내는 가짜 클라이언트로 순서 충돌(23505), 외래 키 위반(23503),
+재시도해도 같은 오류, 일시적 오류가 섞인 배치를 저장해 문제가 있는 레코드만 실패하는지 확인한다
+"""
+import asyncio
+import uuid
+from typing import Any, Dict, List
+
+import pytest
+from postgrest.exceptions import APIError
+
+from services.conversation_writer import ConversationWriter
+
+
+def _api_error(code: str, message: str) -> APIError:
+    return APIError({"code": code, "message": message, "details": None, "hint": None})
+
+
+class _Response:
+    def __init__(self, data: Any):
+        self.data = data
+
+
+class FakeQuery:
+    """writer가 쓰는 쿼리 빌더 (upsert / 마지막 순서 조회)"""
+
+    def __init__(self, db: "FakeSupabase", table: str):
+        self.db = db
+        self.table_name = table
+        self.payload: List[Dict[str, Any]] = []
+        self.filters: Dict[str, Any] = {}
+
+    def upsert(self, payload, **kwargs) -> "FakeQuery":
+        self.payload = payload if isinstance(payload, list) else [payload]
+        return self
+
+    def select(self, *columns) -> "FakeQuery":
+        return self
+
+    def eq(self, column: str, value: Any) -> "FakeQuery":
+        self.filters[column] = value
+        return self
+
+    def order(self, *args, **kwargs) -> "FakeQuery":
+        return self
+
+    def limit(self, count: int) -> "FakeQuery":
+        return self
+
+    async def execute(self) -> _Response:
+        await asyncio.sleep(0)
+        return self.db.execute(self)
+
+
+class FakeSupabase:
+    """sessions / conversations 테이블과 제약 조건만 흉내 내는 AsyncClient 대용 (배치는 전부 저장되거나 전부 실패)"""
+
+    def __init__(self):
+        self.tables: Dict[str, List[Dict[str, Any]]] = {"sessions": [], "conversations": []}
+        self.upserts: Dict[str, int] = {"sessions": 0, "conversations": 0}
+        self.transient_failures: Dict[str, int] = {"sessions": 0, "conversations": 0}
+        self.rejected_sessions: set = set()
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def execute(self, query: FakeQuery) -> _Response:
+        rows = self.tables[query.table_name]
+        if not query.payload:
+            orders = [r["conversation_order"] for r in rows if r["session_id"] == query.filters["session_id"]]
+            return _Response([{"conversation_order": max(orders)}] if orders else [])
+
+        self.upserts[query.table_name] += 1
+        if self.transient_failures[query.table_name]:
+            self.transient_failures[query.table_name] -= 1
+            raise ConnectionError("connection reset")
+
+        existing_ids = {r["id"] for r in rows}
+        new_rows = [dict(r) for r in query.payload if r["id"] not in existing_ids]
+        for row in new_rows:
+            if query.table_name == "sessions":
+                if row["id"] in self.rejected_sessions:
+                    raise _api_error("42501", "new row violates row-level security policy")
+                continue
+            if row["session_id"] not in {s["id"] for s in self.tables["sessions"]}:
+                raise _api_error("23503", "violates foreign key constraint")
+            if "\x00" in row["user_input"]:
+                raise _api_error("22P05", "unsupported Unicode escape sequence")
+            if any(r["session_id"] == row["session_id"] and r["conversation_order"] == row["conversation_order"] for r in rows):
+                raise _api_error("23505", "duplicate key value violates unique constraint")
+        rows.extend(new_rows)
+        return _Response(new_rows)
+
+
+def _row(session_id: str, order: int, user_input: str = "바다에 갔어요") -> Dict[str, Any]:
+    return {
+        "id": str(uuid.uuid4()), "session_id": session_id, "conversation_order": order,
+        "user_input": user_input, "ai_output": "그러셨군요",
+    }
+
+
+def _writer() -> ConversationWriter:
+    return ConversationWriter(max_retries=4, retry_base_delay=0.05, flush_max_rows=50, flush_interval=0.01)
+
+
+def _saved(db: FakeSupabase) -> Dict[str, int]:
+    return {r["id"]: r["conversation_order"] for r in db.tables["conversations"]}
+
+
+@pytest.mark.asyncio
+async def test_unique_violation_renumbers_only_conflicting_row():
+    db = FakeSupabase()
+    db.tables["sessions"] = [{"id": "s1"}, {"id": "s2"}]
+    db.tables["conversations"].append(_row("s1", 1))  # 다른 연결이 먼저 저장한 1번
+    conflicting, other = _row("s1", 1), _row("s2", 1)
+    renumbered, failed = [], []
+
+    writer = _writer()
+    for row in (conflicting, other):
+        writer.submit(db, row, on_failure=failed.append, on_renumber=renumbered.append)
+    await writer.close()
+
+    assert _saved(db)[conflicting["id"]] == 2
+    assert _saved(db)[other["id"]] == 1
+    assert [r["id"] for r in renumbered] == [conflicting["id"]]
+    assert failed == []
+
+
+@pytest.mark.asyncio
+async def test_foreign_key_violation_fails_only_orphan_row():
+    db = FakeSupabase()
+    db.tables["sessions"] = [{"id": "s1"}]
+    saved, orphan = _row("s1", 1), _row("missing", 1)
+    failed = []
+
+    writer = _writer()
+    for row in (saved, orphan):
+        writer.submit(db, row, on_failure=failed.append)
+    await writer.close()
+
+    assert set(_saved(db)) == {saved["id"]}
+    assert [r["id"] for r in failed] == [orphan["id"]]
+    # 외래 키 위반은 재시도하지 않음 (배치 1번 + 한 건씩 2번)
+    assert db.upserts["conversations"] == 3
+
+
+@pytest.mark.asyncio
+async def test_non_transient_error_fails_only_bad_row():
+    db = FakeSupabase()
+    db.tables["sessions"] = [{"id": "s1"}]
+    rows = [_row("s1", 1), _row("s1", 2, "깨진 입력\x00"), _row("s1", 3)]
+    failed = []
+
+    writer = _writer()
+    for row in rows:
+        writer.submit(db, row, on_failure=failed.append)
+    await writer.close()
+
+    assert set(_saved(db)) == {rows[0]["id"], rows[2]["id"]}
+    assert [r["id"] for r in failed] == [rows[1]["id"]]
+
+
+@pytest.mark.asyncio
+async def test_transient_error_is_retried_without_blocking_other_clients():
+    flaky, healthy = FakeSupabase(), FakeSupabase()
+    for db in (flaky, healthy):
+        db.tables["sessions"] = [{"id": "s1"}]
+    flaky.transient_failures["conversations"] = 2
+    flaky_row, healthy_row = _row("s1", 1), _row("s1", 1)
+    failed = []
+
+    writer = _writer()
+    writer.submit(flaky, flaky_row, on_failure=failed.append)
+    await asyncio.sleep(0.03)  # 첫 시도 실패 → 백오프 대기 중
+    writer.submit(healthy, healthy_row, on_failure=failed.append)
+    await asyncio.sleep(0.03)
+
+    # 백오프 중인 배치와 관계없이 다른 클라이언트의 레코드는 바로 저장됨
+    assert healthy_row["id"] in _saved(healthy)
+    assert flaky_row["id"] not in _saved(flaky)
+
+    await writer.close()
+    assert flaky_row["id"] in _saved(flaky)
+    assert flaky.upserts["conversations"] == 3
+    assert failed == []
+
+
+@pytest.mark.asyncio
+async def test_transient_error_fails_after_max_retries():
+    db = FakeSupabase()
+    db.tables["sessions"] = [{"id": "s1"}]
+    db.transient_failures["conversations"] = 100
+    failed = []
+
+    writer = _writer()
+    writer.submit(db, _row("s1", 1), on_failure=failed.append)
+    await writer.close()
+
+    assert len(failed) == 1
+    assert db.upserts["conversations"] == writer.max_retries
+    assert writer.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_session_is_remembered_across_flushes():
+    db = FakeSupabase()
+    db.rejected_sessions.add("s1")
+    failed_sessions, failed_rows = [], []
+
+    writer = _writer()
+    writer.submit_session(db, {"id": "s1"}, on_failure=failed_sessions.append)
+    writer.submit(db, _row("s1", 1), on_failure=failed_rows.append)
+    await writer.wait_for_session("s1")
+
+    # 다음 배치의 같은 세션 레코드는 쓰지 않고 바로 실패
+    writer.submit(db, _row("s1", 2), on_failure=failed_rows.append)
+    await writer.close()
+
+    assert [s["id"] for s in failed_sessions] == ["s1"]
+    assert len(failed_rows) == 2
+    assert db.upserts["conversations"] == 0
@@ -0,0 +1,138 @@
+"""
+DialogueWorkflow 동시 처리 테스트
+고정 지연 시간을 가진 가짜 LLM과 비동기 Supabase 대용으로 N개의 대화를 동시에 처리해,
+노드의 I/O가 이벤트 루프를 막지 않고 대화끼리 겹쳐 실행되는지(직렬화되지 않는지) 확인한다
+"""
+import asyncio
+import time
+import uuid
+from typing import Any, Dict, List
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from services.dialogue_workflow import DialogueWorkflow
+
+LLM_LATENCY = 0.3
+DB_LATENCY = 0.05
+CONVERSATIONS = 10  # LLM 게이트웨이의 모델별 기본 동시 실행 수(16)보다 작게
+
+
+class SleepingChatModel(BaseChatModel):
+    """고정 지연 후 응답하는 가짜 채팅 모델 (동시에 진행 중인 호출 수의 최댓값 기록)"""
+
+    model_name: str = "fake-sleeping"
+    in_flight: int = 0
+    max_in_flight: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-sleeping"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        raise NotImplementedError("비동기 호출만 사용합니다")
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        async for chunk in self._astream(messages, stop, run_manager, **kwargs):
+            pass
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="그러셨군요. 그때 기분이 어떠셨어요?"))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(LLM_LATENCY)
+        finally:
+            self.in_flight -= 1
+        yield ChatGenerationChunk(message=AIMessageChunk(content="그러셨군요. 그때 기분이 어떠셨어요?"))
+
+
+class _Response:
+    def __init__(self, data: Any):
+        self.data = data
+
+
+class SleepingQuery:
+    """요청마다 고정 지연 후 응답하는 PostgREST 쿼리 대용 (eq 필터만 적용)"""
+
+    def __init__(self, db: "SleepingSupabase", table: str):
+        self.db = db
+        self.table_name = table
+        self.filters: Dict[str, Any] = {}
+        self.payload = None
+
+    def __getattr__(self, name: str):
+        # select/order/limit/single 등 나머지 빌더 메서드는 결과에 영향 없음
+        return lambda *args, **kwargs: self
+
+    def eq(self, column: str, value: Any) -> "SleepingQuery":
+        self.filters[column] = value
+        return self
+
+    def upsert(self, payload, **kwargs) -> "SleepingQuery":
+        self.payload = payload
+        return self
+
+    async def execute(self) -> _Response:
+        await asyncio.sleep(DB_LATENCY)
+        rows = self.db.tables.setdefault(self.table_name, [])
+        if self.payload is not None:
+            rows.extend(self.payload if isinstance(self.payload, list) else [self.payload])
+            return _Response([])
+        return _Response([row for row in rows if all(row.get(k) == v for k, v in self.filters.items())])
+
+
+class SleepingSupabase:
+    """테이블별 행 목록을 메모리에 보관하는 AsyncClient 대용"""
+
+    def __init__(self):
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+
+    def table(self, name: str) -> SleepingQuery:
+        return SleepingQuery(self, name)
+
+
+def _third_turn_input(db: SleepingSupabase) -> Dict[str, Any]:
+    """대화 두 턴이 저장된 세션의 세 번째 턴 입력 (세 번째 턴은 항상 LLM 일반 응답)"""
+    conversation_id = str(uuid.uuid4())
+    for order in (1, 2):
+        db.tables.setdefault("conversations", []).append({
+            "id": str(uuid.uuid4()), "session_id": conversation_id, "conversation_order": order,
+            "ai_output": "질문", "user_input": "대답", "cist_category": None,
+        })
+    return {
+        "conversation_id": conversation_id,
+        "user_id": "test-user",
+        "user_message": "딸이랑 같이 바다에 갔었어요",
+        "photo_context": {},
+    }
+
+
+@pytest.mark.asyncio
+async def test_concurrent_conversations_overlap():
+    db = SleepingSupabase()
+    workflow = DialogueWorkflow()
+    workflow.llm_mini = SleepingChatModel()
+
+    try:
+        # 한 턴의 지연 시간 기준 (첫 호출의 초기화 비용은 제외)
+        await workflow.process_message(_third_turn_input(db), authenticated_client=db)
+        started = time.perf_counter()
+        await workflow.process_message(_third_turn_input(db), authenticated_client=db)
+        single = time.perf_counter() - started
+
+        inputs = [_third_turn_input(db) for _ in range(CONVERSATIONS)]
+        started = time.perf_counter()
+        outputs = await asyncio.gather(*(workflow.process_message(i, authenticated_client=db) for i in inputs))
+        concurrent = time.perf_counter() - started
+    finally:
+        await workflow.conversation_writer.close()
+
+    assert all(output["response_text"] == "그러셨군요. 그때 기분이 어떠셨어요?" for output in outputs)
+    # 모든 대화의 LLM 호출이 동시에 진행됨
+    assert workflow.llm_mini.max_in_flight == CONVERSATIONS
+    # 직렬 처리라면 N × 한 턴 지연이 걸림 → 한 턴 지연 근처에서 끝나야 함
+    assert concurrent < single * 2, f"{CONVERSATIONS}개 동시 처리 {concurrent:.2f}s, 한 턴 {single:.2f}s"
+    assert concurrent < CONVERSATIONS * LLM_LATENCY / 3
@@ -0,0 +1,63 @@
+"""
+사진 질문 뱅크 생성 응답 파싱 테스트
+형식이 잘못된 세트는 세트 전체를 버리고, 남은 세트의 등록/회상 질문은 같은 pair_id로 저장되는지 확인한다
+"""
+import json
+
+import pytest
+
+from services.photo_question_bank import parse_question_bank_output
+from services.template_index import template_rows
+
+
+def _question_set(**overrides):
+    question_set = {
+        "words": ["수박", "옥수수", "아이스크림"],
+        "difficulty": 2,
+        "registration": {"bridge": "바닷가에 가면 간식이 빠질 수 없죠.", "question": "수박, 옥수수, 아이스크림을 좋아하시는 순서대로 말씀해 주세요."},
+        "recall": {"bridge": "바닷가 이야기를 하다 보니 출출하네요.", "question": "아까 말씀드린 간식 세 가지를 다시 말씀해 주세요."},
+    }
+    question_set.update(overrides)
+    return question_set
+
+
+def test_valid_set_becomes_paired_photo_bank_rows():
+    questions = parse_question_bank_output(json.dumps({"question_sets": [_question_set()]}))
+
+    assert [q["category"] for q in questions] == ["memory_registration", "memory_recall"]
+    assert questions[0]["pair_id"] == questions[1]["pair_id"]
+    assert all(q["bridge"] and q["difficulty"] == 2 for q in questions)
+
+    rows = template_rows(questions, "photo-1", context_type="photo_bank")
+    assert len(rows) == 2
+    assert {row["pair_id"] for row in rows} == {questions[0]["pair_id"]}
+    assert all(row["bridge_text"] and row["photo_id"] == "photo-1" for row in rows)
+
+
+@pytest.mark.parametrize(
+    "invalid_set",
+    [
+        _question_set(recall={"bridge": "출출하네요.", "question": ""}),
+        _question_set(registration={"bridge": "", "question": "수박, 옥수수, 아이스크림을 순서대로 말씀해 주세요."}),
+        _question_set(recall=None),
+        _question_set(words=["수박", "옥수수"]),
+        # 등록 질문에 외울 단어가 빠짐
+        _question_set(registration={"bridge": "간식 좋아하세요?", "question": "좋아하시는 간식을 말씀해 주세요."}),
+        "수박, 옥수수, 아이스크림",
+    ],
+)
+def test_invalid_set_is_dropped(invalid_set):
+    questions = parse_question_bank_output(json.dumps({"question_sets": [invalid_set, _question_set()]}))
+    assert len(questions) == 2
+    assert questions[0]["question"].startswith("수박")
+
+
+def test_difficulty_is_clamped():
+    questions = parse_question_bank_output(json.dumps({"question_sets": [_question_set(difficulty=9)]}))
+    assert {q["difficulty"] for q in questions} == {5}
+
+
+@pytest.mark.parametrize("text", ["[]", '{"sets": []}', "질문을 만들 수 없습니다"])
+def test_invalid_output_raises(text):
+    with pytest.raises(ValueError):
+        parse_question_bank_output(text)
@@ -0,0 +1,142 @@
+"""
+질문 생성 Batch API 파이프라인 왕복 테스트
+Redis 대용에 맥락을 쌓고 JSONL 요청 파일 → LocalBatchBackend → 결과 파싱 → cist_question_templates 행까지
+submit_question_batch / poll_question_batches와 같은 순서로 진행해, 오류 요청과 깨진 결과 줄이 있어도
+나머지 요청의 템플릿은 저장되는지 확인한다
+"""
+import json
+from typing import Any, Dict, List
+
+from services.question_batch import (
+    LocalBatchBackend, QuestionSpool, context_photo_id, default_local_responder, parse_batch_output, write_batch_file
+)
+from services.template_index import template_rows
+
+
+class FakePipeline:
+    def __init__(self, redis: "FakeRedis"):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name: str):
+        def queue(*args):
+            self.calls.append((name, args))
+            return self
+        return queue
+
+    def execute(self) -> List[Any]:
+        return [getattr(self.redis, name)(*args) for name, args in self.calls]
+
+
+class FakeRedis:
+    """QuestionSpool이 쓰는 목록/해시 명령만 흉내 내는 redis.Redis(decode_responses=True) 대용"""
+
+    def __init__(self):
+        self.lists: Dict[str, List[str]] = {}
+        self.hashes: Dict[str, Dict[str, str]] = {}
+
+    def rpush(self, key: str, *values: str) -> int:
+        self.lists.setdefault(key, []).extend(values)
+        return len(self.lists[key])
+
+    def lpush(self, key: str, *values: str) -> int:
+        for value in values:
+            self.lists.setdefault(key, []).insert(0, value)
+        return len(self.lists[key])
+
+    def lrange(self, key: str, start: int, end: int) -> List[str]:
+        items = self.lists.get(key, [])
+        return items[start:] if end == -1 else items[start:end + 1]
+
+    def ltrim(self, key: str, start: int, end: int) -> bool:
+        self.lists[key] = self.lrange(key, start, end)
+        return True
+
+    def llen(self, key: str) -> int:
+        return len(self.lists.get(key, []))
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    def hset(self, key: str, field: str, value: str) -> int:
+        self.hashes.setdefault(key, {})[field] = value
+        return 1
+
+    def hgetall(self, key: str) -> Dict[str, str]:
+        return dict(self.hashes.get(key, {}))
+
+    def hdel(self, key: str, field: str) -> int:
+        return 1 if self.hashes.get(key, {}).pop(field, None) is not None else 0
+
+
+def _responder(body: Dict[str, Any]) -> str:
+    """사용자 발화에 따라 정상 / 요청 오류 / JSON이 아닌 응답"""
+    prompt = body["messages"][-1]["content"]
+    if "요청 오류" in prompt:
+        raise RuntimeError("rate limited")
+    if "설명만" in prompt:
+        return "질문을 만들 수 없습니다."
+    return default_local_responder(body)
+
+
+def test_spool_to_template_rows_round_trip(tmp_path):
+    spool = QuestionSpool(FakeRedis())
+    contexts = [
+        {"conversation_id": "c1", "photo_id": "photo-1", "category": "memory_registration", "user_messages": ["바다에 갔어요"]},
+        {"conversation_id": "c2", "category": "orientation_time", "user_messages": ["오늘은 병원에 가요"]},
+        {"conversation_id": "c3", "category": "memory_recall", "user_messages": ["요청 오류"]},
+        {"conversation_id": "c4", "category": "memory_recall", "user_messages": ["설명만 해 주세요"]},
+        {"conversation_id": "c5", "photo_context": {"photo_id": "photo-2"}, "category": "memory_recall", "user_messages": ["기차를 탔어요"]},
+    ]
+    assert spool.push(*contexts) == len(contexts)
+
+    # submit_question_batch
+    popped = spool.pop(10)
+    assert popped == contexts and spool.size() == 0
+    requests = {f"ctx-{index}": context for index, context in enumerate(popped)}
+    path = write_batch_file(requests, str(tmp_path / "requests"), "gpt-4")
+    with open(path, encoding="utf-8") as f:
+        assert [json.loads(line)["custom_id"] for line in f] == list(requests)
+
+    backend = LocalBatchBackend(str(tmp_path / "results"), responder=_responder)
+    batch_id = backend.submit(path)
+    spool.track(batch_id, {"backend": backend.name, "input_file": path, "contexts": requests})
+
+    # 마지막 요청(ctx-4)의 결과 줄이 잘려서 저장됨
+    status = backend.status(batch_id)
+    with open(status.output, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    lines[-1] = lines[-1][:40]
+    with open(status.output, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+    # poll_question_batches
+    record = spool.inflight()[batch_id]
+    assert status.state == "completed"
+    results = parse_batch_output(backend.results(status))
+    assert set(results.questions) == {"ctx-0", "ctx-1"}
+    assert set(results.failed) == {"ctx-2", "ctx-3"}
+    assert "rate limited" in results.failed["ctx-2"]
+    assert results.failed["ctx-3"].startswith("invalid response")
+
+    rows = [
+        row
+        for custom_id, questions in results.questions.items()
+        for row in template_rows(questions, context_photo_id(record["contexts"][custom_id]))
+    ]
+    assert [(row["category"], row["photo_id"]) for row in rows] == [
+        ("memory_registration", "photo-1"),
+        ("orientation_time", None),
+    ]
+    assert all(row["template_hash"] and row["context_type"] == "photo_based" for row in rows)
+
+    spool.untrack(batch_id)
+    assert spool.inflight() == {}
+
+
+def test_requeue_keeps_original_order():
+    spool = QuestionSpool(FakeRedis())
+    spool.push({"n": 1}, {"n": 2}, {"n": 3})
+    popped = spool.pop(2)
+    spool.requeue(popped)
+    assert spool.pop(10) == [{"n": 1}, {"n": 2}, {"n": 3}]
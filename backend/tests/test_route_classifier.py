@@ -0,0 +1,97 @@
+"""
+RouteClassifier 규칙 테스트
+규칙별로 대표 입력을 넣어 결정 경로(reason)와 라우팅 결과를 확인하고,
+종료 키워드 매처가 어간 + 허용 어미만 종료로 보는지 확인한다
+"""
+import pytest
+
+from services.route_classifier import (
+    ASSESSMENT_CHAT,
+    STANDARD_CHAT,
+    UNCERTAIN,
+    RouteClassifier,
+)
+
+LONG_MESSAGE = "어제는 딸이랑 오랜만에 통화를 했어요"
+
+
+@pytest.fixture
+def classifier() -> RouteClassifier:
+    return RouteClassifier(min_turns_between=2, recall_delay=6, short_answer_chars=4)
+
+
+@pytest.mark.parametrize(
+    "turn_count, user_message, recent_messages, assessment_turns, last_attempt_turn, expected",
+    [
+        # 세 번째 턴까지는 항상 일상대화
+        (3, "사과 배 포도를 샀어요", [], {}, 0, (STANDARD_CHAT, None, "third_turn")),
+        # 종료 키워드는 다른 규칙보다 먼저
+        (10, "이제 그만할래요", [], {"registration": 4}, 0, (STANDARD_CHAT, None, "end_keyword")),
+        # 기억회상까지 끝났으면 더 할 평가가 없음
+        (12, LONG_MESSAGE, [], {"registration": 4, "recall": 10}, 0, (STANDARD_CHAT, None, "recall_done")),
+        # 기억등록 후 recall_delay턴이 지나면 기억회상
+        (10, LONG_MESSAGE, [], {"registration": 4}, 0, (ASSESSMENT_CHAT, "recall", "recall_due")),
+        (9, LONG_MESSAGE, [], {"registration": 4}, 0, (STANDARD_CHAT, None, "recall_wait")),
+        # 마지막 평가(시도 포함) 직후는 쉬어 감
+        (6, LONG_MESSAGE, [], {}, 5, (STANDARD_CHAT, None, "assessment_cooldown")),
+        (4, LONG_MESSAGE, [], {}, 2, (STANDARD_CHAT, None, "no_category_words")),  # 간격을 채우면 다음 규칙으로
+        (6, "네", [], {}, 0, (STANDARD_CHAT, None, "short_answer")),
+        # 최근 대화의 동일 카테고리 단어 3개 이상 → 기억등록
+        (6, "사과랑 포도도 좋아해요", [{"role": "assistant", "content": "수박은 좋아하세요?"}], {}, 0,
+         (ASSESSMENT_CHAT, "registration", "category_trigger")),
+        (6, LONG_MESSAGE, [], {}, 0, (STANDARD_CHAT, None, "no_category_words")),
+        (6, "사과를 좋아하셨어요", [], {}, 0, (UNCERTAIN, None, "uncertain")),
+    ],
+)
+def test_classify_rules(classifier, turn_count, user_message, recent_messages, assessment_turns, last_attempt_turn, expected):
+    decision = classifier.classify(turn_count, user_message, recent_messages, assessment_turns, last_attempt_turn)
+    assert (decision.route, decision.assessment_item, decision.reason) == expected
+
+
+def test_recall_delay_is_configurable():
+    classifier = RouteClassifier(recall_delay=3)
+    assert classifier.classify(7, LONG_MESSAGE, [], {"registration": 4}).reason == "recall_due"
+    assert classifier.classify(6, LONG_MESSAGE, [], {"registration": 4}).reason == "recall_wait"
+
+
+@pytest.mark.parametrize(
+    "user_message, expected",
+    [
+        ("그만", True),
+        ("그만할래", True),
+        ("이제 그만해요", True),
+        ("끝", True),
+        ("오늘은 여기까지 끝내자", True),
+        ("종료해주세요", True),
+        ("멈춰요", True),
+        ("quit", True),
+        ("Q", True),
+        # 어간만 같은 다른 단어는 종료가 아님
+        ("그만큼 좋았어요", False),
+        ("끝까지 갔어요", False),
+        ("끝내주게 맛있었어요", False),
+        ("quite nice", False),
+        ("바다에 갔어요", False),
+    ],
+)
+def test_end_keyword_matcher(user_message, expected):
+    assert RouteClassifier._has_end_keyword(user_message) is expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('{"route": "assessment_chat", "assessment_item": "registration"}', (ASSESSMENT_CHAT, "registration")),
+        ('{"route": "standard_chat", "assessment_item": null}', (STANDARD_CHAT, None)),
+        # 평가 항목 없이 평가를 고르면 일상대화
+        ('{"route": "assessment_chat", "assessment_item": null}', (STANDARD_CHAT, None)),
+    ],
+)
+def test_parse_llm_output(text, expected):
+    assert RouteClassifier.parse_llm_output(text) == expected
+
+
+@pytest.mark.parametrize("text", ['{"route": "quiz", "assessment_item": null}', "standard_chat", "[]"])
+def test_parse_llm_output_rejects_invalid(text):
+    with pytest.raises(ValueError):
+        RouteClassifier.parse_llm_output(text)
@@ -0,0 +1,119 @@
+"""
+TemplateIndex 테스트
+Celery 작업이 저장하는 형태(template_rows)의 템플릿이 증분 갱신 후 검색되는지,
+사진별 템플릿은 같은 사진의 대화에서만, 사진 질문 뱅크 행은 검색 후보에서 제외되는지 확인한다
+"""
+import uuid
+import zlib
+from typing import Any, Dict, List
+
+import pytest
+
+from services.template_index import TemplateIndex, template_rows
+
+
+class FakeEmbeddings:
+    """글자 bigram 해시 벡터 (같은 문장은 유사도 1)"""
+
+    model = "fake-embedding"
+
+    def _vector(self, text: str) -> List[float]:
+        vector = [0.0] * 64
+        for a, b in zip(text, text[1:] + " "):
+            vector[zlib.crc32((a + b).encode()) % 64] += 1.0
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(text) for text in texts]
+
+
+class _Response:
+    def __init__(self, data: Any):
+        self.data = data
+
+
+class FakeQuery:
+    """인덱스가 쓰는 select / neq / gte / order만 흉내"""
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.rows = rows
+        self.filters = []
+
+    def select(self, *columns) -> "FakeQuery":
+        return self
+
+    def neq(self, column: str, value: Any) -> "FakeQuery":
+        self.filters.append(lambda row: row.get(column) is not None and row.get(column) != value)
+        return self
+
+    def gte(self, column: str, value: Any) -> "FakeQuery":
+        self.filters.append(lambda row: row.get(column) >= value)
+        return self
+
+    def order(self, column: str) -> "FakeQuery":
+        return self
+
+    async def execute(self) -> _Response:
+        return _Response([dict(row) for row in self.rows if all(check(row) for check in self.filters)])
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.templates: List[Dict[str, Any]] = []
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self.templates)
+
+    def insert(self, rows: List[Dict[str, Any]], created_at: str) -> None:
+        for row in rows:
+            self.templates.append({"id": str(uuid.uuid4()), "created_at": created_at, **row})
+
+
+SHARED = "오늘 아침에는 무엇을 드셨는지 말씀해 주세요."
+GENERATED = "바닷가에서 드신 간식 세 가지를 기억해 두세요."
+
+
+@pytest.fixture
+async def index_and_db():
+    db = FakeSupabase()
+    db.insert(template_rows([{"category": "memory_registration", "question": SHARED}]), "2026-01-01T00:00:00")
+    db.insert(
+        template_rows([{"category": "memory_registration", "question": "사진 뱅크 질문", "pair_id": "pair"}], "photo-1", context_type="photo_bank"),
+        "2026-01-01T00:00:00",
+    )
+    index = TemplateIndex(FakeEmbeddings())
+    await index.load(db)
+    return index, db
+
+
+async def test_generated_photo_template_becomes_searchable(index_and_db):
+    index, db = index_and_db
+    assert len(index) == 1  # 사진 뱅크 행은 인덱스에 올리지 않음
+
+    # generate_high_quality_questions가 사진 대화에서 만든 템플릿
+    db.insert(template_rows([{"category": "memory_registration", "question": GENERATED, "difficulty": 2}], "photo-1"), "2026-01-02T00:00:00")
+    assert await index.refresh(db) == 1
+
+    matches = await index.search(GENERATED, category="memory_registration", k=1, photo_id="photo-1")
+    assert matches[0][1]["template_text"] == GENERATED
+    assert matches[0][0] == pytest.approx(1.0)
+    assert index.bank_size("memory_registration", "photo-1") == 1
+
+    # 다른 사진이나 사진 없는 대화에는 공용 템플릿만
+    for photo_id in ("photo-2", None):
+        matches = await index.search(GENERATED, category="memory_registration", k=3, photo_id=photo_id)
+        assert [row["template_text"] for _, row in matches] == [SHARED]
+    assert index.bank_size("memory_registration") == 1
+
+
+async def test_generated_shared_template_becomes_searchable(index_and_db):
+    index, db = index_and_db
+    db.insert(template_rows([{"category": "memory_recall", "question": GENERATED}]), "2026-01-02T00:00:00")
+    await index.refresh(db)
+
+    matches = await index.search(GENERATED, category="memory_recall", k=1, photo_id="photo-2")
+    assert matches[0][1]["template_text"] == GENERATED
+    assert index.bank_size("memory_recall") == 1
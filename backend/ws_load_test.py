@@ -0,0 +1,740 @@
+#!/usr/bin/env python3
+"""
+WebSocket 부하 테스트 (고령 사용자 대화 세션 시뮬레이션)
+/ws/chat/{conversation_id}에 수백~수천 개의 세션을 열어 jwt_token 인증 후
+생각 시간(think time) 간격으로 발화를 보내고, 턴별 processing/응답 도착 시간과
+오류 프레임, 연결 끊김을 기록한다. 실행 중에는 HTTP 프로브로 서버 이벤트 루프 지연을 측정해
+워커당 연결 한계와 이벤트 루프 포화 지점을 찾는다
+
+Supabase auth/PostgREST와 OpenAI 대신 로컬 스탠드인 서버(stubs)를 사용할 수 있다
+  - auth:      /auth/v1/user, /auth/v1/.well-known/jwks.json (앱은 SUPABASE_JWT_SECRET으로 로컬 검증)
+  - PostgREST: /rest/v1/{table} (select/insert/upsert/update, eq/gte/cs/is 필터, order/limit/single)
+  - OpenAI:    /v1/chat/completions (스트리밍 포함), /v1/embeddings
+Celery 발행(고품질 질문 생성)은 실제 브로커로 나가므로 RabbitMQ가 없으면 발행 실패 로그가 남는다
+
+사용 예:
+    python ws_load_test.py run --spawn-app --sessions 200 --ramp 30        # 스탠드인 + 앱을 띄우고 부하 실행
+    python ws_load_test.py run --spawn-app --workers 4 --sessions 3000 --ramp 120 --stream-ratio 0.5
+    python ws_load_test.py stubs --port 54321                              # 스탠드인만 실행 (앱은 직접 실행)
+    python ws_load_test.py run --url http://localhost:8000 --jwt-secret <SUPABASE_JWT_SECRET> --sessions 500
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import resource
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+import jwt
+import tiktoken
+import uvicorn
+import websockets
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from replay_benchmark import APP_DIR, DEFAULT_REPLIES, FakeEmbeddings, LatencyDistribution, load_dialogues, percentile
+
+DEFAULT_JWT_SECRET = "load-test-jwt-secret-with-at-least-32-bytes"
+ROUTER_MAX_TOKENS = 32  # 라우터 호출 판별 (response_format을 보내거나 ROUTER_LLM_MAX_TOKENS 이하로 요청하는 호출)
+
+# 사진 행 예시 (세션마다 하나씩 배정)
+PHOTO_TEMPLATES = [
+    {"filename": "family_trip.jpg", "description": "가족과 함께 바닷가에서 찍은 사진", "location_name": "부산 해운대",
+     "tags": ["가족", "바다", "여름"], "photo_analyze_result": {"caption": "바닷가에서 웃고 있는 가족", "mood": "즐거움"}},
+    {"filename": "hiking.jpg", "description": "남편과 산 정상에서 찍은 사진", "location_name": "설악산",
+     "tags": ["등산", "부부", "가을"], "photo_analyze_result": {"caption": "단풍 든 산 정상의 부부", "mood": "뿌듯함"}},
+    {"filename": "hometown.jpg", "description": "고향 집 마당의 감나무", "location_name": "안동",
+     "tags": ["고향", "감나무", "겨울"], "photo_analyze_result": {"caption": "감이 주렁주렁 달린 마당", "mood": "그리움"}},
+]
+
+
+def make_token(secret: str, subject: str, role: str = "authenticated", ttl_seconds: int = 6 * 60 * 60) -> str:
+    """Supabase 형식 HS256 액세스 토큰"""
+    now = int(time.time())
+    claims = {"sub": subject, "aud": "authenticated", "role": role, "iat": now, "exp": now + ttl_seconds,
+              "email": f"{subject[:8]}@load.test"}
+    return jwt.encode(claims, secret, algorithm="HS256")
+
+
+def raise_open_file_limit() -> int:
+    """연결 수만큼 파일 디스크립터가 필요하므로 soft 한도를 hard 한도까지 올림"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        target = hard if hard != resource.RLIM_INFINITY else 1 << 20
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+            soft = target
+        except (ValueError, OSError):
+            pass
+    return soft
+
+
+# 로컬 스탠드인 서버
+
+class PostgrestTable:
+    """PostgREST 요청 하나를 인메모리 행 목록에 적용"""
+
+    FILTERS = {
+        "eq": lambda value, arg: str(value) == arg,
+        "neq": lambda value, arg: str(value) != arg,
+        "gte": lambda value, arg: value is not None and str(value) >= arg,
+        "lte": lambda value, arg: value is not None and str(value) <= arg,
+        "cs": lambda value, arg: set(filter(None, arg.strip("{}").split(","))) <= set(map(str, value or [])),
+        "is": lambda value, arg: value is None if arg == "null" else str(value).lower() == arg,
+    }
+    RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.rows = rows
+
+    def match(self, params) -> List[Dict[str, Any]]:
+        checks = []
+        for column, expression in params.multi_items():
+            if column in self.RESERVED_PARAMS:
+                continue
+            operator, _, arg = expression.partition(".")
+            if operator not in self.FILTERS:
+                raise ValueError(f"지원하지 않는 필터: {column}={expression}")
+            checks.append((column, self.FILTERS[operator], arg))
+        return [row for row in self.rows if all(check(row.get(column), arg) for column, check, arg in checks)]
+
+    def select(self, params) -> List[Dict[str, Any]]:
+        matched = self.match(params)
+        for order in reversed((params.get("order") or "").split(",")):
+            if not order:
+                continue
+            column, _, direction = order.partition(".")
+            matched.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=direction.startswith("desc"))
+        if params.get("limit"):
+            matched = matched[:int(params["limit"])]
+        return matched
+
+    def write(self, payload: Any, on_conflict: str, prefer: str) -> List[Dict[str, Any]]:
+        keys = [key.strip() for key in (on_conflict or "id").split(",")]
+        existing = {tuple(str(row.get(key)) for key in keys): row for row in self.rows}
+        written = []
+        for row in payload if isinstance(payload, list) else [payload]:
+            row = dict(row)
+            row.setdefault("id", str(uuid.uuid4()))
+            row.setdefault("created_at", time.strftime("%Y-%m-%dT%H:%M:%S"))
+            current = existing.get(tuple(str(row.get(key)) for key in keys))
+            if current is not None:
+                if "resolution=merge-duplicates" in prefer:
+                    current.update(row)
+                    written.append(current)
+                continue
+            self.rows.append(row)
+            existing[tuple(str(row.get(key)) for key in keys)] = row
+            written.append(row)
+        return written
+
+
+def create_stub_app(args: argparse.Namespace) -> FastAPI:
+    """Supabase auth / PostgREST / OpenAI 호환 스탠드인"""
+    rng = random.Random(args.seed)
+    llm_latency = LatencyDistribution(args.llm_latency, rng)
+    router_latency = LatencyDistribution(args.router_latency, rng)
+    db_latency = LatencyDistribution(args.db_latency, rng)
+    embeddings = FakeEmbeddings(LatencyDistribution(args.embedding_latency, rng), dimensions=args.embedding_dimensions)
+    tables: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    requests_total: Counter = Counter()
+
+    for index in range(args.photos):
+        photo = dict(PHOTO_TEMPLATES[index % len(PHOTO_TEMPLATES)])
+        photo.update(id=str(uuid.UUID(int=index + 1)), taken_at="1995-08-15T10:00:00", created_at="2025-01-01T00:00:00")
+        tables["photos"].append(photo)
+    for category, text in [
+        ("memory_registration", "제가 세 가지 단어를 말씀드릴게요. 사과, 기차, 된장. 기억해 두세요."),
+        ("memory_recall", "아까 기억해 달라고 했던 세 가지 단어가 무엇이었죠?"),
+    ]:
+        tables["cist_question_templates"].append({
+            "id": str(uuid.uuid4()), "category": category, "template_text": text,
+            "context_type": "photo_based", "difficulty_level": 1, "created_at": "2025-01-01T00:00:00",
+        })
+
+    app = FastAPI(title="Memento load-test stand-ins")
+
+    # Supabase auth
+    @app.get("/auth/v1/.well-known/jwks.json")
+    async def jwks():
+        return {"keys": []}
+
+    @app.get("/auth/v1/user")
+    async def auth_user(request: Request):
+        requests_total["auth.user"] += 1
+        token = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+        try:
+            claims = jwt.decode(token, args.jwt_secret, algorithms=["HS256"], audience="authenticated")
+        except jwt.InvalidTokenError as e:
+            return JSONResponse({"code": 401, "msg": str(e)}, status_code=401)
+        return {"id": claims["sub"], "aud": "authenticated", "role": claims.get("role"), "email": claims.get("email"),
+                "user_metadata": {}, "app_metadata": {}}
+
+    # PostgREST
+    @app.api_route("/rest/v1/{table}", methods=["GET", "POST", "PATCH", "HEAD"])
+    async def postgrest(table: str, request: Request):
+        requests_total[f"rest.{table}.{request.method}"] += 1
+        await db_latency.wait()
+        store = PostgrestTable(tables[table])
+        try:
+            if request.method in ("GET", "HEAD"):
+                rows = store.select(request.query_params)
+            elif request.method == "POST":
+                rows = store.write(await request.json(), request.query_params.get("on_conflict", ""),
+                                   request.headers.get("prefer", ""))
+            else:
+                rows = store.match(request.query_params)
+                payload = await request.json()
+                for row in rows:
+                    row.update(payload)
+        except ValueError as e:
+            return JSONResponse({"code": "PGRST100", "message": str(e)}, status_code=400)
+
+        if "vnd.pgrst.object" in request.headers.get("accept", ""):
+            if len(rows) != 1:
+                return JSONResponse({"code": "PGRST116", "message": "JSON object requested, multiple (or no) rows returned",
+                                     "details": f"The result contains {len(rows)} rows", "hint": None}, status_code=406)
+            return JSONResponse(rows[0])
+        if request.method == "POST" and "return=representation" not in request.headers.get("prefer", ""):
+            return Response(status_code=201)
+        return JSONResponse(rows, status_code=201 if request.method == "POST" else 200)
+
+    # OpenAI
+    def _usage(messages: List[Dict[str, Any]], reply: str) -> Dict[str, Any]:
+        prompt_tokens = sum(len(str(message.get("content", ""))) for message in messages) // 2
+        completion_tokens = max(1, len(reply) // 2)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens, "prompt_tokens_details": {"cached_tokens": 0}}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        max_tokens = body.get("max_completion_tokens") or body.get("max_tokens") or 0
+        is_router = "response_format" in body or 0 < max_tokens <= ROUTER_MAX_TOKENS
+        requests_total["openai.router" if is_router else "openai.chat"] += 1
+        reply = '{"route": "standard_chat", "assessment_item": null}' if is_router else rng.choice(DEFAULT_REPLIES)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        base = {"id": completion_id, "created": created, "model": body.get("model", "gpt-4o-mini")}
+        usage = _usage(body.get("messages", []), reply)
+        headers = {"x-ratelimit-limit-requests": "100000", "x-ratelimit-remaining-requests": "99999",
+                   "x-ratelimit-reset-requests": "1ms"}
+
+        if not body.get("stream"):
+            await (router_latency if is_router else llm_latency).wait()
+            return JSONResponse({
+                **base, "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": usage,
+            }, headers=headers)
+
+        async def events():
+            await llm_latency.wait()
+            words = reply.split(" ")
+            for index, word in enumerate(words):
+                if index and args.inter_token:
+                    await asyncio.sleep(args.inter_token)
+                delta = {"role": "assistant", "content": word} if index == 0 else {"content": f" {word}"}
+                chunk = {**base, "object": "chat.completion.chunk",
+                         "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            done = {**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+            yield f"data: {json.dumps(done)}\n\n"
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+    @app.post("/v1/embeddings")
+    async def create_embeddings(request: Request):
+        body = await request.json()
+        requests_total["openai.embeddings"] += 1
+        inputs = body.get("input")
+        # 문자열 하나 / 문자열 목록 / 토큰 배열 / 토큰 배열 목록 (langchain은 토큰 배열로 보냄)
+        if isinstance(inputs, str) or (isinstance(inputs, list) and inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        texts = [item if isinstance(item, str) else " ".join(map(str, item)) for item in inputs or []]
+        vectors = await embeddings.aembed_documents(texts)
+        data = []
+        for index, vector in enumerate(vectors):
+            if body.get("encoding_format") == "base64":
+                vector = base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode()
+            data.append({"object": "embedding", "index": index, "embedding": vector})
+        return {"object": "list", "data": data, "model": body.get("model"),
+                "usage": {"prompt_tokens": sum(len(text) for text in texts) // 2, "total_tokens": sum(len(text) for text in texts) // 2}}
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": dict(sorted(requests_total.items())), "rows": {name: len(rows) for name, rows in tables.items()}}
+
+    return app
+
+
+# 앱/스탠드인 프로세스 실행
+
+def spawn_stubs(args: argparse.Namespace, log) -> subprocess.Popen:
+    command = [
+        sys.executable, str(Path(__file__).resolve()), "stubs",
+        "--host", "127.0.0.1", "--port", str(args.stub_port), "--jwt-secret", args.jwt_secret,
+        "--photos", str(args.photos), "--seed", str(args.seed),
+        "--llm-latency", args.llm_latency, "--router-latency", args.router_latency,
+        "--inter-token", str(args.inter_token), "--db-latency", args.db_latency,
+        "--embedding-latency", args.embedding_latency,
+    ]
+    return subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT)
+
+
+TIKTOKEN_ENCODINGS = ("cl100k_base", "o200k_base")
+
+# BPE 파일을 받을 수 없을 때 앱 프로세스에 주입할 tiktoken 대체 인코딩 (바이트 단위 토큰, 토큰 수는 실제보다 많게 잡힘)
+OFFLINE_TIKTOKEN_SITECUSTOMIZE = """\
+import tiktoken
+import tiktoken.registry
+
+for _name in {names!r}:
+    tiktoken.registry.ENCODINGS[_name] = tiktoken.Encoding(
+        name=_name,
+        pat_str=r"\\s+|\\S+",
+        mergeable_ranks={{bytes([i]): i for i in range(256)}},
+        special_tokens={{"<|endoftext|>": 256}},
+    )
+"""
+
+
+def prepare_tiktoken(args: argparse.Namespace) -> Dict[str, str]:
+    """
+    앱 프로세스용 tiktoken 환경 변수
+    TIKTOKEN_CACHE_DIR에 BPE 파일을 미리 받아 두고, 받을 수 없으면(오프라인) sitecustomize로 대체 인코딩을 등록한다
+    (ChatSystem은 시작 시 cl100k_base를 바로 로드하므로 캐시가 없으면 앱이 뜨지 않음)
+    """
+    cache_dir = Path(args.tiktoken_cache_dir)
+    previous = os.environ.get("TIKTOKEN_CACHE_DIR")
+    os.environ["TIKTOKEN_CACHE_DIR"] = str(cache_dir)
+    try:
+        for name in TIKTOKEN_ENCODINGS:
+            tiktoken.get_encoding(name)
+        return {"TIKTOKEN_CACHE_DIR": str(cache_dir)}
+    except Exception as e:
+        print(f"⚠️ tiktoken BPE 파일을 받을 수 없어 바이트 단위 대체 인코딩 사용: {e.__class__.__name__}")
+    finally:
+        if previous is None:
+            os.environ.pop("TIKTOKEN_CACHE_DIR", None)
+        else:
+            os.environ["TIKTOKEN_CACHE_DIR"] = previous
+
+    stub_dir = cache_dir / "offline"
+    stub_dir.mkdir(parents=True, exist_ok=True)
+    (stub_dir / "sitecustomize.py").write_text(OFFLINE_TIKTOKEN_SITECUSTOMIZE.format(names=TIKTOKEN_ENCODINGS), encoding="utf-8")
+    return {"TIKTOKEN_CACHE_DIR": str(cache_dir), "PYTHONPATH": str(stub_dir)}
+
+
+def spawn_app(args: argparse.Namespace, log) -> subprocess.Popen:
+    """스탠드인을 바라보도록 환경 변수를 덮어쓴 uvicorn 앱 프로세스"""
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    env = dict(os.environ)
+    env.update({
+        "SUPABASE_URL": stub_url,
+        "SUPABASE_ANON_KEY": make_token(args.jwt_secret, "anon", role="anon"),
+        "SUPABASE_SERVICE_ROLE_KEY": make_token(args.jwt_secret, "service", role="service_role"),
+        "SUPABASE_JWT_SECRET": args.jwt_secret,
+        "SUPABASE_JWKS_URL": f"{stub_url}/auth/v1/.well-known/jwks.json",
+        "OPENAI_API_KEY": "sk-load-test",
+        "OPENAI_BASE_URL": f"{stub_url}/v1",
+        "OPENAI_API_BASE": f"{stub_url}/v1",
+        "LANGSMITH_TRACING": "false",
+    })
+    tiktoken_env = prepare_tiktoken(args)
+    env["TIKTOKEN_CACHE_DIR"] = tiktoken_env["TIKTOKEN_CACHE_DIR"]
+    # dialogue_workflow 등은 app.core.config로 import하므로 backend/도 경로에 포함
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [tiktoken_env.get("PYTHONPATH"), str(APP_DIR.parent), os.environ.get("PYTHONPATH")])
+    )
+    command = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(args.app_port), "--workers", str(args.workers),
+        "--no-access-log", "--log-level", "warning",
+    ]
+    return subprocess.Popen(command, cwd=APP_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+async def wait_until_ready(url: str, process: Optional[subprocess.Popen], timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(timeout=2.0) as client:
+        while time.monotonic() < deadline:
+            if process is not None and process.poll() is not None:
+                raise SystemExit(f"❌ 프로세스가 종료되었습니다 (exit={process.returncode}): {url}")
+            try:
+                await client.get(url)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.25)
+    raise SystemExit(f"❌ 준비 시간 초과: {url}")
+
+
+# 부하 생성
+
+class LoadStats:
+    """세션/턴 단위 측정값"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sessions_started = 0
+        self.connected = 0
+        self.completed = 0
+        self.abandoned = 0
+        self.open_now = 0
+        self.open_peak = 0
+        self.turns_in_flight = 0
+        self.turns_ok = 0
+        self.timeouts = 0
+        self.connect_failures: Counter = Counter()
+        self.error_frames: Counter = Counter()
+        self.drops: Counter = Counter()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.probes: List[tuple] = []  # (경과 초, 지연, 열린 연결 수, 진행 중 턴 수)
+        self.connection_ceiling: Optional[Dict[str, Any]] = None
+        self.saturation: Optional[Dict[str, Any]] = None
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"at_seconds": round(self.elapsed(), 2), "open_connections": self.open_now, "turns_in_flight": self.turns_in_flight}
+
+
+class SimulatedSession:
+    """고령 사용자 한 명의 대화 세션 (느린 발화 간격, 중도 이탈)"""
+
+    def __init__(self, index: int, utterances: List[str], args: argparse.Namespace, stats: LoadStats, rng: random.Random):
+        self.index = index
+        self.utterances = utterances
+        self.args = args
+        self.stats = stats
+        self.rng = rng
+        self.conversation_id = str(uuid.uuid4())
+        self.user_id = str(uuid.uuid4())
+        self.photo_id = str(uuid.UUID(int=index % args.photos + 1)) if args.photos else None
+        self.stream = rng.random() < args.stream_ratio
+        self.think_time = LatencyDistribution(args.think_time, rng)
+
+    async def run(self, ws_url: str) -> None:
+        stats = self.stats
+        stats.sessions_started += 1
+        started = time.perf_counter()
+        try:
+            websocket = await websockets.connect(
+                f"{ws_url}/ws/chat/{self.conversation_id}", open_timeout=self.args.connect_timeout, max_size=None
+            )
+        except Exception as e:
+            stats.connect_failures[type(e).__name__] += 1
+            if stats.connection_ceiling is None:
+                stats.connection_ceiling = {**stats.snapshot(), "error": f"{type(e).__name__}: {e}"[:200]}
+            return
+        stats.latencies["connect"].append(time.perf_counter() - started)
+        stats.connected += 1
+        stats.open_now += 1
+        stats.open_peak = max(stats.open_peak, stats.open_now)
+        try:
+            for turn, message in enumerate(self.utterances):
+                if turn:
+                    if self.rng.random() < self.args.abandon_rate:
+                        stats.abandoned += 1
+                        return
+                    await self.think_time.wait()
+                payload: Dict[str, Any] = {"message": message, "photo_context": {"photo_id": self.photo_id} if self.photo_id else {}}
+                if turn == 0:
+                    payload["jwt_token"] = make_token(self.args.jwt_secret, self.user_id)
+                if self.stream:
+                    payload["stream"] = True
+                stats.turns_in_flight += 1
+                try:
+                    ok = await asyncio.wait_for(self._turn(websocket, payload, first=turn == 0), self.args.response_timeout)
+                except asyncio.TimeoutError:
+                    stats.timeouts += 1
+                    return
+                finally:
+                    stats.turns_in_flight -= 1
+                if not ok:
+                    return
+            stats.completed += 1
+        except websockets.ConnectionClosed as e:
+            stats.drops[f"{e.rcvd.code if e.rcvd else 1006}"] += 1
+        except OSError as e:
+            stats.drops[type(e).__name__] += 1
+        finally:
+            stats.open_now -= 1
+            await websocket.close()
+
+    async def _turn(self, websocket, payload: Dict[str, Any], first: bool) -> bool:
+        """발화 하나를 보내고 최종 response까지 수신 (오류 프레임이면 False)"""
+        stats = self.stats
+        sent = time.perf_counter()
+        await websocket.send(json.dumps(payload, ensure_ascii=False))
+        first_delta = True
+        while True:
+            frame = json.loads(await websocket.recv())
+            elapsed = time.perf_counter() - sent
+            kind = frame.get("type")
+            if kind == "auth_success":
+                stats.latencies["auth"].append(elapsed)
+            elif kind == "processing":
+                stats.latencies["processing"].append(elapsed)
+            elif kind == "response_delta":
+                if first_delta:
+                    stats.latencies["first_delta"].append(elapsed)
+                    first_delta = False
+            elif kind == "response":
+                stats.latencies["response_first_turn" if first else "response"].append(elapsed)
+                stats.turns_ok += 1
+                return True
+            elif kind == "error":
+                stats.error_frames[frame.get("message", "")[:80]] += 1
+                return False
+
+
+async def probe_event_loop(http_url: str, stats: LoadStats, args: argparse.Namespace, stop: asyncio.Event) -> None:
+    """가벼운 GET / 응답 시간으로 서버 이벤트 루프 지연을 근사"""
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                await client.get(f"{http_url}/")
+                latency = time.perf_counter() - started
+            except httpx.HTTPError:
+                latency = float("inf")
+            stats.probes.append((stats.elapsed(), latency, stats.open_now, stats.turns_in_flight))
+            if stats.saturation is None and latency * 1000 >= args.saturation_ms:
+                stats.saturation = {**stats.snapshot(), "probe_ms": round(latency * 1000, 1) if latency != float("inf") else None}
+            try:
+                await asyncio.wait_for(stop.wait(), args.probe_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def report_progress(stats: LoadStats, total: int, stop: asyncio.Event, interval: float = 5.0) -> None:
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            latest = stats.probes[-1][1] * 1000 if stats.probes else 0.0
+            print(f"⏱️ {stats.elapsed():6.1f}s 세션 {stats.sessions_started}/{total} 열림 {stats.open_now} "
+                  f"진행 중 턴 {stats.turns_in_flight} 완료 턴 {stats.turns_ok} 프로브 {latest:.0f}ms", file=sys.stderr)
+
+
+async def fetch_server_stats(http_url: str, stub_url: Optional[str]) -> Dict[str, Any]:
+    result: Dict[str, Any] = {}
+    async with httpx.AsyncClient(timeout=5.0) as client:
+        try:
+            result["health"] = (await client.get(f"{http_url}/health")).json()
+        except (httpx.HTTPError, ValueError) as e:
+            result["health"] = {"error": str(e)}
+        if stub_url:
+            try:
+                result["stubs"] = (await client.get(f"{stub_url}/stats")).json()
+            except (httpx.HTTPError, ValueError) as e:
+                result["stubs"] = {"error": str(e)}
+    return result
+
+
+def _summary_ms(values: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 50) * 1000, 1),
+        "p95": round(percentile(values, 95) * 1000, 1),
+        "p99": round(percentile(values, 99) * 1000, 1),
+        "max": round(max(values, default=0) * 1000, 1),
+    }
+
+
+async def run_load(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    dialogues = load_dialogues(args.source)
+    if not dialogues:
+        raise SystemExit(f"재생할 대화가 없습니다: {args.source}")
+    if args.max_turns:
+        dialogues = [dialogue[:args.max_turns] for dialogue in dialogues]
+    open_file_limit = raise_open_file_limit()
+
+    processes: List[subprocess.Popen] = []
+    log = open(args.app_log, "ab") if args.app_log else subprocess.DEVNULL
+    http_url = args.url.rstrip("/")
+    stub_url = f"http://127.0.0.1:{args.stub_port}" if args.spawn_app else None
+    try:
+        if args.spawn_app:
+            processes.append(spawn_stubs(args, log))
+            await wait_until_ready(f"{stub_url}/stats", processes[-1])
+            processes.append(spawn_app(args, log))
+            http_url = f"http://127.0.0.1:{args.app_port}"
+            await wait_until_ready(f"{http_url}/", processes[-1])
+        ws_url = "ws" + http_url[len("http"):] if http_url.startswith("http") else http_url
+
+        stats = LoadStats()
+        stop = asyncio.Event()
+        monitors = [asyncio.create_task(probe_event_loop(http_url, stats, args, stop))]
+        if not args.json:
+            monitors.append(asyncio.create_task(report_progress(stats, args.sessions, stop)))
+
+        async def start_session(index: int) -> None:
+            # 램프업: 세션 시작 시각을 균등하게 분산
+            await asyncio.sleep(args.ramp * index / max(1, args.sessions))
+            session = SimulatedSession(index, dialogues[index % len(dialogues)], args, stats, random.Random(rng.random()))
+            await session.run(ws_url)
+
+        await asyncio.gather(*(start_session(index) for index in range(args.sessions)))
+        wall_seconds = stats.elapsed()
+        stop.set()
+        await asyncio.gather(*monitors)
+        server = await fetch_server_stats(http_url, stub_url)
+    finally:
+        # 앱이 종료하면서 write-behind 버퍼를 비울 수 있도록 앱 → 스탠드인 순서로 종료
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if args.app_log:
+            log.close()
+
+    probe_latencies = [latency for _, latency, _, _ in stats.probes if latency != float("inf")]
+    return {
+        "config": {
+            "url": http_url,
+            "spawned_app": args.spawn_app,
+            "workers": args.workers if args.spawn_app else None,
+            "sessions": args.sessions,
+            "ramp_seconds": args.ramp,
+            "think_time": args.think_time,
+            "stream_ratio": args.stream_ratio,
+            "abandon_rate": args.abandon_rate,
+            "open_file_limit": open_file_limit,
+        },
+        "wall_seconds": round(wall_seconds, 2),
+        "sessions": {
+            "connected": stats.connected,
+            "completed": stats.completed,
+            "abandoned": stats.abandoned,
+            "connect_failures": dict(stats.connect_failures),
+            "drops": dict(stats.drops),
+            "timeouts": stats.timeouts,
+            "peak_open": stats.open_peak,
+        },
+        "turns": {
+            "ok": stats.turns_ok,
+            "per_second": round(stats.turns_ok / wall_seconds, 2) if wall_seconds else 0.0,
+            "error_frames": dict(stats.error_frames),
+        },
+        "latency_ms": {name: _summary_ms(values) for name, values in sorted(stats.latencies.items())},
+        "event_loop_probe_ms": {**_summary_ms(probe_latencies), "failed": len(stats.probes) - len(probe_latencies)},
+        "connection_ceiling": stats.connection_ceiling,
+        "saturation": stats.saturation,
+        "server": server,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    config, sessions, turns = report["config"], report["sessions"], report["turns"]
+    print("=" * 60)
+    print("🌐 WebSocket 부하 테스트 결과")
+    print("=" * 60)
+    print(f"대상: {config['url']} (워커 {config['workers'] or '-'}) / 세션 {config['sessions']}개, 램프업 {config['ramp_seconds']}s")
+    print(f"생각 시간: {config['think_time']} / 스트리밍 비율 {config['stream_ratio']} / 이탈률 {config['abandon_rate']}")
+    print(f"실행 시간: {report['wall_seconds']}s / 완료 턴 {turns['ok']}개 ({turns['per_second']} turns/sec)")
+    print("-" * 60)
+    print(f"연결 {sessions['connected']} / 완료 {sessions['completed']} / 이탈 {sessions['abandoned']} / "
+          f"최대 동시 연결 {sessions['peak_open']} / 응답 시간 초과 {sessions['timeouts']}")
+    if sessions["connect_failures"]:
+        print(f"❌ 연결 실패: {sessions['connect_failures']}")
+    if sessions["drops"]:
+        print(f"❌ 연결 끊김 (close code): {sessions['drops']}")
+    if turns["error_frames"]:
+        print(f"❌ 오류 프레임: {turns['error_frames']}")
+    print("-" * 60)
+    print(f"{'구간':<22}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}  (ms)")
+    rows = dict(report["latency_ms"], event_loop_probe=report["event_loop_probe_ms"])
+    for name, summary in rows.items():
+        print(f"{name:<22}{summary['count']:>8}{summary['p50']:>10}{summary['p95']:>10}{summary['p99']:>10}{summary['max']:>10}")
+    print("-" * 60)
+    if report["connection_ceiling"]:
+        print(f"🚧 첫 연결 실패 시점: {report['connection_ceiling']}")
+    if report["saturation"]:
+        print(f"🔥 이벤트 루프 포화 (프로브 지연 임계치 초과) 시점: {report['saturation']}")
+    if not report["connection_ceiling"] and not report["saturation"]:
+        print("✅ 연결 실패/이벤트 루프 포화 없음")
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--jwt-secret", default=DEFAULT_JWT_SECRET, help="토큰 서명용 SUPABASE_JWT_SECRET")
+    parser.add_argument("--photos", type=int, default=50, help="스탠드인에 미리 넣을 사진 수 (세션마다 순서대로 배정)")
+    parser.add_argument("--llm-latency", default="lognormal:0.8,0.4", help="채팅 응답 첫 토큰 지연 분포")
+    parser.add_argument("--router-latency", default="lognormal:0.4,0.3", help="라우터 호출 지연 분포")
+    parser.add_argument("--inter-token", type=float, default=0.02, help="스트리밍 토큰 간 지연(초)")
+    parser.add_argument("--db-latency", default="normal:0.02,0.005", help="PostgREST 요청 지연 분포")
+    parser.add_argument("--embedding-latency", default="lognormal:0.15,0.3", help="임베딩 호출 지연 분포")
+    parser.add_argument("--embedding-dimensions", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="WebSocket 부하 테스트 (고령 사용자 대화 세션 시뮬레이션)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    stubs = commands.add_parser("stubs", help="Supabase auth/PostgREST/OpenAI 스탠드인 서버 실행")
+    stubs.add_argument("--host", default="127.0.0.1")
+    stubs.add_argument("--port", type=int, default=54321)
+    add_stub_arguments(stubs)
+
+    run = commands.add_parser("run", help="WebSocket 부하 실행")
+    run.add_argument("--url", default="http://127.0.0.1:8000", help="대상 앱 주소 (--spawn-app이면 무시)")
+    run.add_argument("--spawn-app", action="store_true", help="스탠드인과 앱(uvicorn)을 직접 띄워서 실행")
+    run.add_argument("--app-port", type=int, default=8765)
+    run.add_argument("--stub-port", type=int, default=54321)
+    run.add_argument("--workers", type=int, default=1, help="--spawn-app일 때 uvicorn 워커 수")
+    run.add_argument("--app-log", help="--spawn-app일 때 앱/스탠드인 로그 파일 (기본: 버림)")
+    run.add_argument(
+        "--tiktoken-cache-dir", default=str(Path(tempfile.gettempdir()) / "ws-load-test-tiktoken"),
+        help="--spawn-app일 때 앱의 TIKTOKEN_CACHE_DIR (BPE 파일을 미리 받아 둘 곳)",
+    )
+    run.add_argument("--sessions", type=int, default=100, help="열 WebSocket 세션 수")
+    run.add_argument("--ramp", type=float, default=30.0, help="모든 세션을 여는 데 걸리는 시간(초)")
+    run.add_argument("--source", help="발화 목록 (replay_benchmark.py --source와 동일), 생략 시 내장 예시 대화")
+    run.add_argument("--max-turns", type=int, default=0, help="세션별 최대 턴 수 (0이면 대화 전체)")
+    run.add_argument("--think-time", default="lognormal:8,0.5", help="발화 사이 사용자 대기 시간 분포(초)")
+    run.add_argument("--stream-ratio", type=float, default=0.0, help="스트리밍 모드로 요청할 세션 비율")
+    run.add_argument("--abandon-rate", type=float, default=0.03, help="턴마다 대화를 그만두고 연결을 닫을 확률")
+    run.add_argument("--connect-timeout", type=float, default=10.0)
+    run.add_argument("--response-timeout", type=float, default=60.0, help="발화 후 최종 응답까지 기다릴 시간(초)")
+    run.add_argument("--probe-interval", type=float, default=0.5, help="이벤트 루프 지연 프로브 간격(초)")
+    run.add_argument("--saturation-ms", type=float, default=250.0, help="포화로 판단할 프로브 지연(ms)")
+    run.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    add_stub_arguments(run)
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    args = parse_args()
+    if args.command == "stubs":
+        print(f"🧪 스탠드인 서버: http://{args.host}:{args.port} (auth/PostgREST/OpenAI)")
+        uvicorn.run(create_stub_app(args), host=args.host, port=args.port, log_level="warning", access_log=False)
+        return
+    report = asyncio.run(run_load(args))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+-- 세션 내 대화 순서(conversation_order) 중복 방지
+-- 백엔드는 이미 알고 있는 턴 번호로 순서를 배정하고, 동시 저장으로 충돌하면 마지막 순서 다음으로 재배정한다.
+
+-- 기존 중복 순서를 생성 시각 기준으로 다시 번호 매김 (레코드는 삭제하지 않음)
+with ranked as (
+  select
+    id,
+    row_number() over (
+      partition by session_id
+      order by conversation_order, created_at, id
+    ) as new_order
+  from public.conversations
+)
+update public.conversations c
+set conversation_order = ranked.new_order
+from ranked
+where c.id = ranked.id
+  and c.conversation_order <> ranked.new_order;
+
+CREATE UNIQUE INDEX conversations_session_order_key ON public.conversations USING btree (session_id, conversation_order);
@@ -0,0 +1,8 @@
+-- 사진별 질문 템플릿 뱅크
+-- 백그라운드 질문 생성 작업은 (photo_id, category) 단위로 병합되며, 해당 사진의 템플릿이 충분하면 생략된다.
+-- photo_id가 없는 기존 템플릿은 사진과 무관한 공용 템플릿으로 유지된다.
+
+ALTER TABLE public.cist_question_templates
+  ADD COLUMN IF NOT EXISTS photo_id uuid REFERENCES public.photos(id) ON DELETE CASCADE;
+
+CREATE INDEX IF NOT EXISTS idx_cist_question_templates_photo_category ON public.cist_question_templates USING btree (photo_id, category);
@@ -0,0 +1,9 @@
+-- 질문 템플릿 중복 방지
+-- template_hash는 사진별 정규화 텍스트(공백/문장부호/대소문자 무시)의 SHA-256 해시로, 백엔드에서 계산한다.
+-- 질문 생성 작업은 template_hash 충돌 시 기존 템플릿을 유지하고(upsert ignore duplicates),
+-- 기존 템플릿의 해시 채우기와 중복 정리는 compact_question_templates 작업이 수행한다.
+
+ALTER TABLE public.cist_question_templates
+  ADD COLUMN IF NOT EXISTS template_hash text;
+
+CREATE UNIQUE INDEX IF NOT EXISTS cist_question_templates_template_hash_key ON public.cist_question_templates USING btree (template_hash);
@@ -0,0 +1,7 @@
+-- 사진별 평가 질문 뱅크
+-- 사진 분석이 끝나면 기억등록/기억회상 질문 세트와 브릿지 문장을 미리 생성해 photo_id와 함께 저장한다 (context_type = 'photo_bank').
+-- 같은 세트의 등록/회상 질문은 pair_id를 공유한다. 대화 중에는 photo_id 인덱스로만 조회한다.
+
+ALTER TABLE public.cist_question_templates
+  ADD COLUMN IF NOT EXISTS bridge_text text,
+  ADD COLUMN IF NOT EXISTS pair_id uuid;
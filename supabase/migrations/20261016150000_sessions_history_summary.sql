@@ -0,0 +1,7 @@
+-- 세션별 누적 대화 요약
+-- 최근 턴 창 밖으로 밀려난 대화의 요약을 세션 행에 저장해, 다른 워커나 세션 캐시 만료 후 복원할 때도 요약을 이어서 쓴다.
+-- summarized_count는 요약에 반영된 앞쪽 대화 메시지 수 (assistant/user 메시지 기준, system 메시지 제외).
+
+ALTER TABLE public.sessions
+  ADD COLUMN IF NOT EXISTS history_summary text,
+  ADD COLUMN IF NOT EXISTS summarized_count integer NOT NULL DEFAULT 0;